@@ -0,0 +1,87 @@
+# autotune.py
+# Searches cap settings (GPU cutoffs, delays, ladder method) against recorded control
+# traces on all cores and reports the best candidates under a configurable objective:
+# maximise the average cap with at most --max-over of the time over the load threshold
+# and at most --max-transitions cap changes per minute.
+#
+# Usage: python src/benchmarks/autotune.py config/traces/trace_*.jsonl --profiles config/profiles.ini --profile game.exe
+#                                          [--max-over 0.05 --max-transitions 2] [--samples 500] [--write-profile game.exe]
+#        python src/benchmarks/autotune.py --synthetic 3600   (tune against a generated trace)
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+_this_dir = os.path.abspath(os.path.dirname(__file__))
+_root = os.path.dirname(_this_dir)  # Gets src directory
+if _root not in sys.path:
+    sys.path.insert(0, _root)
+
+from core.auto_tuner import TuningObjective, tune, write_profile_section, default_search_space, generate_candidates
+from core.trace_replay import read_trace_header, load_replay_values
+from benchmarks.replay_trace import write_synthetic_trace, parse_overrides
+
+def main():
+    parser = argparse.ArgumentParser(description='Tune cap settings against recorded traces')
+    parser.add_argument('traces', nargs='*', help='Trace files (.jsonl or .jsonl.gz)')
+    parser.add_argument('--settings', help='settings.ini for GlobalSettings/Preferences')
+    parser.add_argument('--profiles', help='profiles.ini with the profile to start from (and to write to)')
+    parser.add_argument('--profile', default=None, help='Profile section (default: from the first trace header, else Global)')
+    parser.add_argument('--set', action='append', metavar='KEY=VALUE', help='Fix a setting for all candidates (repeatable)')
+    parser.add_argument('--max-over', type=float, default=0.05, help='Max fraction of time at/over the load threshold')
+    parser.add_argument('--max-transitions', type=float, default=2.0, help='Max cap changes per minute')
+    parser.add_argument('--threshold', type=float, default=90.0, help='Saturation threshold in GPU %% (the same for all candidates)')
+    parser.add_argument('--samples', type=int, default=None, help='Evaluate a random subset of the grid')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+    parser.add_argument('--stream', action='store_true', help="Re-read traces from disk per candidate instead of keeping them in memory")
+    parser.add_argument('--no-load-model', action='store_true', help='Replay recorded loads without rescaling to the cap')
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--write-profile', metavar='SECTION', help='Write the best feasible candidate to this profiles.ini section')
+    parser.add_argument('--synthetic', type=int, metavar='SECONDS', help='Generate and tune against a synthetic trace')
+    args = parser.parse_args()
+
+    traces = list(args.traces)
+    if args.synthetic:
+        path = os.path.join(tempfile.mkdtemp(prefix="dfl_trace_"), "synthetic.jsonl")
+        write_synthetic_trace(path, args.synthetic)
+        traces.append(path)
+    if not traces:
+        parser.error("no traces given")
+    if args.write_profile and not args.profiles:
+        parser.error("--write-profile needs --profiles")
+
+    header = read_trace_header(traces[0])
+    profile = args.profile or header.get("profile") or "Global"
+    base_values = load_replay_values(header, args.settings, args.profiles, profile, parse_overrides(args.set))
+    objective = TuningObjective(args.max_over, args.max_transitions, args.threshold)
+
+    total = len(generate_candidates(default_search_space(), args.samples))
+    print(f"Evaluating {total} candidates against {len(traces)} trace(s) on {args.workers or os.cpu_count()} workers...")
+    start = time.perf_counter()
+
+    def progress(done, count):
+        if done % max(1, count // 20) == 0 or done == count:
+            print(f"  {done}/{count}", end="\r", flush=True)
+
+    results = tune(traces, base_values, objective, samples=args.samples, workers=args.workers,
+                   preload=not args.stream, load_model=not args.no_load_model, progress=progress)
+    print(f"\nDone in {time.perf_counter() - start:.1f} s ({sum(1 for r in results if r.feasible)} feasible)\n")
+
+    print(f"{'avg cap':>8} {'over %':>7} {'trans/min':>9}  settings")
+    for r in results[:args.top]:
+        m = r.metrics
+        flag = " " if r.feasible else "x"
+        settings = ", ".join(f"{k}={v}" for k, v in r.values.items())
+        print(f"{m['average_cap']:8.2f} {m['over_fraction'] * 100:7.2f} {m['transitions_per_minute']:9.2f} {flag} {settings}")
+
+    best = results[0] if results and results[0].feasible else None
+    if not best:
+        print("\nNo candidate meets the objective; relax --max-over / --max-transitions.")
+    elif args.write_profile:
+        write_profile_section(args.profiles, args.write_profile, best.values)
+        print(f"\nWrote the best candidate to [{args.write_profile}] in {args.profiles}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# bench_limiter_path.py
+# Measures the LimiterCommandQueue -> controller write path. The backend contract
+# itself is covered by tests/test_rtss_controller_contract.py.
+#
+# Usage: python src/benchmarks/bench_limiter_path.py [--backend simulated|real] [--update-latency 0.02]
+# The benchmark creates and deletes dfl_bench_*.exe profiles, so run it against real RTSS with care.
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+_this_dir = os.path.abspath(os.path.dirname(__file__))
+_root = os.path.dirname(_this_dir)  # Gets src directory
+if _root not in sys.path:
+    sys.path.insert(0, _root)
+
+from core.limiter_queue import LimiterCommandQueue
+from core.fixed_fps import FixedFPS
+
+class PrintLogger:
+    def __init__(self, verbose=False):
+        self.verbose = verbose
+
+    def add_log(self, message):
+        if self.verbose:
+            print(message)
+
+def bench_queue(rtss, commands, rate, profiles):
+    queue = LimiterCommandQueue(rtss, PrintLogger())
+    rng = random.Random(1)
+    caps = [FixedFPS(v) for v in range(30, 145, 5)]
+    for profile in profiles:
+        rtss.create_profile(profile, {"FramerateLimit": 0})
+
+    start = time.perf_counter()
+    for _ in range(commands):
+        queue.submit(rng.choice(profiles), rng.choice(caps))
+        if rate:
+            time.sleep(1.0 / rate)
+    queue.stop(timeout=30)
+    elapsed = time.perf_counter() - start
+
+    for profile in profiles:
+        rtss.delete_profile(profile)
+    return queue.get_stats(), elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description='Limiter write path benchmark')
+    parser.add_argument('--backend', choices=['simulated', 'real'], default='simulated')
+    parser.add_argument('--update-latency', type=float, default=0.02, help='Simulated UpdateProfiles delay (s)')
+    parser.add_argument('--commands', type=int, default=2000)
+    parser.add_argument('--rate', type=float, default=500, help='Submitted commands per second (0 = unthrottled)')
+    parser.add_argument('--profiles', type=int, default=4)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    logger = PrintLogger(args.verbose)
+    if args.backend == 'real':
+        from core.rtss_functions import RTSSController
+        rtss = RTSSController(logger)
+    else:
+        from core.rtss_simulated import SimulatedRTSSController
+        rtss = SimulatedRTSSController(logger, tempfile.mkdtemp(prefix="dfl_rtss_"), update_latency=args.update_latency)
+
+    profiles = [f"dfl_bench_{i}.exe" for i in range(args.profiles)]
+    stats, elapsed = bench_queue(rtss, args.commands, args.rate, profiles)
+    print(f"{args.commands} commands over {args.profiles} profiles in {elapsed:.2f} s")
+    print(f"Writes: {stats['writes']} in {stats['batches']} batches, coalesced: {stats['coalesced']}, skipped: {stats['skipped']}")
+    print(f"Submit -> applied latency: avg {stats['avg_write_latency_ms']:.1f} ms, max {stats['max_write_latency_ms']:.1f} ms")
+    if hasattr(rtss, "call_count"):
+        print(f"UpdateProfiles calls: {rtss.call_count('UpdateProfiles')}, SetProfileProperty calls: {rtss.call_count('SetProfileProperty')}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# bench_rolling_quantile.py
+# Compares the per-sample percentile approaches the samplers used (sort the list after
+# list.pop(0), np.percentile over a deque) with core.rolling_quantile.RollingQuantiles,
+# over a range of window sizes.
+#
+# Usage: python src/benchmarks/bench_rolling_quantile.py [--windows 20 100 500 2000] [--samples 20000] [--percentile 70]
+
+import argparse
+import os
+import random
+import sys
+import time
+from collections import deque
+
+import numpy as np
+
+_this_dir = os.path.abspath(os.path.dirname(__file__))
+_root = os.path.dirname(_this_dir)  # Gets src directory
+if _root not in sys.path:
+    sys.path.insert(0, _root)
+
+from core.rolling_quantile import RollingQuantiles, percentile_of_sorted
+
+def load_stream(count, seed=1):
+    """Synthetic GPU-load-like readings: a slowly wandering level with noise and spikes, 0-100."""
+    rng = random.Random(seed)
+    level = 60.0
+    values = []
+    for _ in range(count):
+        level = min(98.0, max(5.0, level + rng.gauss(0, 1.5)))
+        value = level + rng.gauss(0, 4) + (25 if rng.random() < 0.02 else 0)
+        values.append(round(min(100.0, max(0.0, value)), 2))
+    return values
+
+def sorted_list(stream, window, percentile):
+    """GPU/CPUUsageMonitor before: list append + pop(0), then sort the window for each sample."""
+    samples, out = [], []
+    for value in stream:
+        samples.append(value)
+        if len(samples) > window:
+            samples.pop(0)
+        out.append(percentile_of_sorted(sorted(samples), percentile))
+    return out
+
+def numpy_deque(stream, window, percentile):
+    """LHMSensor before: np.percentile over a bounded deque for each sample."""
+    samples, out = deque(maxlen=window), []
+    for value in stream:
+        samples.append(value)
+        out.append(float(np.percentile(samples, percentile)))
+    return out
+
+def rolling(stream, window, percentile):
+    samples, out = RollingQuantiles(window, (percentile,)), []
+    for value in stream:
+        samples.add(value)
+        out.append(samples.quantile(percentile))
+    return out
+
+def rolling_multi(stream, window, percentile):
+    """Three quantiles per sample from one window (e.g. median, the control percentile and p99)."""
+    samples, out = RollingQuantiles(window, (50, percentile, 99)), []
+    for value in stream:
+        samples.add(value)
+        out.append(samples.current())
+    return out
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Rolling percentile benchmark')
+    parser.add_argument('--windows', type=int, nargs='+', default=[20, 100, 500, 2000])
+    parser.add_argument('--samples', type=int, default=20000, help='Samples streamed per window size')
+    parser.add_argument('--percentile', type=float, default=70)
+    args = parser.parse_args()
+
+    stream = load_stream(args.samples)
+    print(f"Samples per run: {args.samples}, percentile: {args.percentile}")
+    print(f"{'window':>7} | {'sort list':>10} | {'np deque':>10} | {'rolling':>10} | {'rolling x3':>10} | {'speedup':>8}   (us per sample)")
+
+    for window in args.windows:
+        reference, sort_time = timed(sorted_list, stream, window, args.percentile)
+        numpy_result, numpy_time = timed(numpy_deque, stream, window, args.percentile)
+        result, rolling_time = timed(rolling, stream, window, args.percentile)
+        multi, multi_time = timed(rolling_multi, stream, window, args.percentile)
+
+        # Sanity check: every approach reports the same percentiles
+        assert all(abs(a - b) < 1e-9 for a, b in zip(reference, result))
+        assert all(abs(a - b) < 1e-9 for a, b in zip(numpy_result, result))
+        assert all(abs(a[1] - b) < 1e-9 for a, b in zip(multi, result))
+
+        per = 1e6 / args.samples
+        print(f"{window:>7} | {sort_time * per:>10.2f} | {numpy_time * per:>10.2f} | {rolling_time * per:>10.2f} | "
+              f"{multi_time * per:>10.2f} | {min(sort_time, numpy_time) / rolling_time:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# bench_rtss_parse.py
+# Compares the per-entry struct loop previously used by RTSSInterface with the
+# vectorized structured-dtype parse in core.rtss_shared_memory.
+#
+# Usage: python src/benchmarks/bench_rtss_parse.py [--entries 256] [--repeat 2000]
+
+import argparse
+import os
+import struct
+import sys
+import timeit
+
+_this_dir = os.path.abspath(os.path.dirname(__file__))
+_root = os.path.dirname(_this_dir)  # Gets src directory
+if _root not in sys.path:
+    sys.path.insert(0, _root)
+
+from core.rtss_shared_memory import HEADER_FORMAT, HEADER_SIZE, APP_ENTRY_FORMAT, APP_ENTRY_SIZE, parse_app_entries
+
+# sizeof(RTSS_SHARED_MEMORY_APP_ENTRY) for RTSS 7.3.x
+ENTRY_SIZE = 6212
+
+def build_buffer(entries):
+    """Builds a synthetic RTSS V2 shared memory block with the given number of app entries."""
+    buf = bytearray(HEADER_SIZE + entries * ENTRY_SIZE)
+    struct.pack_into(HEADER_FORMAT, buf, 0, b'SSTR', 0x00020015, ENTRY_SIZE, HEADER_SIZE, entries, 0, 0, 0, 0)
+    for i in range(entries):
+        name = f"C:\\Games\\game_{i}\\game_{i}.exe".encode()
+        struct.pack_into(APP_ENTRY_FORMAT, buf, HEADER_SIZE + i * ENTRY_SIZE,
+                         1000 + i, name, 0, 5000 + i, 6000 + i, 60 + i % 60, 16666)
+    return bytes(buf)
+
+def loop_parse(buf, entries):
+    """The previous approach: slice + struct.unpack per entry (with explicit sizes)."""
+    result = []
+    for dwEntry in range(entries):
+        entry = HEADER_SIZE + dwEntry * ENTRY_SIZE
+        stump = buf[entry:entry + APP_ENTRY_SIZE]
+        dwProcessID, szName, dwFlags, dwTime0, dwTime1, dwFrames, dwFrameTime = struct.unpack(APP_ENTRY_FORMAT, stump)
+        result.append((dwProcessID, dwFlags, dwTime0, dwTime1, dwFrames, dwFrameTime))
+    return result
+
+def vectorized_parse(buf, entries):
+    parsed = parse_app_entries(buf, HEADER_SIZE, ENTRY_SIZE, entries)
+    return {field: parsed[field] for field in ('pid', 'flags', 'time0', 'time1', 'frames', 'frametime')}
+
+def main():
+    parser = argparse.ArgumentParser(description='RTSS app entry parsing benchmark')
+    parser.add_argument('--entries', type=int, default=256)
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    buf = build_buffer(args.entries)
+
+    # Sanity check: both parsers agree
+    looped = loop_parse(buf, args.entries)
+    vectorized = vectorized_parse(buf, args.entries)
+    assert [row[0] for row in looped] == vectorized['pid'].tolist()
+    assert [row[4] for row in looped] == vectorized['frames'].tolist()
+
+    loop_time = timeit.timeit(lambda: loop_parse(buf, args.entries), number=args.repeat)
+    vec_time = timeit.timeit(lambda: vectorized_parse(buf, args.entries), number=args.repeat)
+
+    print(f"Entries: {args.entries}, repeats: {args.repeat}")
+    print(f"struct loop : {loop_time / args.repeat * 1e6:9.2f} us per parse")
+    print(f"vectorized  : {vec_time / args.repeat * 1e6:9.2f} us per parse")
+    print(f"speedup     : {loop_time / vec_time:9.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# bench_rtss_reader.py
+# Load-tests RTSSSharedMemoryReader against the file-backed RTSS stand-in while
+# core.rtss_shm_writer animates it (entries appearing/disappearing, counters advancing).
+#
+# Usage: python src/benchmarks/bench_rtss_reader.py [--slots 256] [--active 64] [--duration 5]
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+_this_dir = os.path.abspath(os.path.dirname(__file__))
+_root = os.path.dirname(_this_dir)  # Gets src directory
+if _root not in sys.path:
+    sys.path.insert(0, _root)
+
+from core.rtss_shared_memory import RTSSSharedMemoryReader, FileMappingBackend
+from core.rtss_shm_writer import RTSSSharedMemoryFileWriter
+
+def summarize(label, timings):
+    timings.sort()
+    count = len(timings)
+    if not count:
+        print(f"{label:<22}: no samples")
+        return
+    avg = sum(timings) / count
+    p99 = timings[min(count - 1, int(count * 0.99))]
+    print(f"{label:<22}: {count:7d} calls, avg {avg * 1e6:8.2f} us, p99 {p99 * 1e6:8.2f} us")
+
+def main():
+    parser = argparse.ArgumentParser(description='RTSS shared memory reader load test')
+    parser.add_argument('--slots', type=int, default=256)
+    parser.add_argument('--active', type=int, default=64)
+    parser.add_argument('--churn', type=float, default=0.01)
+    parser.add_argument('--duration', type=float, default=5.0)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), "dfl_rtss_shm_bench.bin")
+    writer = RTSSSharedMemoryFileWriter(path, slots=args.slots, seed=1)
+    writer_thread = threading.Thread(target=writer.animate,
+                                     kwargs={"duration": args.duration + 0.5, "active": args.active, "churn": args.churn},
+                                     daemon=True)
+    writer_thread.start()
+    time.sleep(0.1)
+
+    reader = RTSSSharedMemoryReader(backend=FileMappingBackend(path))
+    lookup_times = []
+    snapshot_times = []
+    hits = 0
+    end = time.monotonic() + args.duration
+    while time.monotonic() < end:
+        pids = [app.pid for app in list(writer.apps.values())]
+        pid = random.choice(pids) if pids else 0
+
+        t0 = time.perf_counter()
+        entry = reader.read_app_entry(pid)
+        lookup_times.append(time.perf_counter() - t0)
+        hits += entry is not None
+
+        t0 = time.perf_counter()
+        reader.read_app_entries()
+        snapshot_times.append(time.perf_counter() - t0)
+
+    writer_thread.join()
+    reader.close()
+    writer.close()
+    os.remove(path)
+
+    print(f"Slots: {args.slots}, active apps: {args.active}, churn: {args.churn}")
+    summarize("read_app_entry(pid)", lookup_times)
+    summarize("read_app_entries()", snapshot_times)
+    print(f"PID hit rate: {hits / max(1, len(lookup_times)):.1%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# bench_sample_store.py
+# Compares LHMSensor's per-sensor history (a rolling percentile window plus a 600 long
+# deque per sensor, with statistics.mean/stdev/median per sensor for the summary) with
+# the same rolling windows plus core.sample_store.SampleRingStore for the long history,
+# which keeps every sensor in one float32 array and computes the summary stats for all
+# of them in one vectorized call. The last column times taking the control percentile
+# from the store instead (np.percentile over the window each poll), without the summary.
+#
+# Usage: python src/benchmarks/bench_sample_store.py [--sensors 12 48 96] [--polls 3000] [--window 20] [--history 600] [--stats-every 10]
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+
+_this_dir = os.path.abspath(os.path.dirname(__file__))
+_root = os.path.dirname(_this_dir)  # Gets src directory
+if _root not in sys.path:
+    sys.path.insert(0, _root)
+
+from core.rolling_quantile import RollingQuantiles
+from core.sample_store import SampleRingStore
+
+def sensor_polls(sensors, polls, seed=1):
+    """Synthetic LHM polls: each sensor wanders around its own level (loads, temperatures, watts)."""
+    rng = random.Random(seed)
+    keys = [("Load" if i % 3 == 0 else "Temperature" if i % 3 == 1 else "Power", f"{i // 16 + 1} Sensor {i}")
+            for i in range(sensors)]
+    levels = [rng.uniform(20, 90) for _ in keys]
+    stream = []
+    for _ in range(polls):
+        poll = {}
+        for i, key in enumerate(keys):
+            levels[i] = min(100.0, max(0.0, levels[i] + rng.gauss(0, 1.0)))
+            poll[key] = round(levels[i] + rng.gauss(0, 2.0), 2)
+        stream.append(poll)
+    return stream
+
+def per_sensor(stream, window, history, percentile, stats_every):
+    """LHMSensor before: a window and a long deque per sensor, statistics module per sensor."""
+    short = defaultdict(lambda: RollingQuantiles(window, (percentile,)))
+    long = defaultdict(lambda: deque(maxlen=history))
+    percentiles = {}
+    summaries = []
+    for i, poll in enumerate(stream, start=1):
+        for key, value in poll.items():
+            short[key].add(value)
+            long[key].append(value)
+            percentiles[key] = round(short[key].quantile(percentile), 2)
+        if i % stats_every == 0:
+            summaries.append({
+                key: (statistics.mean(values), statistics.stdev(values) if len(values) > 1 else 0.0,
+                      statistics.median(values))
+                for key, values in long.items()
+            })
+    return percentiles, summaries
+
+def ring_store(stream, window, history, percentile, stats_every):
+    """LHMSensor now: the same rolling percentile windows, the long history in one SampleRingStore."""
+    short = defaultdict(lambda: RollingQuantiles(window, (percentile,)))
+    store = SampleRingStore(max(history, window), sensors=len(stream[0]))
+    percentiles = {}
+    summaries = []
+    for i, poll in enumerate(stream, start=1):
+        for key, value in poll.items():
+            short[key].add(value)
+            percentiles[key] = round(short[key].quantile(percentile), 2)
+        store.append(poll)
+        if i % stats_every == 0:
+            stats = store.stats()
+            summaries.append({
+                key: (stats["mean"][row], stats["std"][row], stats["median"][row])
+                for row, key in enumerate(store.keys())
+            })
+    return percentiles, summaries
+
+def store_percentile(stream, window, history, percentile, stats_every):
+    """The control percentile from the store too (np.percentile over the window every poll), for comparison."""
+    store = SampleRingStore(max(history, window), sensors=len(stream[0]))
+    current = None
+    for poll in stream:
+        store.append(poll)
+        current = np.round(store.percentile(percentile, window), 2)
+    return dict(zip(store.keys(), current))
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Sensor history store benchmark')
+    parser.add_argument('--sensors', type=int, nargs='+', default=[12, 48, 96])
+    parser.add_argument('--polls', type=int, default=3000)
+    parser.add_argument('--window', type=int, default=20, help='Polls in the control percentile window')
+    parser.add_argument('--history', type=int, default=600, help='Polls kept for the summary stats')
+    parser.add_argument('--percentile', type=float, default=70)
+    parser.add_argument('--stats-every', type=int, default=10, help='Polls per summary (control tick / poll interval)')
+    args = parser.parse_args()
+
+    print(f"Polls: {args.polls}, window: {args.window}, history: {args.history}, summary every {args.stats_every} polls")
+    print(f"{'sensors':>7} | {'per sensor':>11} | {'ring store':>11} | {'speedup':>8} | {'np pct/poll':>11}   (us per poll)")
+
+    for sensors in args.sensors:
+        stream = sensor_polls(sensors, args.polls)
+        (ref_pct, ref_sum), ref_time = timed(per_sensor, stream, args.window, args.history, args.percentile, args.stats_every)
+        (pct, summ), store_time = timed(ring_store, stream, args.window, args.history, args.percentile, args.stats_every)
+        np_pct, np_time = timed(store_percentile, stream, args.window, args.history, args.percentile, args.stats_every)
+
+        # Sanity check: same percentiles and summaries (float32 storage, so within 0.01)
+        assert all(ref_pct[k] == pct[k] for k in ref_pct)
+        assert all(abs(ref_pct[k] - np_pct[k]) <= 0.011 for k in ref_pct)
+        for ref, got in zip(ref_sum, summ):
+            assert all(abs(a - b) < 0.01 for k in ref for a, b in zip(ref[k], got[k]))
+
+        per = 1e6 / args.polls
+        print(f"{sensors:>7} | {ref_time * per:>11.1f} | {store_time * per:>11.1f} | {ref_time / store_time:>7.1f}x | "
+              f"{np_time * per:>11.1f}")
+
+    store = SampleRingStore(args.history, sensors=max(args.sensors))
+    print(f"Ring store memory for {max(args.sensors)} sensors: {store._data.nbytes / 1024:.0f} KiB, fixed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# gpu_engine_usage.py
+# Shows how GPUUsageMonitor splits "GPU Engine" 3D utilization per process and adapter
+# (LUID), and what each GPU usage scope (all / render / game) reports, for a recorded
+# list of counter instances. The parsing and aggregation are checked against a recording
+# in tests/test_gpu_engine_instances.py.
+#
+# A recording is one "<utilization> <instance name>" per line; --record writes one from
+# the live counters (Windows only).
+#
+# Usage: python src/benchmarks/gpu_engine_usage.py recording.txt [--pid 11804]
+#        python src/benchmarks/gpu_engine_usage.py --record recording.txt [--seconds 1]
+
+import argparse
+import os
+import sys
+import time
+
+_this_dir = os.path.abspath(os.path.dirname(__file__))
+_root = os.path.dirname(_this_dir)  # Gets src directory
+if _root not in sys.path:
+    sys.path.insert(0, _root)
+
+from core.gpu_engine_instances import GPU_USAGE_SCOPES, parse_recording, usage_by_process, usage_by_luid, select_usage
+
+def record(path, seconds):
+    from core.gpu_monitor import PdhInstanceTracker  # Needs Windows PDH
+    tracker = PdhInstanceTracker(engine_type="engtype_")
+    tracker.refresh(force=True)
+    tracker.collect()
+    time.sleep(seconds)
+    tracker.collect()
+    readings = sorted(tracker.read())
+    tracker.close()
+    with open(path, "w", encoding="utf-8") as f:
+        for name, value in readings:
+            f.write(f"{value:.2f} {name}\n")
+    print(f"Recorded {len(readings)} instances to {path}")
+
+def show(readings, pid=None):
+    per_process = usage_by_process(readings)
+    print(f"{'PID':>8} | {'LUID':>10} | {'3D %':>6}")
+    for (p, luid), value in sorted(per_process.items(), key=lambda item: -item[1]):
+        print(f"{p:>8} | {luid:>10} | {value:>6.1f}")
+    print()
+    for luid, value in sorted(usage_by_luid(per_process).items()):
+        print(f"LUID {luid}: {value:.1f}% 3D")
+    if pid is not None:
+        print()
+        for scope in GPU_USAGE_SCOPES:
+            value, luid, found = select_usage(per_process, scope, pid)
+            note = "" if found or scope == "all" else " (PID not found, all GPUs)"
+            print(f"{scope:>6}: {value:.1f}% on LUID {luid}{note}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-process GPU engine usage from recorded counter instances')
+    parser.add_argument('recording', nargs='?', help='Recorded "<utilization> <instance>" lines')
+    parser.add_argument('--pid', type=int, help='Game PID to show the scopes for')
+    parser.add_argument('--record', metavar='FILE', help='Record the live counters to FILE (Windows)')
+    parser.add_argument('--seconds', type=float, default=1.0, help='Collection interval when recording')
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.record, args.seconds)
+        return
+    if not args.recording:
+        parser.error("a recording file is needed (or --record FILE to make one)")
+    with open(args.recording, encoding="utf-8") as f:
+        show(parse_recording(f.read()), args.pid)
+
+if __name__ == "__main__":
+    main()
@@ -13,7 +13,6 @@ import math
 import os
 import sys
 import csv
-from decimal import Decimal, InvalidOperation
 
 # tweak path so "src/" (or wherever your modules live) is on sys.path
 _this_dir = os.path.abspath(os.path.dirname(__file__))
@@ -32,6 +31,7 @@ from core import logger
 from core.rtss_interface import RTSSInterface
 from core.cpu_monitor import CPUUsageMonitor
 from core.gpu_monitor import GPUUsageMonitor
+from core.gpu_engine_instances import GPU_USAGE_SCOPES
 from core.librehardwaremonitor import LHMSensor
 from core.themes import ThemesManager
 from core.config_manager import ConfigManager
@@ -39,11 +39,22 @@ from core.tooltips import get_tooltips, add_tooltip, apply_all_tooltips, update_
 from core.warning import get_active_warnings
 from core.autostart import AutoStartManager
 from core.rtss_functions import RTSSController
+from core.limiter_queue import LimiterCommandQueue
 from core.fps_utils import FPSUtils
 from core.tray_functions import TrayManager
 from core.autopilot import autopilot_on_check, get_foreground_process_name
 from core.launch_popup import show_loading_popup, hide_loading_popup
 from core.idle_timer import get_idle_duration
+from core.frametime_sampler import FrametimeSampler
+from core.transition_latency import TransitionLatencyTracker
+from core.cap_controller import CapController, CapControllerSettings, ControlSample, CapDecision
+from core.multi_controller import MultiProcessCapManager, ARBITRATION_POLICIES
+from core.critical_alarm import CriticalLoadAlarm
+from core.sampling_scheduler import SamplingScheduler
+from core.tick_scheduler import TickScheduler
+from core.headroom_model import HeadroomPredictor
+from core.fixed_fps import FixedFPS
+from core.trace_replay import TraceRecorder
 
 show_loading_popup(f"Loading Dynamic FPS Limiter {version}...", Base_dir=Base_dir)
 
@@ -52,6 +63,10 @@ Viewport_width = 610
 Viewport_height = 700
 
 rtss = RTSSController(logger)
+limiter_queue = LimiterCommandQueue(rtss, logger)
+transition_tracker = TransitionLatencyTracker()
+limiter_queue.on_applied = transition_tracker.applied
+limiter_queue.on_skipped = transition_tracker.skipped
 themes_manager = ThemesManager(Base_dir)
 cm = ConfigManager(logger, dpg, rtss, None, themes_manager, Base_dir)
 
@@ -103,7 +118,7 @@ running = False  # Flag to control the monitoring loop
 
 cm.update_global_variables()
 
-lhm_sensor = LHMSensor(lambda: running, logger, dpg, themes_manager, 
+lhm_sensor = LHMSensor(logger, dpg, themes_manager, 
                        interval=(cm.lhwmonitorpollinginterval/1000), 
                        max_samples=cm.lhwmonitoringsamples, 
                        percentile=cm.lhwmonitorpercentile,
@@ -122,15 +137,6 @@ def start_stop_callback(sender, app_data, user_data):
     tray.set_running_state(running)
     cm.apply_current_input_values()
     
-    # Reset variables to zero or their default state
-    global fps_values, CurrentFPSOffset, fps_mean, gpu_values, cpu_values, idle_state
-    fps_values = []
-    CurrentFPSOffset = 0
-    fps_mean = 0
-    gpu_values = []
-    cpu_values = []
-    idle_state = False
-    
     # Freeze input fields
     for key in cm.input_field_keys:
         tag = f"input_{key}"
@@ -160,24 +166,27 @@ def start_stop_callback(sender, app_data, user_data):
         global elapsed_time
         elapsed_time = 0 # Reset elapsed time
         
-        # Start threads
+        # Start the control loop; sensors and the plot run on the sampling scheduler
         monitoring_thread = threading.Thread(target=monitoring_loop, daemon=True)
         monitoring_thread.start()
         lhm_sensor.start()
+        frametime_sampler.start()
         logger.add_log("Monitoring started")
-        plotting_thread = threading.Thread(target=plotting_loop, daemon=True)
-        plotting_thread.start()
+        global plot_start_time
+        plot_start_time = time.time()
+        sampling.start()
         logger.add_log("Plotting started")
         fps_utils.reset_summary_statistics()
     else:
+        sampling.stop()  # Parks the sampling thread until the next start
         reset_stats()
         
         
         logger.add_log("Monitoring stopped")
     logger.add_log(f"Custom FPS limits: {cm.parse_decimal_set_to_string(fps_utils.current_stepped_limits())}")
 
-    rtss.set_fractional_fps_direct(cm.current_profile, Decimal(max(fps_utils.current_stepped_limits())))
-    rtss.set_fractional_framerate(cm.current_profile, Decimal(max(fps_utils.current_stepped_limits()))) #To update GUI
+    cap_ladder = fps_utils.current_ladder()
+    limiter_queue.submit(cm.current_profile, cap_ladder.fixed(cap_ladder.max), force=True)
 
 def reset_stats():
     
@@ -201,7 +210,7 @@ cpu_usage_series = []
 fps_series = []
 cap_series = []
 max_points = 600
-elapsed_time = 0 # Global time updated by plotting_loop
+elapsed_time = 0 # Global time updated by plot_tick
 
 def update_plot_FPS(fps_val, cap_val):
 # Uses fps_time_series    
@@ -221,14 +230,16 @@ def update_plot_FPS(fps_val, cap_val):
     dpg.set_value("fps_series", [fps_time_series, fps_series])
     dpg.set_value("cap_series", [fps_time_series, cap_series])  
 
-    fps_limit_list = fps_utils.current_stepped_limits()
-
-    current_mincap = min(fps_limit_list)
-    current_maxcap = max(fps_limit_list)
-    min_ft = current_mincap - round((current_maxcap - current_mincap) * Decimal('0.1'))
-    max_ft = current_maxcap + round((current_maxcap - current_mincap)* Decimal('0.1'))
+    cap_ladder = fps_utils.current_ladder()
+    if cap_ladder:
+        min_ft, max_ft = fps_axis_range(cap_ladder)
+        dpg.set_axis_limits("y_axis_right", cap_ladder.to_fps(min_ft), cap_ladder.to_fps(max_ft))
 
-    dpg.set_axis_limits("y_axis_right", min_ft, max_ft) 
+def fps_axis_range(cap_ladder):
+    """FPS axis limits in ladder units: the ladder's range plus 10% (rounded to whole FPS) on each side."""
+    denominator = cap_ladder.denominator
+    margin = (cap_ladder.max - cap_ladder.min + 5 * denominator) // (10 * denominator) * denominator
+    return cap_ladder.min - margin, cap_ladder.max + margin
 
 def update_plot_usage(time_val, gpu_val, cpu_val):
    
@@ -264,15 +275,37 @@ def update_plot_usage(time_val, gpu_val, cpu_val):
     else:
         dpg.set_axis_limits_auto("x_axis")
 
-fps_values = []
-gpu_values = []
-cpu_values = []
-CurrentFPSOffset = 0
-fps_mean = 0
-idle_state = False
+cap_controller = None
+headroom_predictor = HeadroomPredictor()  # Outlives monitoring runs, so models keep learning per process
+control_ticks = TickScheduler(cm.controltickinterval / 1000)
+# Set by the GPU / LibreHM samplers when a critical threshold is crossed; wakes the monitoring loop early
+critical_alarm = CriticalLoadAlarm()
+lhm_sensor.critical_alarm = critical_alarm
+
+def submit_fps_cap(profile_name, framerate):
+    # Timestamps the decision for the transition latency diagnostics
+    transition_tracker.decided(profile_name, framerate)
+    limiter_queue.submit(profile_name, framerate)
+
+def open_trace_recorder():
+    """Starts a trace in config/traces when 'Record session traces' is on (replay with benchmarks/replay_trace.py)."""
+    if not getattr(cm, "record_trace", False):
+        return None
+    monitoring_method = dpg.get_value("input_monitoring_method")
+    settings = CapControllerSettings.from_config(cm, monitoring_method, control_ticks.interval * 1000)
+    values = {key: str(getattr(cm, key)) for key in cm.input_field_keys if hasattr(cm, key)}
+    values.update(settings.to_mapping())
+    try:
+        recorder = TraceRecorder.open_session(os.path.join(cm.config_dir, "traces"), header={
+            "tick_interval_ms": settings.tick_interval_ms, "profile": cm.current_profile, "settings": values})
+    except OSError as e:
+        logger.add_log(f"Could not start trace recording: {e}")
+        return None
+    logger.add_log(f"Recording control trace to {recorder.path}")
+    return recorder
 
 def monitoring_loop():
-    global running, fps_values, CurrentFPSOffset, fps_mean, gpu_values, cpu_values, idle_state
+    global running, cap_controller
     global max_points
 
     last_process_name = None
@@ -280,18 +313,51 @@ def monitoring_loop():
 
     gpu_monitor.reinitialize()
 
-    fps_limit_list = fps_utils.current_stepped_limits()
+    cap_ladder = fps_utils.current_ladder()
+
+    min_ft, max_ft = fps_axis_range(cap_ladder)
 
-    current_mincap = min(fps_limit_list)
-    current_maxcap = max(fps_limit_list)
-    min_ft = current_mincap - round((current_maxcap - current_mincap) * Decimal('0.1'))
-    max_ft = current_maxcap + round((current_maxcap - current_mincap) * Decimal('0.1'))
+    cap_controller = CapController(cap_ladder, headroom=headroom_predictor)
+    settings_key = None  # (settings_version, monitoring_method) the controller settings were built from
+    control_ticks.reset()
 
-    increase_cooldown = 0 # Cooldown for increasing FPS cap
+    multi_manager = None
+    if getattr(cm, "multi_process_mode", False):
+        # One controller per hooked app with a profile; the single controller keeps Global
+        multi_manager = MultiProcessCapManager(cm.profiles_config, policy=cm.arbitration_policy,
+                                               tick_interval_ms=control_ticks.interval * 1000,
+                                               headroom=headroom_predictor, logger_instance=logger)
+
+    trace_recorder = open_trace_recorder()
+    trace_start = time.monotonic()
+    applied_cap = cap_ladder.fixed(cap_ladder.max)  # Cap in effect, including the idle cap
+    process_name = None
+    critical_alarm.reset()
 
     while running:
+        if control_ticks.wait(critical_alarm.event) is None:
+            # A sampler crossed a critical threshold: drop now, the tick deadline stays as it was
+            trips = critical_alarm.consume()
+            rungs = cm.criticaldroprungs
+            if multi_manager is not None:
+                drops = multi_manager.emergency_drop(rungs)
+            elif process_name and process_name not in cap_controller.settings.ignored_processes:
+                drops = [(cm.current_profile, cap_controller.emergency_drop(rungs))]
+            else:
+                drops = []
+            for profile, drop in drops:
+                if drop.changed:
+                    submit_fps_cap(profile, drop.cap)
+                    if profile == cm.current_profile:
+                        applied_cap = drop.cap
+                    logger.add_log(f"Critical load ({', '.join(f'{source}: {value}' for source, value, _ in trips)}): "
+                                   f"{profile} capped to {drop.cap}")
+            continue
         current_profile = cm.current_profile
         fps, process_name = rtss_manager.get_fps_for_active_window()
+        frametime_sampler.set_target(rtss_manager.last_process_id)
+        gpu_monitor.set_target(rtss_manager.last_process_id, cm.gpu_usage_scope)
+        transition_tracker.observe_fps(current_profile, fps)
         #logger.add_log(f"Current highed CPU core load: {cpu_monitor.cpu_percentile}%")
 
         #logger.add_log(f"get_foreground_process_name {get_foreground_process_name()}")
@@ -331,122 +397,65 @@ def monitoring_loop():
             cm.load_profile_callback(None, process_name, None)
             cm.apply_current_input_values()
 
-        if fps:
-            if len(fps_values) > 2:
-                fps_values.pop(0)
-            fps_values.append(fps)
-            fps_mean = sum(fps_values) / len(fps_values)
-        
         gpuUsage = gpu_monitor.gpu_percentile
-        if len(gpu_values) > (max(cm.delaybeforedecrease, cm.delaybeforeincrease)+1):
-            gpu_values.pop(0)
-        gpu_values.append(gpuUsage)
-
         cpuUsage = cpu_monitor.cpu_percentile
-        if len(cpu_values) > (max(cm.delaybeforedecrease, cm.delaybeforeincrease)+1):
-            cpu_values.pop(0)
-        cpu_values.append(cpuUsage)
 
-        idle_secs = get_idle_duration()
+        monitoring_method = dpg.get_value("input_monitoring_method")
+        if settings_key != (cm.settings_version, monitoring_method):
+            # Only rebuilt after a config callback changed something (or the method changed)
+            settings_key = (cm.settings_version, monitoring_method)
+            cap_controller.settings = CapControllerSettings.from_config(cm, monitoring_method, control_ticks.interval * 1000)
+            if multi_manager is not None:
+                multi_manager.config_changed(cap_controller.settings.to_mapping())
+        frametime_stats = frametime_sampler.get_stats(window_seconds=cm.delaybeforedecrease / 1000)
+        uses_lhm = monitoring_method == "LibreHM" or (monitoring_method == "PID" and cm.pid_signal == "LibreHM")
+        # Critical thresholds of the signals this method uses, checked by the samplers between ticks
+        gpu_monitor.critical_threshold = 0 if monitoring_method == "LibreHM" else getattr(cm, "gpucriticalload", 0)
+        lhm_sensor.critical_thresholds = fps_utils.critical_sensor_thresholds() if uses_lhm else {}
+        sample = ControlSample(
+            fps=fps,
+            gpu=gpuUsage,
+            cpu=cpuUsage,
+            idle_seconds=get_idle_duration(),
+            process_name=process_name,
+            sensor_readings=tuple(fps_utils.collect_lhm_readings()) if uses_lhm else (),
+            frametime_spikes=frametime_stats["spikes"] if frametime_stats else None,
+        )
+
+        if multi_manager is not None:
+            multi_manager.policy = cm.arbitration_policy
+            for profile, profile_decision in multi_manager.tick(
+                    rtss_manager.snapshot(), gpuUsage, cpuUsage, sample.idle_seconds, sample.sensor_readings,
+                    rtss_manager.last_process_id, sample.frametime_spikes):
+                submit_fps_cap(profile, profile_decision.cap)
 
         #TODO: if no LHM sensor selected, pass through without limiting
-        # To prevent loading screens from affecting the fps cap
-        if gpuUsage and process_name not in {"DynamicFPSLimiter.exe"}:
-            if idle_secs < cm.idle_fps_delay or not cm.idle_mode:
-                if idle_state:
-                    rtss.set_fractional_framerate(current_profile, last_active_fps_cap)
-                    idle_state = False
-                else:
-                    if gpuUsage > cm.minvalidgpu and fps_mean > cm.minvalidfps: 
-
-                        should_decrease, should_increase = fps_utils.evaluate_cap_change(gpu_values, cpu_values)
-
-                        if CurrentFPSOffset > (current_mincap - current_maxcap) and should_decrease:
-                            current_fps_cap = current_maxcap + CurrentFPSOffset
-                            try:
-                                # Find values lower than current fps_mean
-                                lower_values = [x for x in fps_limit_list if x < fps_mean]
-                                
-                                if lower_values:
-                                    # If current cap is already lower than fps_mean
-                                    if current_fps_cap <= fps_mean:
-                                        # Get current index and move to next lower value
-                                        current_index = fps_limit_list.index(current_fps_cap)
-                                        if current_index < 0:
-                                            next_fps = fps_limit_list[current_index - 1]
-                                            CurrentFPSOffset = next_fps - current_maxcap
-                                            rtss.set_fractional_framerate(current_profile, next_fps)
-                                    else:
-                                        # Jump to highest value below fps_mean
-                                        next_fps = max(lower_values)
-                                        CurrentFPSOffset = next_fps - current_maxcap
-                                        rtss.set_fractional_framerate(current_profile, next_fps)
-                            except ValueError:
-                                # If current FPS not in list, find nearest lower value
-                                lower_values = [x for x in fps_limit_list if x < current_fps_cap]
-                                if lower_values:
-                                    next_fps = max(lower_values)
-                                    CurrentFPSOffset = next_fps - current_maxcap
-                                    rtss.set_fractional_framerate(current_profile, next_fps)
-
-                        # --- COOLDOWN LOGIC ---
-                        if increase_cooldown > 0:
-                            increase_cooldown -= 1
-
-                        if CurrentFPSOffset < 0 and should_increase and increase_cooldown == 0:
-                            current_fps = current_maxcap + CurrentFPSOffset
-                            gpu_range = cm.gpucutofffordecrease - cm.gpucutoffforincrease
-                            last_gpu = gpu_values[-1] if gpu_values else 0
-
-                            # Determine how many steps to increase
-                            steps = 1 # removed step logic to prevent unintended consequences with newer methods
-                            #threshold = cm.gpucutoffforincrease - gpu_range
-                            #while last_gpu < threshold and (threshold > cm.minvalidgpu):
-                            #    steps += 1
-                            #    threshold = cm.gpucutoffforincrease - gpu_range * steps
-
-                            try:
-                                current_index = fps_limit_list.index(current_fps)
-                                next_index = min(current_index + steps, len(fps_limit_list) - 1)
-                                if next_index > current_index:
-                                    next_fps = fps_limit_list[next_index]
-                                    CurrentFPSOffset = next_fps - current_maxcap
-                                    rtss.set_fractional_framerate(current_profile, next_fps)
-                                    increase_cooldown = cm.delaybeforeincrease  # Start cooldown
-                            except ValueError:
-                                # If current FPS not in list, find nearest higher value
-                                higher_values = [x for x in fps_limit_list if x > current_fps]
-                                if higher_values:
-                                    # Find the index of the smallest higher value
-                                    min_higher = min(higher_values)
-                                    min_higher_index = fps_limit_list.index(min_higher)
-                                    next_index = min(min_higher_index + steps - 1, len(fps_limit_list) - 1)
-                                    next_fps = fps_limit_list[next_index]
-                                    CurrentFPSOffset = next_fps - current_maxcap
-                                    rtss.set_fractional_framerate(current_profile, next_fps)
-                                    increase_cooldown = cm.delaybeforeincrease  # Start cooldown
-            else:
-                if idle_state:
-                    pass
-                else:
-                    last_active_fps_cap = current_maxcap + CurrentFPSOffset
-                    rtss.set_fractional_framerate(current_profile, cm.idle_fps_cap)
-                    idle_state = True
+        if multi_manager is not None and (current_profile in multi_manager.tracked
+                                          or process_name in multi_manager.tracked):
+            decision = CapDecision(None, "skip")  # That app's own controller caps it
+        else:
+            decision = cap_controller.step(sample)
+        if trace_recorder:
+            trace_recorder.write(time.monotonic() - trace_start, sample, applied_cap)
+        if decision.changed:
+            submit_fps_cap(current_profile, decision.cap)
+            applied_cap = decision.cap
 
         if running:
             # Update legend labels with current values
             dpg.configure_item("gpu_usage_series", label=f"GPU: {gpuUsage}%")
             if running and fps is not None:
                 dpg.configure_item("fps_series", label=f"FPS: {fps:.1f}")
-            dpg.configure_item("cap_series", label=f"Cap: {current_maxcap + CurrentFPSOffset}")
+            dpg.configure_item("cap_series", label=f"Cap: {cap_controller.current_cap_fixed}")
             dpg.configure_item("cpu_usage_series", label=f"CPU: {cpuUsage}%")
+            dpg.set_value("luid_status_text", gpu_monitor.describe_target())
 
             # Update plot if fps is valid
             if fps and process_name not in {"DynamicFPSLimiter.exe"}:
-                # Scaling FPS value to fit 0-100 axis
-                scaled_fps = ((fps - min_ft)/(max_ft - min_ft)) * Decimal('100')
-                scaled_cap = ((Decimal(current_maxcap) + Decimal(CurrentFPSOffset) - min_ft)/(max_ft - min_ft)) * Decimal('100')
-                actual_cap = current_maxcap + CurrentFPSOffset
+                # Scaling FPS value to fit 0-100 axis (integer ladder units, one division each)
+                scaled_fps = (cap_ladder.to_units(fps) - min_ft) * 100 / (max_ft - min_ft)
+                actual_cap = cap_controller.current_cap
+                scaled_cap = (actual_cap - min_ft) * 100 / (max_ft - min_ft)
                 # Pass actual values, update_plot_FPS handles timing and lists
                 update_plot_FPS(scaled_fps, scaled_cap)
 
@@ -456,34 +465,64 @@ def monitoring_loop():
                 fps_utils.summary_fps.append(fps)
                 if len(fps_utils.summary_cap) >= 600:
                     fps_utils.summary_cap.pop(0)
-                fps_utils.summary_cap.append(actual_cap)
+                fps_utils.summary_cap.append(cap_ladder.to_fps(actual_cap))
 
         # Update last_process_name
         if process_name:
             last_process_name = process_name
 
-        time.sleep(1) # This loop runs every 1 second
-
-def plotting_loop():
-    global running, elapsed_time # Make sure elapsed_time is global
-
-    start_time = time.time()
-    while running:
-        # Calculate elapsed time SINCE start_time
-        elapsed_time = time.time() - start_time
-
-        fps_utils.elapsed_time = elapsed_time 
-
-        gpuUsage = gpu_monitor.gpu_percentile
-        cpuUsage = cpu_monitor.cpu_percentile
-
-        # CALL update_plot_usage with the current time and usage values
-        update_plot_usage(elapsed_time, gpuUsage, cpuUsage)
-
-        time.sleep(math.lcm(cm.gpupollinginterval, cm.cpupollinginterval) / 1000.0)  # Convert to seconds
-
-        #Update summary statistics
-        fps_utils.update_summary_statistics()
+    if multi_manager is not None:
+        for profile, tracked in multi_manager.tracked.items():
+            submit_fps_cap(profile, tracked.controller.ladder.fixed(tracked.controller.max_cap))
+
+    if trace_recorder:
+        trace_recorder.close()
+        logger.add_log(f"Control trace saved: {trace_recorder.samples} ticks in {trace_recorder.path}")
+
+plot_start_time = time.time()
+
+def plot_tick():
+    # Run by the sampling scheduler every lcm(GPU, CPU polling interval) while monitoring
+    global elapsed_time # Make sure elapsed_time is global
+
+    # Calculate elapsed time SINCE plot_start_time
+    elapsed_time = time.time() - plot_start_time
+
+    fps_utils.elapsed_time = elapsed_time 
+
+    gpuUsage = gpu_monitor.gpu_percentile
+    cpuUsage = cpu_monitor.cpu_percentile
+
+    # CALL update_plot_usage with the current time and usage values
+    update_plot_usage(elapsed_time, gpuUsage, cpuUsage)
+
+    #Update summary statistics
+    fps_utils.update_summary_statistics()
+    update_diagnostics()
+
+def update_diagnostics():
+    q = limiter_queue.get_stats()
+    text = (f"RTSS writes: {q['writes']} in {q['batches']} batches, coalesced: {q['coalesced']}, "
+            f"skipped: {q['skipped']}, queued: {q['queue_depth']}\n"
+            f"Write latency: last {q['last_write_latency_ms']:.1f} ms, avg {q['avg_write_latency_ms']:.1f} ms, "
+            f"max {q['max_write_latency_ms']:.1f} ms\n\n")
+    t = control_ticks.get_stats()
+    text += (f"Control tick: {t['interval_ms']:.0f} ms, ticks: {t['ticks']}, overruns: {t['overruns']} "
+             f"(skipped {t['skipped_ticks']}), jitter avg {t['jitter_avg_ms']:.1f} ms, "
+             f"p99 {t['jitter_p99_ms']:.1f} ms, max {t['jitter_max_ms']:.1f} ms\n"
+             f"Critical load alarms: {critical_alarm.trips}\n")
+    g = gpu_monitor.get_stats()
+    text += (f"GPU counters: {g['counters']} on {g['queries_open']} PDH query (opened {g['queries_opened']}), "
+             f"rescans: {g['enumerations']} (merged {g['rate_limited']}), added: {g['added']}, "
+             f"removed: {g['removed']}, failed adds: {g['add_failures']}, failed reads: {g['read_failures']}, "
+             f"leaked handles: {g['leaked']}\n\n")
+    for name, stats in sampling.get_stats().items():
+        text += (f"{name} sampling: every {stats['interval_ms']:.0f} ms, runs: {stats['runs']} "
+                 f"(skipped {stats['skipped']}), jitter avg {stats['jitter_avg_ms']:.1f} ms, "
+                 f"p99 {stats['jitter_p99_ms']:.1f} ms, max {stats['jitter_max_ms']:.1f} ms, "
+                 f"takes {stats['busy_avg_ms']:.1f} ms\n")
+    text += "\n"
+    dpg.set_value("DiagnosticsText", text + transition_tracker.format_report())
 
 gui_running = True
 
@@ -560,18 +599,18 @@ def autopilot_loop():
         time.sleep(1)  
 
 def exit_gui():
-    global running, gui_running, rtss_manager, monitoring_thread, plotting_thread
+    global running, gui_running, rtss_manager, monitoring_thread
     
     gui_running = False
     running = False 
 
     if cm.globallimitonexit:
-        rtss.set_fractional_framerate("Global", Decimal(cm.globallimitonexit_fps))
+        limiter_queue.submit("Global", FixedFPS(int(cm.globallimitonexit_fps)), force=True)
+    limiter_queue.stop()  # Writes anything still queued
 
+    sampling.shutdown()
     if gpu_monitor:
         gpu_monitor.cleanup()
-    if cpu_monitor:
-        cpu_monitor.stop()
     if lhm_sensor:
         lhm_sensor.stop()
     if dpg.is_dearpygui_running():
@@ -591,15 +630,6 @@ tray = TrayManager(
 
 cm.tray = tray  # Set tray manager in ConfigManager
 
-def toggle_luid_selection():
-    """
-    Wrapper function to prevent a 'gpu_monitor' not found error when DearPyGui builds the UI.
-
-    This function is defined early so that it can be referenced as a callback in the UI layout,
-    before the actual gpu_monitor instance is initialized later in the script.
-    """
-    gpu_monitor.toggle_luid_selection()
-
 # Defining short sections of the GUI
 def build_profile_section():
     with dpg.child_window(width=-1, height=140):
@@ -723,12 +753,35 @@ def build_readings_window():
                             dpg.add_input_text(tag="summary_cap_std", multiline=False, readonly=True, width=column_width)
                             dpg.add_input_text(tag="summary_cap_median", multiline=False, readonly=True, width=column_width)
                             dpg.add_input_text(tag="summary_cap_mode", multiline=False, readonly=True, width=column_width)
+
+                        # Row: Frametime (sampled by FrametimeSampler)
+                        with dpg.table_row():
+                            dpg.add_text("Sampled frametime (ms)")
+                            dpg.add_input_text(tag="summary_ft_avg", multiline=False, readonly=True, width=column_width)
+                            dpg.add_input_text(tag="summary_ft_std", multiline=False, readonly=True, width=column_width)
+                            dpg.add_input_text(tag="summary_ft_median", multiline=False, readonly=True, width=column_width)
+                            dpg.add_input_text(tag="summary_ft_mode", multiline=False, readonly=True, width=column_width)
+                    with dpg.group(horizontal=True):
+                        dpg.add_text("Sampled 1% low:")
+                        dpg.add_input_text(tag="summary_low_1", multiline=False, readonly=True, width=70)
+                        dpg.add_text("0.1% low:")
+                        dpg.add_input_text(tag="summary_low_01", multiline=False, readonly=True, width=70)
+                        dpg.add_text("Spikes:")
+                        dpg.add_input_text(tag="summary_spikes", multiline=False, readonly=True, width=70)
                     dpg.add_spacer(height=1)
                     dpg.add_text("LHM sensor summary:")
-                    with dpg.child_window(tag="summary_childwindow", width=-1, height=220, border=True):
-                        dpg.add_input_text(tag="SummaryText", multiline=True, readonly=True, width=-1, height=200)
+                    with dpg.child_window(tag="summary_childwindow", width=-1, height=170, border=True):
+                        dpg.add_input_text(tag="SummaryText", multiline=True, readonly=True, width=-1, height=150)
                         dpg.bind_item_theme("SummaryText", themes_manager.themes["transparent_input_theme"])
                         themes_manager.bind_font_to_item("SummaryText", "monospaced_font")
+
+                # Diagnostics tab: cap transition latency (decided -> applied by RTSS -> FPS settled)
+                with dpg.tab(label="Diagnostics", tag="tab_diagnostics"):
+                    dpg.add_spacer(height=1)
+                    with dpg.child_window(tag="diagnostics_childwindow", width=-1, height=363, border=True):
+                        dpg.add_input_text(tag="DiagnosticsText", multiline=True, readonly=True, width=-1, height=345)
+                        dpg.bind_item_theme("DiagnosticsText", themes_manager.themes["transparent_input_theme"])
+                        themes_manager.bind_font_to_item("DiagnosticsText", "monospaced_font")
             dpg.add_spacer(height=5)
             dpg.add_button(label="Hide Readings", width=100, callback=lambda: dpg.configure_item("readings_popup_window", show=False))
             dpg.bind_item_theme("readings_popup_window", themes_manager.themes["nested_window_theme"])
@@ -790,6 +843,19 @@ def build_settings_window():
                                             default_value=cm.globallimitonexit_fps, callback=cm.update_GlobalSettings_settings_callback('globallimitonexit_fps'),
                                             width=100, step=1, step_fast=10, min_value=1)
                             dpg.add_text(" FPS on exit.")
+                        dpg.add_checkbox(label="Predictive cap increases", tag="predictive_mode_checkbox",
+                                         default_value=getattr(cm, "predictive_mode", False),
+                                         callback=cm.make_update_preference_callback('predictive_mode'))
+                        dpg.add_checkbox(label="Record session traces", tag="record_trace_checkbox",
+                                         default_value=getattr(cm, "record_trace", False),
+                                         callback=cm.make_update_preference_callback('record_trace'))
+                        with dpg.group(horizontal=True):
+                            dpg.add_checkbox(label="Cap all apps with a profile, by", tag="multi_process_mode_checkbox",
+                                             default_value=getattr(cm, "multi_process_mode", False),
+                                             callback=cm.make_update_preference_callback('multi_process_mode'))
+                            dpg.add_combo(items=list(ARBITRATION_POLICIES), tag="arbitration_policy_combo",
+                                          default_value=cm.arbitration_policy, width=80,
+                                          callback=cm.update_GlobalSettings_choice_callback('arbitration_policy'))
                         dpg.add_checkbox(label="Show Tooltips", tag="tooltip_checkbox",
                                          default_value=cm.showtooltip, callback=tooltip_checkbox_callback)
                         with dpg.group(horizontal=True):
@@ -911,7 +977,7 @@ with dpg.window(label=app_title, tag="Primary Window"):
                 dpg.add_text("Monitoring Method:", color=(200, 200, 200), tag="monitoring_method_text")
                 dpg.bind_item_font("monitoring_method_text", bold_font)
                 dpg.add_radio_button(
-                    items=["LibreHM", "Legacy"], 
+                    items=["LibreHM", "Legacy", "PID"], 
                     horizontal=True,
                     callback=cm.monitoring_method_callback,
                     default_value="LibreHM",
@@ -1008,13 +1074,17 @@ with dpg.window(label=app_title, tag="Primary Window"):
                         with dpg.table_row():
                             dpg.add_text("FPS drop delay:", tag="button_delaybeforedecrease")
                             dpg.add_input_int(tag=f"input_delaybeforedecrease", default_value=int(cm.settings["delaybeforedecrease"]), 
-                                                width=90, step=1, step_fast=10, 
-                                                min_clamped=True, min_value=1, max_value=99, max_clamped=True)
+                                                width=90, step=100, step_fast=1000, 
+                                                min_clamped=True, min_value=100, max_value=99000, max_clamped=True)
                         with dpg.table_row():
                             dpg.add_text("FPS raise delay:", tag="button_delaybeforeincrease")
                             dpg.add_input_int(tag=f"input_delaybeforeincrease", default_value=int(cm.settings["delaybeforeincrease"]), 
-                                                width=90, step=1, step_fast=10, 
-                                                min_clamped=True, min_value=1, max_value=99, max_clamped=True)
+                                                width=90, step=100, step_fast=1000, 
+                                                min_clamped=True, min_value=100, max_value=99000, max_clamped=True)
+                        with dpg.table_row():
+                            dpg.add_text("Priority:", tag="label_priority")
+                            dpg.add_input_int(tag="input_priority", default_value=int(cm.settings["priority"]),
+                                                width=90, step=1, step_fast=10)
                 dpg.add_spacer(height=5)
                 dpg.add_input_text(
                     tag="input_customfpslimits",
@@ -1113,6 +1183,7 @@ with dpg.window(label=app_title, tag="Primary Window"):
                                 dpg.add_table_column(label="-")
                                 dpg.add_table_column(label="Upper")
                                 dpg.add_table_column(label="Unit")
+                                dpg.add_table_column(label="Critical")
                                 for param in params:
                                     param_id = param['parameter_id']
                                     label = param['sensor_name']#[:18] + ("..." if len(param['sensor_name']) > 18 else "")
@@ -1128,6 +1199,7 @@ with dpg.window(label=app_title, tag="Primary Window"):
                                         dpg.add_text("-", wrap=300)
                                         dpg.add_input_text(tag=f"input_{param_id}_upper", width=40, default_value=100)
                                         dpg.add_text(unit, wrap=300)
+                                        dpg.add_input_text(tag=f"input_{param_id}_critical", width=40, default_value=0)
                         dpg.add_spacer(height=1)
             dpg.add_spacer(height=5)
             with dpg.group(horizontal=True):
@@ -1166,13 +1238,51 @@ with dpg.window(label=app_title, tag="Primary Window"):
                         dpg.add_text("-", wrap=300)
                         dpg.add_input_text(tag="input_cpucutofffordecrease", default_value=str(cm.settings["cpucutofffordecrease"]), width=40)
                         dpg.add_text("%", wrap=300)
+                with dpg.table_row():
+                    with dpg.group(horizontal=True):
+                        dpg.add_button(label="GPU Critical:", tag="button_gpucritical_legacy", width=130)
+                        dpg.bind_item_theme("button_gpucritical_legacy", themes_manager.themes["button_left_theme"])
+                        dpg.add_input_text(tag="input_gpucriticalload", default_value=str(cm.settings["gpucriticalload"]), width=40)
+                        dpg.add_text("% (0 = off)", wrap=300)
             dpg.add_spacer(height=5)
-            dpg.add_input_text(tag="luid_status_text", default_value="Tracking all GPU 3D usages.", readonly=True, width=260)
+            with dpg.group(horizontal=True):
+                dpg.add_text("GPU usage of:")
+                dpg.add_combo(items=list(GPU_USAGE_SCOPES), tag="gpu_usage_scope_combo",
+                              default_value=cm.gpu_usage_scope, width=80,
+                              callback=cm.update_GlobalSettings_choice_callback('gpu_usage_scope'))
             dpg.add_spacer(height=1)
-            dpg.add_button(label="Detect Render GPU", callback=toggle_luid_selection, tag="luid_button", width=260)
+            dpg.add_input_text(tag="luid_status_text", default_value="Tracking all GPU 3D usages.", readonly=True, width=260)
             dpg.add_spacer(height=5)
             build_plot_window()
 
+        with dpg.child_window(width=-1, height=mid_window_height+100, border=True, tag="pid_childwindow", show=False):
+            with dpg.group(horizontal=True):
+                with dpg.drawlist(width=15, height=15):
+                    dpg.draw_line((0, 13), (15, 13), color=(180,180,180), thickness=1)
+                dpg.add_text("PID: Hold a load signal at a setpoint")
+                with dpg.drawlist(width=52, height=15):
+                    dpg.draw_line((0, 13), (52, 13), color=(180,180,180), thickness=1)
+            dpg.add_spacer(height=5)
+            with dpg.table(header_row=False, resizable=False, policy=dpg.mvTable_SizingFixedFit):
+                dpg.add_table_column(width_fixed=True)  # Label
+                dpg.add_table_column(width_fixed=True)  # Input
+                with dpg.table_row():
+                    dpg.add_text("Signal:")
+                    dpg.add_combo(items=["GPU", "CPU", "LibreHM"], tag="input_pid_signal",
+                                  default_value=str(cm.settings["pid_signal"]), width=100)
+                with dpg.table_row():
+                    dpg.add_text("Setpoint (%):")
+                    dpg.add_input_text(tag="input_pid_setpoint", default_value=str(cm.settings["pid_setpoint"]), width=40)
+                with dpg.table_row():
+                    dpg.add_text("Deadband (%):")
+                    dpg.add_input_text(tag="input_pid_deadband", default_value=str(cm.settings["pid_deadband"]), width=40)
+                with dpg.table_row():
+                    dpg.add_text("Gains (Kp, Ki, Kd):")
+                    with dpg.group(horizontal=True):
+                        dpg.add_input_text(tag="input_pid_kp", default_value=str(cm.settings["pid_kp"]), width=50)
+                        dpg.add_input_text(tag="input_pid_ki", default_value=str(cm.settings["pid_ki"]), width=50)
+                        dpg.add_input_text(tag="input_pid_kd", default_value=str(cm.settings["pid_kd"]), width=50)
+
 build_readings_window()
 build_settings_window()
 
@@ -1207,18 +1317,35 @@ cm.startup_profile_selection()
 initial_method = dpg.get_value("input_monitoring_method")
 if initial_method == "LibreHM":
     dpg.configure_item("LHwM_childwindow", show=True)
+elif initial_method == "PID":
+    dpg.configure_item("pid_childwindow", show=True)
 else:
     dpg.configure_item("legacy_childwindow", show=True)
 
 #TODO: If needed, possibility of added monitoring method check for these
-gpu_monitor = GPUUsageMonitor(lambda: running, logger, dpg, themes_manager, interval=(cm.gpupollinginterval/1000), max_samples=cm.gpupollingsamples, percentile=cm.gpupercentile)
-cpu_monitor = CPUUsageMonitor(lambda: running, logger, dpg, interval=(cm.cpupollinginterval/1000), max_samples=cm.cpupollingsamples, percentile=cm.cpupercentile)
+gpu_monitor = GPUUsageMonitor(logger, dpg, themes_manager, interval=(cm.gpupollinginterval/1000), max_samples=cm.gpupollingsamples, percentile=cm.gpupercentile)
+gpu_monitor.critical_alarm = critical_alarm
+cpu_monitor = CPUUsageMonitor(logger, dpg, interval=(cm.cpupollinginterval/1000), max_samples=cm.cpupollingsamples, percentile=cm.cpupercentile)
 
 # Assuming logger and dpg are initialized
 rtss.enable_limiter()
 
 rtss_manager = RTSSInterface(logger, dpg)
 
+frametime_sampler = FrametimeSampler(logger, rtss_manager.shared_memory,
+                                     interval=(cm.frametimepollinginterval/1000),
+                                     max_samples=cm.frametimesamples,
+                                     is_rtss_running=rtss_manager.is_rtss_running)
+fps_utils.frametime_sampler = frametime_sampler
+
+# One thread samples every sensor at its own interval while monitoring, and parks when stopped
+sampling = SamplingScheduler(logger)
+sampling.add("GPU", gpu_monitor.sample, gpu_monitor.interval)
+sampling.add("CPU", cpu_monitor.sample, cpu_monitor.interval)
+sampling.add("LibreHM", lhm_sensor.poll, lhm_sensor.interval)
+sampling.add("Frametime", frametime_sampler.poll, frametime_sampler.interval)
+sampling.add("Plot", plot_tick, math.lcm(cm.gpupollinginterval, cm.cpupollinginterval) / 1000.0)
+
 gui_update_thread = threading.Thread(target=gui_update_loop, daemon=True)
 gui_update_thread.start()
 
@@ -0,0 +1,181 @@
+# auto_tuner.py
+
+import configparser
+import itertools
+import os
+import random
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict
+from core.trace_replay import read_trace, replay, build_replay_setup
+
+# Ladder choices are searched as (capmethod, capstep/capratio) pairs
+LADDER_KEYS = {"step": "capstep", "ratio": "capratio"}
+
+def default_search_space():
+    """Setting -> candidate values. 'ladder' holds (capmethod, value) pairs."""
+    return {
+        "gpucutofffordecrease": [75, 80, 85, 90, 95],
+        "gpucutoffforincrease": [50, 55, 60, 65, 70, 75, 80],
+        "delaybeforedecrease": [1000, 2000, 3000, 5000],
+        "delaybeforeincrease": [5000, 10000, 15000, 20000],
+        "ladder": [("ratio", 5), ("ratio", 10), ("step", 5), ("step", 10)],
+    }
+
+def is_valid_candidate(candidate):
+    """Rejects combinations the controller can't use sensibly (increase cutoff not below the decrease cutoff)."""
+    decrease = candidate.get("gpucutofffordecrease")
+    increase = candidate.get("gpucutoffforincrease")
+    return decrease is None or increase is None or increase < decrease
+
+def generate_candidates(space, samples=None, seed=1):
+    """All valid combinations of the search space, or a random subset of `samples` of them."""
+    keys = list(space)
+    combos = [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+    combos = [c for c in combos if is_valid_candidate(c)]
+    if samples and samples < len(combos):
+        combos = random.Random(seed).sample(combos, samples)
+    return combos
+
+def candidate_values(candidate):
+    """A candidate as profiles.ini string values (the ladder pair expanded to capmethod + capstep/capratio)."""
+    values = {}
+    for key, value in candidate.items():
+        if key == "ladder":
+            method, amount = value
+            values["capmethod"] = method
+            values[LADDER_KEYS[method]] = str(amount)
+        else:
+            values[key] = str(value)
+    return values
+
+@dataclass
+class TuningObjective:
+    """
+    Maximise the average cap, subject to spending at most max_over_fraction of the time
+    at or above the saturation threshold and changing the cap at most
+    max_transitions_per_minute times a minute. Candidates breaking a constraint rank
+    below all feasible ones, ordered by how far they break it.
+
+    The threshold is the same for every candidate; measuring against each candidate's
+    own gpucutofffordecrease would reward raising the cutoff.
+    """
+    max_over_fraction: float = 0.05
+    max_transitions_per_minute: float = 2.0
+    load_threshold: float = 90.0  # GPU %
+
+    def violation(self, metrics):
+        over = max(0.0, metrics["over_fraction"] - self.max_over_fraction) / max(self.max_over_fraction, 1e-6)
+        churn = max(0.0, metrics["transitions_per_minute"] - self.max_transitions_per_minute) / max(self.max_transitions_per_minute, 1e-6)
+        return over + churn
+
+    def score(self, metrics):
+        """Sort key, higher is better."""
+        violation = self.violation(metrics)
+        if violation > 0:
+            return (0, -violation)
+        return (1, metrics["average_cap"])
+
+@dataclass
+class TuningResult:
+    candidate: Dict
+    values: Dict[str, str]  # profiles.ini values to write for this candidate
+    metrics: Dict[str, float]
+    feasible: bool = False
+    score: tuple = field(default=(0, 0.0))
+
+# Per worker process: traces loaded once by _init_worker, so each candidate doesn't re-read them
+_worker_traces = None
+
+def _init_worker(trace_paths, preload):
+    global _worker_traces
+    _worker_traces = [list(read_trace(path)) for path in trace_paths] if preload else None
+
+def evaluate_candidate(candidate, base_values, trace_paths, load_threshold=None, load_model=True):
+    """
+    Replays every trace with base_values overridden by the candidate and combines the
+    results: average cap and time over threshold weighted by duration, transitions per
+    minute over the total duration.
+    """
+    values = dict(base_values)
+    values.update(candidate_values(candidate))
+    ladder, settings = build_replay_setup(values)
+
+    duration = over = cap_seconds = 0.0
+    transitions = ticks = 0
+    for i, path in enumerate(trace_paths):
+        samples = _worker_traces[i] if _worker_traces is not None else read_trace(path)
+        result = replay(samples, ladder, settings, load_threshold=load_threshold,
+                        keep_timeline=False, load_model=load_model)
+        duration += result.duration
+        over += result.seconds_over_threshold
+        cap_seconds += result.average_cap * result.duration
+        transitions += result.transitions
+        ticks += result.ticks
+
+    return {
+        "average_cap": cap_seconds / duration if duration else 0.0,
+        "over_fraction": over / duration if duration else 0.0,
+        "transitions_per_minute": transitions / (duration / 60) if duration else 0.0,
+        "transitions": transitions,
+        "ticks": ticks,
+        "duration": duration,
+    }
+
+def _evaluate_job(job):
+    candidate, base_values, trace_paths, load_threshold, load_model = job
+    return candidate, evaluate_candidate(candidate, base_values, trace_paths, load_threshold, load_model)
+
+def tune(trace_paths, base_values, objective=None, space=None, samples=None, workers=None,
+         preload=True, load_model=True, progress=None):
+    """
+    Evaluates the search space against the traces on a ProcessPoolExecutor and returns
+    TuningResults, best first. base_values are the settings every candidate starts from
+    (see trace_replay.load_replay_values). With preload each worker keeps the parsed
+    traces in memory; without it they are streamed from disk per candidate.
+    progress(done, total) is called as results arrive.
+    """
+    objective = objective or TuningObjective()
+    candidates = generate_candidates(space or default_search_space(), samples)
+    trace_paths = [os.path.abspath(p) for p in trace_paths]
+    jobs = [(c, base_values, trace_paths, objective.load_threshold, load_model) for c in candidates]
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(trace_paths, preload)) as executor:
+        chunksize = max(1, len(jobs) // ((workers or os.cpu_count() or 1) * 8))
+        for done, (candidate, metrics) in enumerate(executor.map(_evaluate_job, jobs, chunksize=chunksize), 1):
+            score = objective.score(metrics)
+            results.append(TuningResult(candidate, candidate_values(candidate), metrics, score[0] == 1, score))
+            if progress:
+                progress(done, len(jobs))
+
+    results.sort(key=lambda r: r.score, reverse=True)
+    return results
+
+def write_profile_section(profiles_path, section, values, base_section="Global"):
+    """
+    Writes values into a profiles.ini section, creating it from base_section's values
+    if it doesn't exist yet. Other sections and keys are left as they are. The file is
+    replaced through a temp file in the same directory, like the RTSS profile writes.
+    """
+    config = configparser.ConfigParser()
+    config.read(profiles_path)
+    if not config.has_section(section):
+        config[section] = dict(config[base_section]) if config.has_section(base_section) else {}
+    for key, value in values.items():
+        config[section][key] = str(value)
+    fd, tmp_path = tempfile.mkstemp(prefix=".dfl_", suffix=".tmp", dir=os.path.dirname(profiles_path) or ".")
+    try:
+        with os.fdopen(fd, "w") as f:
+            config.write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, profiles_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
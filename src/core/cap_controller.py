@@ -0,0 +1,421 @@
+# cap_controller.py
+
+from dataclasses import dataclass, field, fields
+from typing import Optional, Sequence, Tuple, Union
+from core.cap_ladder import CapLadder
+from core.fixed_fps import FixedFPS
+from core.headroom_model import HeadroomPredictor
+from core.pid_strategy import PIDCapStrategy
+
+# Processes whose readings never drive the cap (our own window being in front)
+IGNORED_PROCESSES = frozenset({"DynamicFPSLimiter.exe"})
+
+@dataclass(frozen=True)
+class ControlSample:
+    """One monitoring tick worth of inputs to CapController.step()."""
+    fps: Optional[float]  # RTSS FPS of the foreground app (None if not hooked)
+    gpu: Optional[float]  # GPU usage percentile
+    cpu: Optional[float]  # Highest CPU core usage percentile
+    idle_seconds: float = 0.0
+    process_name: Optional[str] = None
+    # LibreHM mode: (value, lower, upper) per enabled sensor; lower/upper may be None
+    sensor_readings: Tuple[Tuple[Optional[float], Optional[float], Optional[float]], ...] = ()
+    frametime_spikes: Optional[int] = None  # Spikes among the sampled frametimes in the window, if any
+
+@dataclass(frozen=True)
+class CapDecision:
+    cap: Optional[FixedFPS]  # Limit to send to RTSS, or None to leave it as it is
+    reason: str  # "decrease", "increase", "increase_predicted", "pid", "critical", "idle", "idle_restore", "start", "hold" or "skip"
+
+    @property
+    def changed(self):
+        return self.cap is not None
+
+@dataclass
+class CapControllerSettings:
+    monitoring_method: str = "Legacy"  # "Legacy", "LibreHM" or "PID"
+    tick_interval_ms: int = 1000  # How often step() is called
+    delaybeforedecrease: int = 2000  # ms
+    delaybeforeincrease: int = 10000  # ms
+    fps_mean_window_ms: int = 3000
+    # Minimum time between two decreases, the rate of the old 1 s loop. GPU load lags the
+    # cap, so with faster ticks the load window is still over the cutoff right after a drop
+    decrease_cooldown_ms: int = 1000
+    gpucutofffordecrease: float = 85
+    gpucutoffforincrease: float = 70
+    cpucutofffordecrease: float = 105
+    cpucutoffforincrease: float = 101
+    minvalidgpu: float = 14
+    minvalidfps: float = 14
+    idle_mode: bool = False
+    idle_fps_delay: float = 15
+    idle_fps_cap: int = 30
+    frametimespikelimit: int = 0
+    predictive_mode: bool = False  # Jump to the highest cap the headroom model expects to stay under gpucutofffordecrease
+    # PID mode: signal is "GPU", "CPU" or "LibreHM" (highest sensor value as % of its upper bound)
+    pid_signal: str = "GPU"
+    pid_setpoint: float = 80
+    pid_kp: float = 0.1
+    pid_ki: float = 0.04
+    pid_kd: float = 0.0
+    pid_deadband: float = 5
+    ignored_processes: frozenset = field(default=IGNORED_PROCESSES)
+
+    @classmethod
+    def from_config(cls, cm, monitoring_method, tick_interval_ms=1000):
+        """Builds settings from the ConfigManager's current global variables."""
+        return cls(
+            monitoring_method=monitoring_method,
+            tick_interval_ms=tick_interval_ms,
+            delaybeforedecrease=cm.delaybeforedecrease,
+            delaybeforeincrease=cm.delaybeforeincrease,
+            gpucutofffordecrease=cm.gpucutofffordecrease,
+            gpucutoffforincrease=cm.gpucutoffforincrease,
+            cpucutofffordecrease=cm.cpucutofffordecrease,
+            cpucutoffforincrease=cm.cpucutoffforincrease,
+            minvalidgpu=cm.minvalidgpu,
+            minvalidfps=cm.minvalidfps,
+            idle_mode=cm.idle_mode,
+            idle_fps_delay=cm.idle_fps_delay,
+            idle_fps_cap=cm.idle_fps_cap,
+            frametimespikelimit=getattr(cm, "frametimespikelimit", 0),
+            predictive_mode=getattr(cm, "predictive_mode", False),
+            pid_signal=getattr(cm, "pid_signal", "GPU"),
+            pid_setpoint=getattr(cm, "pid_setpoint", 80),
+            pid_kp=getattr(cm, "pid_kp", 0.1),
+            pid_ki=getattr(cm, "pid_ki", 0.04),
+            pid_kd=getattr(cm, "pid_kd", 0.0),
+            pid_deadband=getattr(cm, "pid_deadband", 5),
+        )
+
+    @classmethod
+    def from_mapping(cls, *sections, **overrides):
+        """
+        Builds settings from string values keyed like settings.ini / profiles.ini
+        (e.g. a GlobalSettings section, Preferences and a profile section, later ones
+        winning), without the GUI. Unknown keys are ignored; controltickinterval maps
+        to tick_interval_ms. Keyword overrides are applied last, unconverted.
+        """
+        values = {}
+        for section in sections:
+            values.update(section)
+        if "controltickinterval" in values:
+            values.setdefault("tick_interval_ms", values["controltickinterval"])
+
+        kwargs = {}
+        for f in fields(cls):
+            if f.name not in values or f.name == "ignored_processes":
+                continue
+            raw = values[f.name]
+            if f.type is bool:
+                kwargs[f.name] = raw if isinstance(raw, bool) else str(raw).strip().lower() == "true"
+            elif f.type is int:
+                kwargs[f.name] = int(float(raw))
+            else:
+                kwargs[f.name] = f.type(raw)
+        kwargs.update(overrides)
+        return cls(**kwargs)
+
+    def to_mapping(self):
+        """String values keyed like the ini files (the inverse of from_mapping)."""
+        return {f.name: str(getattr(self, f.name)) for f in fields(self) if f.name != "ignored_processes"}
+
+    def ticks_for(self, milliseconds):
+        return max(1, round(milliseconds / self.tick_interval_ms))
+
+    @property
+    def decrease_window(self):
+        return self.ticks_for(self.delaybeforedecrease)
+
+    @property
+    def increase_window(self):
+        return self.ticks_for(self.delaybeforeincrease)
+
+    @property
+    def decrease_cooldown_ticks(self):
+        return self.ticks_for(self.decrease_cooldown_ms)
+
+class CapController:
+    """
+    The framerate cap decision logic, without GUI, OS or timing dependencies.
+
+    Each call to step() takes one ControlSample (the live loop feeds one per control
+    tick) and returns a CapDecision. Delays are configured in milliseconds and
+    converted to a number of ticks through settings.tick_interval_ms. FPS values and
+    caps are kept as integers in the ladder's fixed-point units (see CapLadder); only
+    the returned CapDecision.cap is converted back, to FixedFPS. All state (recent
+    FPS/GPU/CPU values, the current offset from the max cap, the increase / decrease
+    cooldowns and idle state) lives here, so the same engine can be replayed offline as fast as the
+    samples can be produced.
+
+    step() is prepare() followed by decide(); MultiProcessCapManager calls the phases
+    itself, asking each controller's intent() in between to arbitrate who moves.
+    """
+
+    def __init__(self, fps_limits: Union[CapLadder, Sequence], settings: Optional[CapControllerSettings] = None,
+                 headroom: Optional[HeadroomPredictor] = None):
+        self.ladder = fps_limits if isinstance(fps_limits, CapLadder) else CapLadder(fps_limits)
+        self.settings = settings or CapControllerSettings()
+        # Per-process GPU load vs FPS models; pass a shared one to keep them across runs
+        self.headroom = headroom if headroom is not None else HeadroomPredictor()
+        self.pid = PIDCapStrategy()
+        self.min_cap = self.ladder.min
+        self.max_cap = self.ladder.max
+        self.reset()
+
+    def reset(self):
+        self.fps_values = []
+        self.gpu_values = []
+        self.cpu_values = []
+        self.fps_mean = 0
+        self.offset = 0  # current cap = max_cap + offset (units)
+        self.increase_cooldown = 0
+        self.decrease_cooldown = 0
+        self.idle_state = False
+        self.last_active_fps_cap = None
+        self.pid.reset()
+
+    @property
+    def current_cap(self):
+        """Current cap in ladder units."""
+        return self.max_cap + self.offset
+
+    @property
+    def current_cap_fixed(self):
+        return self.ladder.fixed(self.current_cap)
+
+    def _record(self, sample):
+        s = self.settings
+        if sample.fps:
+            while len(self.fps_values) >= s.ticks_for(s.fps_mean_window_ms):
+                self.fps_values.pop(0)
+            self.fps_values.append(self.ladder.to_units(sample.fps))
+            self.fps_mean = sum(self.fps_values) // len(self.fps_values)
+
+        history = max(s.decrease_window, s.increase_window) + 1
+        if len(self.gpu_values) > history:
+            self.gpu_values.pop(0)
+        self.gpu_values.append(sample.gpu)
+        if len(self.cpu_values) > history:
+            self.cpu_values.pop(0)
+        self.cpu_values.append(sample.cpu)
+
+    def evaluate(self, sample):
+        """Returns (should_decrease, should_increase) for the configured monitoring method."""
+        s = self.settings
+        if s.monitoring_method == "LibreHM":
+            decrease_checks = [value >= upper for value, lower, upper in sample.sensor_readings
+                               if value is not None and upper is not None]
+            increase_checks = [value <= lower for value, lower, upper in sample.sensor_readings
+                               if value is not None and lower is not None]
+            should_decrease = any(decrease_checks) if decrease_checks else False
+            should_increase = all(increase_checks) if increase_checks else False
+        else:
+            gpu_values, cpu_values = self.gpu_values, self.cpu_values
+            decrease_window, increase_window = s.decrease_window, s.increase_window
+            gpu_decrease_condition = (
+                len(gpu_values) >= decrease_window and
+                all(value >= s.gpucutofffordecrease for value in gpu_values[-decrease_window:])
+            )
+            cpu_decrease_condition = (
+                len(cpu_values) >= decrease_window and
+                all(value >= s.cpucutofffordecrease for value in cpu_values[-decrease_window:])
+            )
+            should_decrease = gpu_decrease_condition or cpu_decrease_condition
+
+            gpu_increase_condition = (
+                len(gpu_values) >= increase_window and
+                all(value <= s.gpucutoffforincrease for value in gpu_values[-increase_window:])
+            )
+            cpu_increase_condition = (
+                len(cpu_values) >= increase_window and
+                all(value <= s.cpucutoffforincrease for value in cpu_values[-increase_window:])
+            )
+            should_increase = gpu_increase_condition and cpu_increase_condition
+
+        # Frametime spikes ('frametimespikelimit' > 0) force a decrease and block increases
+        if sample.frametime_spikes is not None and s.frametimespikelimit > 0:
+            stutter = sample.frametime_spikes >= s.frametimespikelimit
+            should_decrease, should_increase = should_decrease or stutter, should_increase and not stutter
+        return should_decrease, should_increase
+
+    def pid_measurement(self, sample):
+        """The load signal the PID strategy regulates, in %, or None if it isn't available."""
+        s = self.settings
+        if s.pid_signal == "CPU":
+            return sample.cpu
+        if s.pid_signal == "LibreHM":
+            loads = [value / upper * 100 for value, lower, upper in sample.sensor_readings
+                     if value is not None and upper]
+            return max(loads) if loads else None
+        return sample.gpu
+
+    def _step_pid(self, sample, allow_decrease=True, allow_increase=True):
+        s = self.settings
+        pid = self.pid
+        pid.kp, pid.ki, pid.kd = s.pid_kp, s.pid_ki, s.pid_kd
+        pid.setpoint, pid.deadband = s.pid_setpoint, s.pid_deadband
+
+        ladder = self.ladder
+        index = ladder.index_of(self.current_cap)
+        if index is None:
+            index = ladder.index_of(ladder.snap(self.current_cap))
+        top = len(ladder) - 1
+
+        if (sample.frametime_spikes is not None and s.frametimespikelimit > 0
+                and sample.frametime_spikes >= s.frametimespikelimit):
+            # Stutter overrides the controller: drop a rung and restart the integral there
+            target = max(0, index - 1)
+            pid.retarget(target)
+        else:
+            measurement = self.pid_measurement(sample)
+            if measurement is None:
+                return CapDecision(None, "hold")
+            target = pid.update(float(measurement), index, top, s.tick_interval_ms / 1000)
+            if target is None:
+                return CapDecision(None, "hold")
+
+        if target == index:
+            return CapDecision(None, "hold")
+        if (target < index and not allow_decrease) or (target > index and not allow_increase):
+            pid.retarget(index)  # Another controller moves this tick; don't let the integral wind up
+            return CapDecision(None, "hold")
+        next_fps = ladder[target]
+        self.offset = next_fps - self.max_cap
+        return CapDecision(ladder.fixed(next_fps), "pid")
+
+    def _next_lower(self):
+        ladder = self.ladder
+        current_fps_cap = self.current_cap
+        highest_below_fps = ladder.highest_below(self.fps_mean)
+        if highest_below_fps is None:
+            return None
+        if current_fps_cap > self.fps_mean:
+            # Jump to highest value below fps_mean
+            return highest_below_fps
+        if current_fps_cap in ladder:
+            # Cap is already at or below fps_mean: left where it is, as before CapLadder
+            return None
+        # Cap isn't a rung (ladder changed): nearest lower value
+        return ladder.next_below(current_fps_cap)
+
+    def _next_higher(self, steps=1):
+        return self.ladder.next_above(self.current_cap, steps)
+
+    def prepare(self, sample):
+        """
+        First half of step(): records the sample and applies the skip, idle and
+        validity gates. Returns the decision when one of them settles the tick, or
+        None when the cap logic should run (intent() / decide()).
+        """
+        s = self.settings
+        self._record(sample)
+
+        # To prevent loading screens and our own window from affecting the fps cap
+        if not sample.gpu or sample.process_name in s.ignored_processes:
+            return CapDecision(None, "skip")
+
+        if s.idle_mode and sample.idle_seconds >= s.idle_fps_delay:
+            if self.idle_state:
+                return CapDecision(None, "hold")
+            self.last_active_fps_cap = self.current_cap
+            self.idle_state = True
+            return CapDecision(FixedFPS(int(s.idle_fps_cap)), "idle")
+
+        if self.idle_state:
+            self.idle_state = False
+            self.pid.reset()  # Restart bumpless from the restored cap
+            return CapDecision(self.ladder.fixed(self.last_active_fps_cap), "idle_restore")
+
+        if not (sample.gpu > s.minvalidgpu and self.fps_mean > self.ladder.to_units(int(s.minvalidfps))):
+            return CapDecision(None, "skip")
+
+        if sample.fps:
+            self.headroom.add(sample.process_name, sample.fps, sample.gpu)
+        return None
+
+    def intent(self, sample):
+        """
+        (wants_decrease, wants_increase) for a sample that passed prepare(), without
+        changing any state: whether decide() would lower or raise the cap this tick if
+        allowed to. Lets MultiProcessCapManager arbitrate before any controller moves.
+        """
+        s = self.settings
+        if s.monitoring_method == "PID":
+            measurement = self.pid_measurement(sample)
+            stutter = (sample.frametime_spikes is not None and s.frametimespikelimit > 0
+                       and sample.frametime_spikes >= s.frametimespikelimit)
+            over = stutter or (measurement is not None and measurement > s.pid_setpoint + s.pid_deadband)
+            under = not stutter and measurement is not None and measurement < s.pid_setpoint - s.pid_deadband
+            return over and self.current_cap > self.min_cap, under and self.current_cap < self.max_cap
+
+        should_decrease, should_increase = self.evaluate(sample)
+        # decide() counts the cooldowns down before checking them
+        wants_decrease = (should_decrease and self.offset > (self.min_cap - self.max_cap)
+                          and self.decrease_cooldown <= 1 and self._next_lower() is not None)
+        wants_increase = should_increase and self.offset < 0 and self.increase_cooldown <= 1
+        return wants_decrease, wants_increase
+
+    def decide(self, sample, allow_decrease=True, allow_increase=True):
+        """
+        Second half of step(): the decrease / increase logic for a sample that passed
+        prepare(). A move in a direction that isn't allowed is held instead (the
+        cooldowns still count down, so a blocked move is retried next tick).
+        """
+        s = self.settings
+        if s.monitoring_method == "PID":
+            return self._step_pid(sample, allow_decrease, allow_increase)
+
+        should_decrease, should_increase = self.evaluate(sample)
+        decision = CapDecision(None, "hold")
+
+        # --- COOLDOWN LOGIC ---
+        if self.decrease_cooldown > 0:
+            self.decrease_cooldown -= 1
+        if self.increase_cooldown > 0:
+            self.increase_cooldown -= 1
+
+        if (self.offset > (self.min_cap - self.max_cap) and should_decrease and allow_decrease
+                and self.decrease_cooldown == 0):
+            next_fps = self._next_lower()
+            if next_fps is not None:
+                self.offset = next_fps - self.max_cap
+                self.decrease_cooldown = s.decrease_cooldown_ticks
+                decision = CapDecision(self.ladder.fixed(next_fps), "decrease")
+
+        if self.offset < 0 and should_increase and allow_increase and self.increase_cooldown == 0:
+            next_fps, reason = None, "increase"
+            if s.predictive_mode:
+                predicted = self.headroom.predicted_cap(sample.process_name, self.ladder, s.gpucutofffordecrease)
+                if predicted is not None and predicted > self.current_cap:
+                    next_fps, reason = predicted, "increase_predicted"
+            if next_fps is None:
+                next_fps = self._next_higher()
+            if next_fps is not None:
+                self.offset = next_fps - self.max_cap
+                self.increase_cooldown = s.increase_window  # Start cooldown
+                decision = CapDecision(self.ladder.fixed(next_fps), reason)
+
+        return decision
+
+    def emergency_drop(self, rungs=1):
+        """
+        Lowers the cap by `rungs` ladder rungs at once, outside the regular tick (a
+        sensor crossed its critical threshold). Restarts the increase cooldown, so the
+        cap only comes back up through the usual raise delay.
+        """
+        if self.idle_state:
+            return CapDecision(None, "hold")
+        target = self.ladder.next_below(self.current_cap, max(1, rungs))
+        if target is None:
+            return CapDecision(None, "hold")
+        self.offset = target - self.max_cap
+        self.increase_cooldown = self.settings.increase_window
+        self.pid.retarget(self.ladder.index_of(target))
+        return CapDecision(self.ladder.fixed(target), "critical")
+
+    def step(self, sample: ControlSample, allow_decrease=True, allow_increase=True) -> CapDecision:
+        decision = self.prepare(sample)
+        if decision is not None:
+            return decision
+        return self.decide(sample, allow_decrease, allow_increase)
@@ -0,0 +1,177 @@
+# cap_ladder.py
+
+from bisect import bisect_left, bisect_right
+from core.fixed_fps import FixedFPS, to_fixed, common_denominator, parse_fixed
+
+def stepped_caps(maximum, minimum, step):
+    """Caps from maximum down to minimum in fixed steps (minimum is always included)."""
+    values = list(range(maximum, minimum - 1, -step))
+    if minimum not in values:
+        values.append(minimum)
+    return sorted(set(values))
+
+def ratioed_caps(maximum, minimum, ratio):
+    """Caps from maximum down to minimum, each about (100 - ratio)% of the previous one."""
+    values = []
+    current = maximum
+    ratio_factor = 1 - (ratio / 100.0)
+    if ratio_factor <= 0 or ratio_factor >= 1:
+        return sorted(set([maximum, minimum]))
+    prev_diff = None
+    values.append(int(round(current)))
+
+    while current >= minimum:
+        current = current * ratio_factor
+        rounded_current = int(round(current))
+        if len(values) >= 3:
+            prev_diff = abs(values[-1] - values[-2])
+        if prev_diff is not None and abs(rounded_current - values[-1]) > prev_diff:
+            rounded_current = values[-1] - prev_diff
+
+        # Duplicate detection and correction
+        while rounded_current in values and rounded_current > minimum:
+            rounded_current -= 1
+
+        values.append(rounded_current)
+        current = rounded_current
+
+        if rounded_current <= minimum:
+            break
+    if minimum not in values:
+        values.append(minimum)
+    custom_limits = sorted(x for x in set(values) if x >= minimum)
+    return custom_limits
+
+class CapLadder:
+    """
+    Immutable, sorted set of framerate caps with O(log n) neighbour lookups.
+
+    Caps are stored in fixed point: integer units over one denominator shared by the
+    whole ladder (the LCM of the caps' own denominators, e.g. 100 for 59.94 and 120),
+    computed once here. Everything that works with the ladder (lookups, current_cap,
+    offsets) uses those integer units; use to_units() to bring an FPS reading onto
+    the ladder's scale and fixed() to get a cap back as FixedFPS for RTSS.
+
+    Lookups accept any value in units (caps that aren't on the ladder, FPS readings)
+    and return None instead of raising when there is no such rung.
+    """
+
+    __slots__ = ("_caps", "_denominator")
+
+    def __init__(self, caps):
+        fixed = [to_fixed(cap) for cap in caps]
+        if not fixed:
+            raise ValueError("A cap ladder needs at least one cap")
+        denominator = common_denominator(f.denominator for f in fixed)
+        units = tuple(sorted({f.units * (denominator // f.denominator) for f in fixed}))
+        object.__setattr__(self, "_caps", units)
+        object.__setattr__(self, "_denominator", denominator)
+
+    @classmethod
+    def from_profile(cls, profile):
+        """
+        Builds the ladder from a profile's cap settings (a profiles.ini section or any
+        mapping of maxcap, mincap, capstep, capratio, capmethod and customfpslimits),
+        the same way the cap inputs in the GUI do.
+        """
+        method = str(profile.get("capmethod", "ratio")).lower()
+        maximum, minimum = int(profile.get("maxcap", 114)), int(profile.get("mincap", 40))
+        if method == "custom":
+            return cls(parse_fixed(x) for x in str(profile.get("customfpslimits", "")).split(",") if x.strip())
+        if method == "step":
+            return cls(stepped_caps(maximum, minimum, int(profile.get("capstep", 5))))
+        return cls(ratioed_caps(maximum, minimum, int(profile.get("capratio", 10))))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CapLadder is immutable")
+
+    @property
+    def caps(self):
+        """Caps in units, ascending."""
+        return self._caps
+
+    @property
+    def denominator(self):
+        return self._denominator
+
+    @property
+    def min(self):
+        return self._caps[0]
+
+    @property
+    def max(self):
+        return self._caps[-1]
+
+    def __len__(self):
+        return len(self._caps)
+
+    def __iter__(self):
+        return iter(self._caps)
+
+    def __getitem__(self, index):
+        return self._caps[index]
+
+    def __contains__(self, value):
+        return self.index_of(value) is not None
+
+    def __eq__(self, other):
+        return (isinstance(other, CapLadder) and self._caps == other._caps
+                and self._denominator == other._denominator)
+
+    def __hash__(self):
+        return hash((self._caps, self._denominator))
+
+    def __repr__(self):
+        return f"CapLadder({', '.join(str(self.fixed(c)) for c in self._caps)})"
+
+    def to_units(self, fps):
+        """An FPS value (float, int or FixedFPS) in this ladder's units, rounded to the nearest unit."""
+        if isinstance(fps, FixedFPS):
+            if fps.denominator == self._denominator:
+                return fps.units
+            return (fps.units * self._denominator * 2 + fps.denominator) // (fps.denominator * 2)
+        if isinstance(fps, int):
+            return fps * self._denominator
+        return int(round(fps * self._denominator))
+
+    def fixed(self, units):
+        """A value in units as FixedFPS (for RTSS writes and display)."""
+        return FixedFPS(units, self._denominator)
+
+    def to_fps(self, units):
+        return units / self._denominator
+
+    def index_of(self, value):
+        """Index of value on the ladder, or None if it isn't a rung."""
+        i = bisect_left(self._caps, value)
+        if i < len(self._caps) and self._caps[i] == value:
+            return i
+        return None
+
+    def next_below(self, value, steps=1):
+        """The cap `steps` rungs below value (clamped to the lowest cap), or None if no cap is below value."""
+        i = bisect_left(self._caps, value)  # Number of caps < value
+        if i == 0:
+            return None
+        return self._caps[max(0, i - steps)]
+
+    def next_above(self, value, steps=1):
+        """The cap `steps` rungs above value (clamped to the highest cap), or None if no cap is above value."""
+        i = bisect_right(self._caps, value)  # Index of the first cap > value
+        if i == len(self._caps):
+            return None
+        return self._caps[min(len(self._caps) - 1, i + steps - 1)]
+
+    def highest_below(self, fps):
+        """Highest cap strictly below an FPS reading (in units), or None."""
+        return self.next_below(fps)
+
+    def snap(self, value):
+        """Nearest cap to value (the lower one on a tie)."""
+        i = bisect_left(self._caps, value)
+        if i == 0:
+            return self._caps[0]
+        if i == len(self._caps):
+            return self._caps[-1]
+        below, above = self._caps[i - 1], self._caps[i]
+        return above if above - value < value - below else below
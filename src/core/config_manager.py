@@ -24,11 +24,19 @@ class ConfigManager:
             "gpucutoffforincrease": 70,
             'cpucutofffordecrease': 105,
             'cpucutoffforincrease': 101,
-            "delaybeforedecrease": 2,
-            "delaybeforeincrease": 10,
+            "delaybeforedecrease": 2000,
+            "delaybeforeincrease": 10000,
             "capmethod": "ratio",
             "customfpslimits": '30.01, 45.00, 59.99',
             "monitoring_method": "LibreHM",
+            "pid_signal": "GPU",
+            "pid_setpoint": 80,
+            "pid_kp": 0.1,
+            "pid_ki": 0.04,
+            "pid_kd": 0.0,
+            "pid_deadband": 5,
+            "priority": 0,
+            "gpucriticalload": 0,
             "minvalidgpu": 14,
             "minvalidfps": 14,
             "globallimitonexit_fps": 98,
@@ -43,8 +51,18 @@ class ConfigManager:
             'lhwmonitorpollinginterval': 100,
             'lhwmonitorpercentile': 70,
             'lhwmonitoringsamples': 20,
+            'frametimepollinginterval': 25,
+            'frametimesamples': 2000,
+            'frametimespikelimit': 0,
+            'controltickinterval': 1000,
+            'arbitration_policy': 'priority',
+            'criticaldroprungs': 2,
+            'gpu_usage_scope': 'all',
             'profileonstartup_name': 'Global',
         }
+        # Bumped whenever a setting attribute changes, so the monitoring loop only rebuilds
+        # its CapControllerSettings when something was actually changed
+        self.settings_version = 0
         self.settings_config = configparser.ConfigParser()
         self.profiles_config = configparser.ConfigParser()
         self.load_or_init_configs()
@@ -70,7 +88,10 @@ class ConfigManager:
                 'hide_unselected': 'False',
                 'autopilot_only_profiles': 'False',
                 'first_launch_done': 'False',
-                'hide_loading_popup': 'False'
+                'hide_loading_popup': 'False',
+                'predictive_mode': 'False',
+                'record_trace': 'False',
+                'multi_process_mode': 'False'
             }
             self.settings_config["GlobalSettings"] = {
                 'minvalidgpu': '14',
@@ -87,6 +108,13 @@ class ConfigManager:
                 'lhwmonitorpercentile': '70',
                 'lhwmonitorpollinginterval': '100',
                 'lhwmonitoringsamples': '20',
+                'frametimepollinginterval': '25',
+                'frametimesamples': '2000',
+                'frametimespikelimit': '0',
+                'controltickinterval': '1000',
+                'arbitration_policy': 'priority',
+                'criticaldroprungs': '2',
+                'gpu_usage_scope': 'all',
                 'profileonstartup_name': 'Global',
             }
             with open(self.settings_path, 'w') as f:
@@ -104,19 +132,29 @@ class ConfigManager:
                 'gpucutoffforincrease': '70',
                 'cpucutofffordecrease': '105',
                 'cpucutoffforincrease': '101',
-                'delaybeforedecrease': '2',
-                'delaybeforeincrease': '10',
+                'delaybeforedecrease': '2000',
+                'delaybeforeincrease': '10000',
                 'capmethod': 'ratio',
                 'customfpslimits': '30.01, 45.00, 59.99',
-                'monitoring_method': 'LibreHM'
+                'monitoring_method': 'LibreHM',
+                'pid_signal': 'GPU',
+                'pid_setpoint': '80',
+                'pid_kp': '0.1',
+                'pid_ki': '0.04',
+                'pid_kd': '0.0',
+                'pid_deadband': '5',
+                'priority': '0',
+                'gpucriticalload': '0'
             }
             with open(self.profiles_path, 'w') as f:
                 self.profiles_config.write(f)
-        
+        self.migrate_delay_settings()
+
         self.input_field_keys = ["maxcap", "mincap", "capstep", "capratio",
                 "gpucutofffordecrease", "gpucutoffforincrease", "cpucutofffordecrease", "cpucutoffforincrease",
                 "capmethod", "customfpslimits", "delaybeforedecrease", "delaybeforeincrease",
-                "monitoring_method"
+                "monitoring_method", "pid_signal", "pid_setpoint", "pid_kp", "pid_ki", "pid_kd", "pid_deadband",
+                "priority", "gpucriticalload"
             ]
 
         self.input_button_tags = ["rest_fps_cap_button", "autofill_fps_caps", "quick_save", "quick_load", "Reset_Default", "SaveToProfile"]
@@ -133,6 +171,14 @@ class ConfigManager:
             "capmethod": str,
             "customfpslimits": str,
             "monitoring_method": str,
+            "pid_signal": str,
+            "pid_setpoint": int,
+            "pid_kp": float,
+            "pid_ki": float,
+            "pid_kd": float,
+            "pid_deadband": int,
+            "priority": int,
+            "gpucriticalload": int,
             "delaybeforedecrease": int,
             "delaybeforeincrease": int,
             "minvalidgpu": int,
@@ -149,6 +195,13 @@ class ConfigManager:
             "lhwmonitorpollinginterval": int,
             "lhwmonitorpercentile": int,
             "lhwmonitoringsamples": int,
+            "frametimepollinginterval": int,
+            "frametimesamples": int,
+            "frametimespikelimit": int,
+            "controltickinterval": int,
+            "arbitration_policy": str,
+            "criticaldroprungs": int,
+            "gpu_usage_scope": str,
             'showtooltip': bool,
             'globallimitonexit': bool,
             'idle_mode': bool,
@@ -160,7 +213,10 @@ class ConfigManager:
             'hide_unselected': bool,
             'autopilot_only_profiles': bool,
             'first_launch_done': bool,
-            'hide_loading_popup': bool
+            'hide_loading_popup': bool,
+            'predictive_mode': bool,
+            'record_trace': bool,
+            'multi_process_mode': bool
         }
 
         self.current_profile = "Global"
@@ -170,6 +226,26 @@ class ConfigManager:
         }
         self.settings = self.Default_settings.copy()
 
+    def migrate_delay_settings(self):
+        """
+        FPS drop/raise delays used to be stored in seconds (1-99) and are now in milliseconds.
+        Converts old profile values in place and saves profiles.ini if anything changed.
+        """
+        migrated = []
+        for section in self.profiles_config.sections():
+            for key in ("delaybeforedecrease", "delaybeforeincrease"):
+                value = self.profiles_config[section].get(key)
+                try:
+                    if value is not None and int(value) < 100:
+                        self.profiles_config[section][key] = str(int(value) * 1000)
+                        migrated.append(f"{section}/{key}")
+                except ValueError:
+                    continue
+        if migrated:
+            with open(self.profiles_path, 'w') as f:
+                self.profiles_config.write(f)
+            self.logger.add_log(f"Converted FPS delay settings from seconds to milliseconds: {migrated}")
+
     def update_dynamic_input_field_keys(self):
         """
         Adds all dynamic input field keys (from sensors and legacy/static UI) to self.input_field_keys.
@@ -180,7 +256,8 @@ class ConfigManager:
             "maxcap", "mincap", "capstep", "capratio",
             "gpucutofffordecrease", "gpucutoffforincrease", "cpucutofffordecrease", "cpucutoffforincrease",
             "capmethod", "customfpslimits", "delaybeforedecrease", "delaybeforeincrease",
-            "monitoring_method"
+            "monitoring_method", "pid_signal", "pid_setpoint", "pid_kp", "pid_ki", "pid_kd", "pid_deadband",
+            "priority", "gpucriticalload"
         ]
 
         # Dynamic keys from sensors (parameter_id for each sensor)
@@ -193,7 +270,8 @@ class ConfigManager:
                     dynamic_keys.extend([
                         f"{param_id}_enable",
                         f"{param_id}_lower",
-                        f"{param_id}_upper"
+                        f"{param_id}_upper",
+                        f"{param_id}_critical"
                     ])
                 # Add hw_id-based collapsing key
                 hw_id = sensor.get("hw_id")
@@ -214,6 +292,7 @@ class ConfigManager:
             - enable: False
             - lower: 0
             - upper: 100
+            - critical: 0 (off)
         Does not overwrite existing keys.
         """
         if not hasattr(self, "sensor_infos"):
@@ -224,7 +303,7 @@ class ConfigManager:
         for sensor in self.sensor_infos:
             param_id = sensor.get("parameter_id")
             if param_id:
-                for suffix, default_value in [("_enable", False), ("_lower", 0), ("_upper", 100)]:
+                for suffix, default_value in [("_enable", False), ("_lower", 0), ("_upper", 100), ("_critical", 0)]:
                     key = f"{param_id}{suffix}"
                     if key not in self.Default_settings_original:
                         self.Default_settings_original[key] = default_value
@@ -247,6 +326,7 @@ class ConfigManager:
             - enable: bool
             - lower: int
             - upper: int
+            - critical: int
         Does not overwrite existing keys.
         """
         if not hasattr(self, "sensor_infos"):
@@ -257,7 +337,7 @@ class ConfigManager:
         for sensor in self.sensor_infos:
             param_id = sensor.get("parameter_id")
             if param_id:
-                for suffix, typ in [("_enable", bool), ("_lower", int), ("_upper", int)]:
+                for suffix, typ in [("_enable", bool), ("_lower", int), ("_upper", int), ("_critical", int)]:
                     key = f"{param_id}{suffix}"
                     if key not in self.key_type_map:
                         self.key_type_map[key] = typ
@@ -346,6 +426,7 @@ class ConfigManager:
             else:
                 value = value_type(value)
             setattr(self, key, value)
+        self.settings_version += 1
 
     def parse_input_value(self, key, value):
         value_type = self.key_type_map.get(key, int)
@@ -460,6 +541,7 @@ class ConfigManager:
                 parsed_value = self.parse_input_value(key, value)
                 # Store as string for config file
                 self.profiles_config[selected_profile][key] = str(parsed_value)
+            self.settings_version += 1  # The multi-process controllers read the profile sections
             
             with open(self.profiles_path, "w") as configfile:
                 self.profiles_config.write(configfile)
@@ -564,6 +646,7 @@ class ConfigManager:
             else:
                 #globals()[key] = value
                 setattr(self, key, value)
+        self.settings_version += 1
 
     # Read values from UI input fields without modifying `settings`
     def apply_current_input_values(self):
@@ -571,6 +654,7 @@ class ConfigManager:
             value = dpg.get_value(f"input_{key}")
             #globals()[key] = self.parse_input_value(key, value)
             setattr(self, key, self.parse_input_value(key, value))
+        self.settings_version += 1
 
     def quick_save_settings(self):
         for key in self.input_field_keys:
@@ -634,12 +718,9 @@ class ConfigManager:
 
         app_data = app_data.lower() if app_data else dpg.get_value("input_monitoring_method").lower()
 
-        if app_data == "librehm":
-            self.dpg.configure_item("LHwM_childwindow", show=True)
-            self.dpg.configure_item("legacy_childwindow", show=False)
-        else:
-            self.dpg.configure_item("LHwM_childwindow", show=False)
-            self.dpg.configure_item("legacy_childwindow", show=True)
+        self.dpg.configure_item("LHwM_childwindow", show=(app_data == "librehm"))
+        self.dpg.configure_item("legacy_childwindow", show=(app_data == "legacy"))
+        self.dpg.configure_item("pid_childwindow", show=(app_data == "pid"))
 
         self.logger.add_log(f"Method selection changed: {app_data}")
 
@@ -726,6 +807,7 @@ class ConfigManager:
         key: The attribute and config key to update (e.g., 'launchonstartup').
         """
         setattr(self, key, app_data)
+        self.settings_version += 1
         self.settings_config["Preferences"][key] = str(app_data)
         with open(self.settings_path, 'w') as f:
             self.settings_config.write(f)
@@ -742,6 +824,7 @@ class ConfigManager:
 
         if isinstance(new_value, int) and new_value > 0:
             setattr(self, key, new_value)
+            self.settings_version += 1
             self.settings_config["GlobalSettings"][key] = str(new_value)
             with open(self.settings_path, 'w') as f:
                 self.settings_config.write(f)
@@ -755,6 +838,20 @@ class ConfigManager:
             self.update_GlobalSettings_settings(key, sender, app_data, user_data)
         return callback
 
+    def update_GlobalSettings_choice(self, key, sender, app_data, user_data):
+        # For text settings picked from a combo (no int conversion)
+        setattr(self, key, str(app_data))
+        self.settings_version += 1
+        self.settings_config["GlobalSettings"][key] = str(app_data)
+        with open(self.settings_path, 'w') as f:
+            self.settings_config.write(f)
+        self.logger.add_log(f"{key} set to: {getattr(self, key)}")
+
+    def update_GlobalSettings_choice_callback(self, key):
+        def callback(sender, app_data, user_data):
+            self.update_GlobalSettings_choice(key, sender, app_data, user_data)
+        return callback
+
     def select_default_profile_callback(self, sender, app_data, user_data):
 
         current_profile = dpg.get_value("profile_dropdown")
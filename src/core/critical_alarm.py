@@ -0,0 +1,57 @@
+# critical_alarm.py
+
+import threading
+import time
+
+class CriticalLoadAlarm:
+    """
+    Lets the sampler threads wake the control loop as soon as a rolling percentile
+    reaches a critical threshold, instead of waiting for the next control tick and
+    the FPS drop delay.
+
+    Samplers call check() with every new percentile. Each source trips once when it
+    reaches its threshold, then stays quiet until it falls below threshold -
+    rearm_margin or holdoff seconds have passed (the percentile window needs some
+    time to reflect a lower cap). A trip sets `event`; the control loop waits on it
+    and collects the trips with consume().
+    """
+
+    def __init__(self, rearm_margin=5.0, holdoff=2.0):
+        self.rearm_margin = rearm_margin
+        self.holdoff = holdoff
+        self.event = threading.Event()
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._tripped_at = {}  # source -> monotonic time of its last trip
+            self._pending = []
+            self.trips = 0
+            self.event.clear()
+
+    def check(self, source, value, threshold):
+        """Called by a sampler with a new reading. A threshold of 0 or None disables the source. Returns True on a trip."""
+        if not threshold or value is None:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            tripped_at = self._tripped_at.get(source)
+            if value < threshold:
+                if tripped_at is not None and value < threshold - self.rearm_margin:
+                    del self._tripped_at[source]
+                return False
+            if tripped_at is not None and now - tripped_at < self.holdoff:
+                return False
+            self._tripped_at[source] = now
+            self._pending.append((source, value, threshold))
+            self.trips += 1
+        self.event.set()
+        return True
+
+    def consume(self):
+        """Returns the (source, value, threshold) trips since the last call and clears the event."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self.event.clear()
+        return pending
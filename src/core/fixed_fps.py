@@ -0,0 +1,83 @@
+# fixed_fps.py
+
+from math import gcd
+from typing import NamedTuple
+
+class FixedFPS(NamedTuple):
+    """
+    A framerate as an integer numerator over a denominator, e.g. 59.94 -> FixedFPS(5994, 100).
+
+    This is the form RTSS stores limits in (Limit / LimitDenominator), so caps built
+    by CapLadder can be written out without any conversion.
+    """
+    units: int
+    denominator: int = 1
+
+    def __float__(self):
+        return self.units / self.denominator
+
+    def __str__(self):
+        den = self.denominator
+        if den == 1:
+            return str(self.units)
+        digits = len(str(den)) - 1
+        if den != 10 ** digits:
+            return f"{self.units / den:g}"
+        whole, frac = divmod(abs(self.units), den)
+        sign = "-" if self.units < 0 else ""
+        return f"{sign}{whole}.{frac:0{digits}d}"
+
+    def __format__(self, spec):
+        return format(float(self), spec) if spec else str(self)
+
+def to_fixed(value):
+    """
+    Converts a framerate to FixedFPS exactly: FixedFPS is returned as is, ints get
+    denominator 1 and Decimals (parsed user input) use their decimal places.
+    """
+    if isinstance(value, FixedFPS):
+        return value
+    if isinstance(value, int):
+        return FixedFPS(value)
+    as_tuple = getattr(value, "as_tuple", None)
+    if as_tuple is None:
+        raise TypeError(f"Cannot convert {value!r} to a fixed-point framerate")
+    sign, digits, exponent = as_tuple()
+    units = 0
+    for digit in digits:
+        units = units * 10 + digit
+    if sign:
+        units = -units
+    if exponent >= 0:
+        return FixedFPS(units * 10 ** exponent)
+    return FixedFPS(units, 10 ** -exponent)
+
+def same_framerate(a, b):
+    """
+    Whether two framerates are the same value whatever their form: FixedFPS(6000, 100),
+    FixedFPS(60) and 60 all are. Compares as fractions, so no float rounding.
+    """
+    if a is None or b is None:
+        return a is b
+    try:
+        a, b = to_fixed(a), to_fixed(b)
+    except TypeError:
+        return a == b
+    return a.units * b.denominator == b.units * a.denominator
+
+def parse_fixed(text):
+    """Parses a plain decimal string ("60", "59.94") to FixedFPS without going through floats."""
+    text = text.strip()
+    sign = -1 if text.startswith("-") else 1
+    whole, _, frac = text.lstrip("+-").partition(".")
+    if not (whole or frac) or not (whole or "0").isdigit() or (frac and not frac.isdigit()):
+        raise ValueError(f"Invalid framerate: {text!r}")
+    denominator = 10 ** len(frac)
+    return FixedFPS(sign * (int(whole or 0) * denominator + int(frac or 0)), denominator)
+
+def common_denominator(denominators):
+    """Least common multiple of the denominators (1 for an empty input)."""
+    result = 1
+    for den in denominators:
+        result = result * den // gcd(result, den)
+    return result
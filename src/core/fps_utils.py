@@ -4,6 +4,7 @@ from pathlib import Path
 import dearpygui.dearpygui as dpg
 import statistics
 from collections import deque
+from core.cap_ladder import CapLadder, stepped_caps, ratioed_caps
 
 class FPSUtils:
     def __init__(self, cm, lhm_sensor, logger=None, dpg=None, viewport_width=610, base_dir=None):
@@ -13,6 +14,10 @@ class FPSUtils:
         self.dpg = dpg or dpg  # fallback to global if not passed
         self.viewport_width = viewport_width
         self.last_fps_limits = []
+        self._ladder = None
+        self._ladder_key = None
+        self._lhm_check_states = {}  # sensor key -> "over" / "under" / "within", last logged
+        self.frametime_sampler = None  # Set by the main module once RTSS shared memory is available
 
         self.reset_summary_statistics()
 
@@ -48,42 +53,22 @@ class FPSUtils:
         elif use_custom == "ratio":
             return self.make_ratioed_values(maximum, minimum, ratio)
 
+    def current_ladder(self):
+        """Returns the current limits as a CapLadder, rebuilt only when the cap inputs change."""
+        key = tuple(dpg.get_value(f"input_{k}") for k in ("maxcap", "mincap", "capstep", "capratio", "capmethod", "customfpslimits"))
+        if key != self._ladder_key or self._ladder is None:
+            limits = self.current_stepped_limits()
+            if not limits:
+                return None
+            self._ladder = CapLadder(limits)
+            self._ladder_key = key
+        return self._ladder
+
     def make_stepped_values(self, maximum, minimum, step):
-        values = list(range(maximum, minimum - 1, -step))
-        if minimum not in values:
-            values.append(minimum)
-        return sorted(set(values))
+        return stepped_caps(maximum, minimum, step)
 
     def make_ratioed_values(self, maximum, minimum, ratio):
-        values = []
-        current = maximum
-        ratio_factor = 1 - (ratio / 100.0)
-        if ratio_factor <= 0 or ratio_factor >= 1:
-            return sorted(set([maximum, minimum]))
-        prev_diff = None
-        values.append(int(round(current)))
-
-        while current >= minimum:
-            current = current * ratio_factor
-            rounded_current = int(round(current))
-            if len(values) >= 3:
-                prev_diff = abs(values[-1] - values[-2])
-            if prev_diff is not None and abs(rounded_current - values[-1]) > prev_diff:
-                rounded_current = values[-1] - prev_diff
-
-            # Duplicate detection and correction
-            while rounded_current in values and rounded_current > minimum:
-                rounded_current -= 1
-
-            values.append(rounded_current)
-            current = rounded_current
-
-            if rounded_current <= minimum:
-                break
-        if minimum not in values:
-            values.append(minimum)
-        custom_limits = sorted(x for x in set(values) if x >= minimum)
-        return custom_limits
+        return ratioed_caps(maximum, minimum, ratio)
 
     def update_fps_cap_visualization(self):
         dpg = self.dpg
@@ -131,166 +116,123 @@ class FPSUtils:
         upperlimit = self.dpg.get_value("input_maxcap")
         self.dpg.set_value("input_customfpslimits", f"{lowerlimit}, {upperlimit}")
         
-    def evaluate_cap_change(self, gpu_values, cpu_values):
+    def collect_lhm_readings(self):
         """
-        Returns a tuple (should_decrease, should_increase).
-        Preserves existing semantics:
-          - Legacy: decrease = (gpu_decrease OR cpu_decrease), increase = (gpu_increase AND cpu_increase)
-          - LibreHM: decrease = any(enabled sensor value >= upper), increase = all(enabled sensor value <= lower)
+        Returns (value, lower, upper) for each enabled LibreHM sensor, as ControlSample.sensor_readings
+        (value None if the sensor has no reading, lower/upper None if the threshold is invalid).
+        Also refreshes the LHM sensor summary text.
         """
-        monitoring_method = self.dpg.get_value("input_monitoring_method")
         cm = self.cm
         lhm_sensor = self.lhm_sensor
 
-        # Legacy behavior: GPU/CPU thresholds and delays
-        if monitoring_method == "Legacy":
-            gpu_decrease_condition = (
-                len(gpu_values) >= cm.delaybeforedecrease and
-                all(value >= cm.gpucutofffordecrease for value in gpu_values[-cm.delaybeforedecrease:])
-            )
-            cpu_decrease_condition = (
-                len(cpu_values) >= cm.delaybeforedecrease and
-                all(value >= cm.cpucutofffordecrease for value in cpu_values[-cm.delaybeforedecrease:])
-            )
-            should_decrease = gpu_decrease_condition or cpu_decrease_condition
-
-            gpu_increase_condition = (
-                len(gpu_values) >= cm.delaybeforeincrease and
-                all(value <= cm.gpucutoffforincrease for value in gpu_values[-cm.delaybeforeincrease:])
-            )
-            cpu_increase_condition = (
-                len(cpu_values) >= cm.delaybeforeincrease and
-                all(value <= cm.cpucutoffforincrease for value in cpu_values[-cm.delaybeforeincrease:])
-            )
-            should_increase = gpu_increase_condition and cpu_increase_condition
-
-            return (should_decrease, should_increase)
-
-        # LibreHM behavior: evaluate enabled sensors once and derive decrease/increase
-        elif monitoring_method == "LibreHM":
-            decrease_checks = []
-            increase_checks = []
-            groups = {}
-            sensor_infos = getattr(cm, "sensor_infos", []) or []
-
-            if not sensor_infos:
-                return (False, False)
-
-            for sensor in sensor_infos:
-                param_id = sensor.get("parameter_id")
-                enable_tag = f"input_{param_id}_enable"
-                upper_tag = f"input_{param_id}_upper"
-                lower_tag = f"input_{param_id}_lower"
-
-                if not param_id or not self.dpg.does_item_exist(enable_tag):
-                    continue
+        readings = []
+        groups = {}
+        sensor_infos = getattr(cm, "sensor_infos", []) or []
 
-                try:
-                    if not self.dpg.get_value(enable_tag):
-                        continue
-                except Exception:
-                    continue
+        if not sensor_infos:
+            return readings
 
-                # read thresholds; if invalid, skip corresponding check
-                upper = None
-                lower = None
-                try:
-                    upper = float(self.dpg.get_value(upper_tag))
-                except Exception:
-                    pass
-                try:
-                    lower = float(self.dpg.get_value(lower_tag))
-                except Exception:
-                    pass
-
-                sensor_type = sensor.get("sensor_type")
-                sensor_name = sensor.get("sensor_name")
-                hw_name = sensor.get("hw_name")
-                hw_type = sensor.get("hw_type")
-                value = None
-
-                # CPU sensors use exact name keys in cpu_percentiles
-                if hw_type == self.HardwareType.Cpu:
-                    key = (sensor_type, sensor_name)
-                    value = lhm_sensor.cpu_percentiles.get(key)
-                    values_long = lhm_sensor.cpu_history_long.get(key, [])
-                else:
-                    sensor_name_indexed = sensor.get("sensor_name_indexed") or sensor_name
-                    key = (sensor_type, sensor_name_indexed)
-                    value = lhm_sensor.gpu_percentiles.get(key)
-                    values_long = lhm_sensor.gpu_history_long.get(key, [])
-                    if value is None:
-                        if hasattr(lhm_sensor, "gpu_hw_names"):
-                            try:
-                                idx = lhm_sensor.gpu_hw_names.index(hw_name) + 1
-                                key2 = (sensor_type, f"{idx} {sensor_name}")
-                                value = lhm_sensor.gpu_percentiles.get(key2)
-                                values_long = lhm_sensor.gpu_history_long.get(key2, [])
-                            except ValueError:
-                                value = None
-                                values_long = []
-                        if value is None:
-                            for k, v in lhm_sensor.gpu_percentiles.items():
-                                if k[0] == sensor_type and k[1].endswith(sensor_name):
-                                    value = v
-                                    break
-                        
-                        if not values_long:
-                            for k, v in lhm_sensor.gpu_history_long.items():
-                                if k[0] == sensor_type and k[1].endswith(sensor_name):
-                                    values_long = v
-                                    break
-
-                # compute avg/std/median for this sensor
-                try:
-                    avg = statistics.mean(values_long)
-                    std = statistics.stdev(values_long) if len(values_long) > 1 else 0.0
-                    med = statistics.median(values_long)
-                    display_name = sensor_name
-                    sensor_type_str = getattr(sensor_type, "name", str(sensor_type))
-                    hw_display = hw_name or "Unknown"
-                    groups.setdefault(hw_display, {}).setdefault(sensor_type_str, []).append(
-                        (display_name, avg, std, med)
-                    )
-                except Exception:
-                    # skip sensors that fail stats computation
+        long_stats = lhm_sensor.long_stats()  # One vectorized pass over every sensor's history
+        for sensor in sensor_infos:
+            param_id = sensor.get("parameter_id")
+            enable_tag = f"input_{param_id}_enable"
+            upper_tag = f"input_{param_id}_upper"
+            lower_tag = f"input_{param_id}_lower"
+
+            if not param_id or not self.dpg.does_item_exist(enable_tag):
+                continue
+
+            try:
+                if not self.dpg.get_value(enable_tag):
                     continue
+            except Exception:
+                continue
 
-                # Log once per sensor
-                self.logger.add_log(f"LibreHM check {hw_name}/{sensor_type}/{sensor_name}: value={value} lower={lower} upper={upper}")
-
-                if value is not None:
-                    if upper is not None:
-                        decrease_checks.append(value >= upper)
-                    if lower is not None:
-                        increase_checks.append(value <= lower)
-
-            should_decrease = any(decrease_checks) if decrease_checks else False
-            should_increase = all(increase_checks) if increase_checks else False
-
-            # Sort sensor summary lines alphabetically (case-insensitive) before showing
-            if groups:
-                out_lines = []
-                name_w = 26
-                for hw in sorted(groups.keys(), key=lambda s: s.casefold()):
-                    out_lines.append(f"{hw}")
-                    for st in sorted(groups[hw].keys(), key=lambda s: s.casefold()):
-                        out_lines.append(f"{st}:")
-                        for sn, avg, std, med in sorted(groups[hw][st], key=lambda x: x[0].casefold()):
-                            sn_col = f"{sn}:"
-                            if len(sn_col) > name_w:
-                                sn_col = sn_col[: max(0, name_w - 3)] + "..."
-                            out_lines.append(f"  {sn_col:<{name_w}} avg={avg:6.2f} | std={std:6.2f} | med={med:6.2f}")
-                    out_lines.append("")  # blank line between hardware blocks
-                summary_text = "\n".join(out_lines).rstrip()
-            else:
-                summary_text = "No enabled LibreHM sensors with data."
+            # read thresholds; if invalid, skip corresponding check
+            upper = None
+            lower = None
             try:
-                dpg.set_value("SummaryText", summary_text)
+                upper = float(self.dpg.get_value(upper_tag))
             except Exception:
                 pass
+            try:
+                lower = float(self.dpg.get_value(lower_tag))
+            except Exception:
+                pass
+
+            sensor_type = sensor.get("sensor_type")
+            sensor_name = sensor.get("sensor_name")
+            hw_name = sensor.get("hw_name")
 
-            return (should_decrease, should_increase)
+            key = lhm_sensor.find_key(sensor)
+            value = lhm_sensor.percentile_of(key) if key is not None else None
+
+            # avg/std/median for this sensor, from the stats computed above for all of them
+            if key in long_stats:
+                avg, std, med = long_stats[key]
+                sensor_type_str = getattr(sensor_type, "name", str(sensor_type))
+                hw_display = hw_name or "Unknown"
+                groups.setdefault(hw_display, {}).setdefault(sensor_type_str, []).append(
+                    (sensor_name, avg, std, med)
+                )
+
+            # Log when a sensor crosses a bound, not every tick
+            state = ("over" if value is not None and upper is not None and value >= upper else
+                     "under" if value is not None and lower is not None and value <= lower else "within")
+            if self._lhm_check_states.get(key) != state:
+                self._lhm_check_states[key] = state
+                self.logger.add_log(f"LibreHM check {hw_name}/{sensor_type}/{sensor_name}: value={value} lower={lower} upper={upper} ({state})")
+
+            readings.append((value, lower, upper))
+
+        # Sort sensor summary lines alphabetically (case-insensitive) before showing
+        if groups:
+            out_lines = []
+            name_w = 26
+            for hw in sorted(groups.keys(), key=lambda s: s.casefold()):
+                out_lines.append(f"{hw}")
+                for st in sorted(groups[hw].keys(), key=lambda s: s.casefold()):
+                    out_lines.append(f"{st}:")
+                    for sn, avg, std, med in sorted(groups[hw][st], key=lambda x: x[0].casefold()):
+                        sn_col = f"{sn}:"
+                        if len(sn_col) > name_w:
+                            sn_col = sn_col[: max(0, name_w - 3)] + "..."
+                        out_lines.append(f"  {sn_col:<{name_w}} avg={avg:6.2f} | std={std:6.2f} | med={med:6.2f}")
+                out_lines.append("")  # blank line between hardware blocks
+            summary_text = "\n".join(out_lines).rstrip()
+        else:
+            summary_text = "No enabled LibreHM sensors with data."
+        try:
+            dpg.set_value("SummaryText", summary_text)
+        except Exception:
+            pass
+
+        return readings
+
+    def critical_sensor_thresholds(self):
+        """
+        (sensor_type, name) -> critical value for each enabled LibreHM sensor with a
+        critical threshold set, keyed like LHMSensor's store so the sampler can
+        check them itself.
+        """
+        thresholds = {}
+        for sensor in getattr(self.cm, "sensor_infos", []) or []:
+            param_id = sensor.get("parameter_id")
+            critical_tag = f"input_{param_id}_critical"
+            if not param_id or not self.dpg.does_item_exist(critical_tag):
+                continue
+            try:
+                if not self.dpg.get_value(f"input_{param_id}_enable"):
+                    continue
+                critical = float(self.dpg.get_value(critical_tag))
+            except Exception:
+                continue
+            if critical <= 0:
+                continue
+            key = self.lhm_sensor.find_key(sensor)
+            if key is not None:
+                thresholds[key] = critical
+        return thresholds
 
     def update_summary_statistics(self):
         dpg = self.dpg
@@ -320,6 +262,17 @@ class FPSUtils:
         fps_avg, fps_std, fps_med, fps_mode = compute_stats(self.summary_fps)
         cap_avg, cap_std, cap_med, cap_mode = compute_stats(self.summary_cap)
 
+        frametime_stats = self.frametime_sampler.get_stats() if self.frametime_sampler else None
+        if frametime_stats:
+            ft_avg = f"{frametime_stats['frametime_avg']:.2f}"
+            ft_std = f"{frametime_stats['frametime_std']:.2f}"
+            ft_med = f"{frametime_stats['frametime_median']:.2f}"
+            low_1 = f"{frametime_stats['low_1']:.2f}"
+            low_01 = f"{frametime_stats['low_01']:.2f}"
+            spikes = str(frametime_stats['spikes'])
+        else:
+            ft_avg = ft_std = ft_med = low_1 = low_01 = spikes = "--"
+
         # Write to DPG fields (tags defined in DFL_v5.py)
         try:
             dpg.set_value("summary_fps_avg", fps_avg)
@@ -332,6 +285,14 @@ class FPSUtils:
             dpg.set_value("summary_cap_median", cap_med)
             dpg.set_value("summary_cap_mode", cap_mode)
 
+            dpg.set_value("summary_ft_avg", ft_avg)
+            dpg.set_value("summary_ft_std", ft_std)
+            dpg.set_value("summary_ft_median", ft_med)
+            dpg.set_value("summary_ft_mode", "--")
+            dpg.set_value("summary_low_1", low_1)
+            dpg.set_value("summary_low_01", low_01)
+            dpg.set_value("summary_spikes", spikes)
+
         except Exception:
             # silently ignore any GUI update errors
             pass
@@ -341,5 +302,4 @@ class FPSUtils:
         self.summary_fps = []
         self.summary_cap = []
 
-        self.lhm_sensor.cpu_history_long.clear()
-        self.lhm_sensor.gpu_history_long.clear()
\ No newline at end of file
+        self.lhm_sensor.clear_history()
\ No newline at end of file
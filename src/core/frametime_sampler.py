@@ -0,0 +1,122 @@
+# frametime_sampler.py
+
+import threading
+import time
+import numpy as np
+
+class FrametimeSampler:
+    """
+    Samples dwFrameTime of the tracked RTSS app entry at 20-50 Hz into a fixed-size ring buffer.
+
+    The 1 Hz FPS reading averages frames over RTSS's own measurement window and hides
+    frametime spikes; this sampler keeps frametimes so stutter can be summarised as
+    1% / 0.1% lows, frametime standard deviation and spike counts.
+
+    These are stats of *sampled* frametimes, not of every frame: each poll sees the
+    last frame's time only, so at 100+ FPS most frames are never read, and a stutter
+    that falls between two polls is missed. The lows and spike counts are estimates
+    from that subset (a long frame is more likely to be caught, since it is on screen
+    longer). The frame counters in shared memory (dwFrames over dwTime0/dwTime1) give
+    only averages per interval, so they can't recover the per-frame distribution either.
+    They do tell whether a new frame arrived since the last poll: below the polling rate
+    consecutive polls see the same frame, and it is only recorded once.
+    """
+
+    MIN_INTERVAL = 0.02  # 50 Hz
+    MAX_INTERVAL = 0.05  # 20 Hz
+
+    def __init__(self, logger_instance, shared_memory, interval=0.025, max_samples=2000, spike_factor=2.0,
+                 is_rtss_running=None):
+        self.logger = logger_instance
+        self.shared_memory = shared_memory  # RTSSSharedMemoryReader
+        self.is_rtss_running = is_rtss_running  # Optional callable; polls are skipped while it returns False
+        self.interval = min(max(interval, self.MIN_INTERVAL), self.MAX_INTERVAL)
+        self.max_samples = max_samples
+        self.spike_factor = spike_factor
+        self.target_pid = None
+        self._frametimes = np.zeros(max_samples, dtype=np.float32)  # milliseconds
+        self._times = np.zeros(max_samples, dtype=np.float64)  # time.monotonic() of each sample
+        self._pos = 0
+        self._count = 0
+        self._last_frame = None  # (pid, dwFrames, dwTime1) of the last recorded frame
+        self._lock = threading.Lock()
+
+    def set_target(self, process_id):
+        """Sets the process whose frametimes are sampled; switching process clears the buffer."""
+        if process_id == self.target_pid:
+            return
+        with self._lock:
+            self.target_pid = process_id
+            self._pos = 0
+            self._count = 0
+
+    def start(self):
+        """Clears the buffer for a new monitoring run (polling itself is done by the SamplingScheduler)."""
+        with self._lock:
+            self._pos = 0
+            self._count = 0
+        self.logger.add_log(f"Frametime sampling started with interval: {round(self.interval*1000)} ms, max_samples: {self.max_samples}")
+
+    def add_sample(self, frametime_ms, now=None):
+        with self._lock:
+            self._frametimes[self._pos] = frametime_ms
+            self._times[self._pos] = time.monotonic() if now is None else now
+            self._pos = (self._pos + 1) % self.max_samples
+            self._count = min(self._count + 1, self.max_samples)
+
+    def poll(self):
+        """Reads the tracked app's current frametime once. Run by the SamplingScheduler."""
+        pid = self.target_pid
+        if pid:
+            try:
+                if self.is_rtss_running is not None and not self.is_rtss_running():
+                    return
+                entry = self.shared_memory.read_app_entry(pid)
+                if entry is not None:
+                    _, _, _, _, dwTime1, dwFrames, dwFrameTime = entry  # dwFrameTime in microseconds
+                    # No new frame since the last poll (FPS below the polling rate): don't count it twice
+                    frame = (pid, dwFrames, dwTime1)
+                    if dwFrameTime > 0 and frame != self._last_frame:
+                        self._last_frame = frame
+                        self.add_sample(dwFrameTime / 1000.0)
+            except Exception as e:
+                self.logger.add_log(f"Frametime sampler error: {e}")
+
+    def _recent(self, window_seconds=None):
+        """Returns a copy of the newest samples (all of them, or those from the last window_seconds)."""
+        with self._lock:
+            count = self._count
+            if count == 0:
+                return self._frametimes[:0].copy()
+            idx = (self._pos - count + np.arange(count)) % self.max_samples
+            if window_seconds is not None:
+                # Polls without a new frame add nothing, so the window is by time, not by count
+                idx = idx[self._times[idx] >= time.monotonic() - window_seconds]
+                if idx.size == 0:
+                    idx = np.array([(self._pos - 1) % self.max_samples])
+            return self._frametimes[idx]
+
+    def get_stats(self, window_seconds=None):
+        """
+        Returns statistics of the sampled frametimes over the buffer (or the last
+        window_seconds), or None without data.
+
+        Keys: samples, frametime_avg, frametime_std, frametime_median (ms), low_1 and low_01
+        (1% / 0.1% low FPS, from the 99th / 99.9th percentile sampled frametime) and spikes
+        (sampled frametimes longer than spike_factor x median).
+        """
+        frametimes = self._recent(window_seconds)
+        if frametimes.size == 0:
+            return None
+
+        median = float(np.median(frametimes))
+        p99, p999 = np.percentile(frametimes, [99, 99.9])
+        return {
+            "samples": int(frametimes.size),
+            "frametime_avg": float(frametimes.mean()),
+            "frametime_std": float(frametimes.std()),
+            "frametime_median": median,
+            "low_1": 1000.0 / float(p99) if p99 > 0 else 0.0,
+            "low_01": 1000.0 / float(p999) if p999 > 0 else 0.0,
+            "spikes": int(np.count_nonzero(frametimes > median * self.spike_factor)),
+        }
@@ -0,0 +1,80 @@
+# gpu_engine_instances.py
+
+import re
+from collections import defaultdict, namedtuple
+
+# How GPUUsageMonitor turns 3D engine counters into one usage value:
+# "all": the busiest adapter (LUID), every process on it counted
+# "render": the adapter the game renders on, every process on it counted
+# "game": only the game's own usage on that adapter (overlays, browsers, capture apps left out)
+GPU_USAGE_SCOPES = ("all", "render", "game")
+
+EngineInstance = namedtuple("EngineInstance", "pid luid phys eng engtype")
+
+# e.g. pid_11804_luid_0x00000000_0x0000D1B7_phys_0_eng_0_engtype_3D
+_INSTANCE_RE = re.compile(
+    r"pid_(\d+)_luid_0x[0-9A-Fa-f]+_(0x[0-9A-Fa-f]+)_phys_(\d+)_eng_(\d+)_engtype_(.*)$"
+)
+
+def parse_engine_instance(name):
+    """An EngineInstance from a "GPU Engine" counter instance name, or None if it doesn't match."""
+    match = _INSTANCE_RE.search(name)
+    if not match:
+        return None
+    pid, luid, phys, eng, engtype = match.groups()
+    return EngineInstance(int(pid), luid, int(phys), int(eng), engtype)
+
+def parse_recording(text, engine_type="engtype_3D"):
+    """(instance name, utilization) pairs of one engine type from recorded "<utilization> <instance name>" lines."""
+    readings = []
+    for line in text.splitlines():
+        value, _, name = line.strip().partition(" ")
+        if name and name.endswith(engine_type):
+            readings.append((name, float(value)))
+    return readings
+
+def usage_by_process(readings):
+    """(instance name, utilization) pairs -> {(pid, luid): summed utilization}."""
+    usage = defaultdict(float)
+    for name, value in readings:
+        inst = parse_engine_instance(name)
+        if inst is not None:
+            usage[(inst.pid, inst.luid)] += value
+    return dict(usage)
+
+def usage_by_luid(per_process):
+    usage = defaultdict(float)
+    for (_, luid), value in per_process.items():
+        usage[luid] += value
+    return dict(usage)
+
+def render_luid(per_process, pid, previous=None):
+    """
+    The LUID a process renders on: the adapter where it has the most 3D usage. While it
+    has none anywhere (loading screens, a paused game) previous is kept if the process
+    still has counters on it.
+    """
+    luids = {luid: value for (p, luid), value in per_process.items() if p == pid}
+    if not luids:
+        return None
+    best = max(luids, key=luids.get)
+    if luids[best] <= 0 and previous in luids:
+        return previous
+    return best
+
+def select_usage(per_process, scope="all", pid=None, previous_luid=None):
+    """
+    The usage GPUUsageMonitor reports for a scope. Returns (usage, luid, pid_found).
+    Without the process's counters (unknown PID, or instances not picked up yet)
+    "render" and "game" fall back to "all", with pid_found False.
+    """
+    luid = render_luid(per_process, pid, previous_luid) if pid is not None and scope != "all" else None
+    if luid is None:
+        totals = usage_by_luid(per_process)
+        if not totals:
+            return 0.0, None, False
+        best = max(totals, key=totals.get)
+        return totals[best], best, False
+    if scope == "game":
+        return per_process.get((pid, luid), 0.0), luid, True
+    return usage_by_luid(per_process).get(luid, 0.0), luid, True
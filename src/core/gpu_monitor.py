@@ -1,75 +1,34 @@
 import ctypes
 import time
 from collections import defaultdict
-import re
-from typing import Optional, Dict, List, Tuple
+from typing import Dict, List
 import threading
+from core.rolling_quantile import RollingQuantiles
+from core.gpu_engine_instances import GPU_USAGE_SCOPES, parse_engine_instance, usage_by_process, select_usage
 
 pdh = ctypes.windll.pdh
 
 PDH_MORE_DATA = 0x800007D2
 PDH_FMT_DOUBLE = 0x00000200
+PDH_CSTATUS_NEW_DATA = 0x00000001
 
 class PDH_FMT_COUNTERVALUE(ctypes.Structure):
     _fields_ = [("CStatus", ctypes.c_ulong), ("doubleValue", ctypes.c_double)]
 
-class GPUUsageMonitor:
-    def __init__(self, get_running, logger_instance, dpg_instance, themes_instance, interval=0.1, max_samples=20, percentile=70):
-        self.interval = interval
-        self.max_samples = max_samples
-        self.samples = []
-        self.gpu_percentile = 0
-        self.percentile = percentile
-        self.logger = logger_instance
-        self.dpg = dpg_instance
-        self.themes_manager = themes_instance
-        self.query_handle = None
-        self.counter_handles = {}
-        self.instances = []  # Add this line
-        self.initialize()
-        self.luid_selected = False
-        self.luid = "All"
-
-        # Start background thread
-        self._running = get_running
-        self.looping = True
-        self._lock = threading.Lock()
-        self._thread = threading.Thread(target=self.gpu_run, daemon=True)
-        self._thread.start()
-        self.logger.add_log(f"GPU monitoring started with interval: {round(self.interval*1000)} ms, max_samples: {self.max_samples}, percentile: {self.percentile}")
-
-    def initialize(self) -> None:
-        """Initialize PDH query."""
-        self.query_handle = self._init_gpu_state()
-        self.instances = self._setup_gpu_instances()  # Store instances
-        self.query_handle, self.counter_handles = self._setup_gpu_query_from_instances(
-            self.query_handle, self.instances, "engtype_3D"
-        )
-        if self.query_handle is None:
-            raise RuntimeError("Query handle not set up.")
-
-    def _init_gpu_state(self) -> ctypes.c_void_p:
-        """Initialize PDH query and return the handle."""
-        query_handle = ctypes.c_void_p()
-        status = pdh.PdhOpenQueryW(None, 0, ctypes.byref(query_handle))
-        
-        if status != 0:
-            raise RuntimeError(f"Failed to open PDH query. Error: {status}")
-        
-        return query_handle
-
-    def _setup_gpu_instances(self) -> List[str]:
-        """Set up GPU instances and return a list of them."""
-        counter_buf_size = ctypes.c_ulong(0)
-        instance_buf_size = ctypes.c_ulong(0)
-
-        pdh.PdhEnumObjectItemsW(
+def enumerate_gpu_engine_instances() -> List[str]:
+    """Instance names of the "GPU Engine" counter object (one per process, adapter and engine)."""
+    counter_buf_size = ctypes.c_ulong(0)
+    instance_buf_size = ctypes.c_ulong(0)
+    for _ in range(5):
+        # Instances come and go between the size query and the read; retry on PDH_MORE_DATA
+        ret = pdh.PdhEnumObjectItemsW(
             None, None, "GPU Engine",
             None, ctypes.byref(counter_buf_size),
             None, ctypes.byref(instance_buf_size),
             0, 0
         )
-
+        counter_buf_size.value += 1024
+        instance_buf_size.value += 16384
         counter_buf = (ctypes.c_wchar * counter_buf_size.value)()
         instance_buf = (ctypes.c_wchar * instance_buf_size.value)()
 
@@ -79,87 +38,231 @@ class GPUUsageMonitor:
             instance_buf, ctypes.byref(instance_buf_size),
             0, 0
         )
+        if ret & 0xFFFFFFFF != PDH_MORE_DATA:
+            break
+
+    if ret != 0:
+        raise RuntimeError(f"Failed to enumerate GPU Engine instances. Error: {ret}")
+
+    return list(filter(None, instance_buf[:].split('\x00')))
+
+class PdhInstanceTracker:
+    """
+    One long-lived PDH query holding a "Utilization Percentage" counter for every GPU
+    Engine instance of one engine type.
+
+    refresh() re-enumerates the instances and diffs them against the counters already
+    in the query: counters are added for new instances (a game creating its contexts)
+    and removed for the ones that are gone, everything else keeps its handle and its
+    history. Enumeration is rate limited to once per min_interval; a request inside
+    that window is remembered and done by the next maintain() call, so a burst of
+    window changes or failed reads costs one enumeration.
+
+    A newly added counter needs two collections before it has a value, so read()
+    leaves it out until then instead of treating it as a failure. A failing read of
+    an older counter means its instance went away: it is skipped and a refresh is
+    requested.
+
+    Not thread safe; GPUUsageMonitor holds its query lock around it.
+    """
+
+    def __init__(self, engine_type="engtype_3D", min_interval=1.0, rescan_interval=5.0, logger_instance=None):
+        self.engine_type = engine_type
+        self.min_interval = min_interval
+        self.rescan_interval = rescan_interval  # Also re-enumerate this often without a request
+        self.logger = logger_instance
+        self.query_handle = None
+        self.counters = {}  # instance -> (counter handle, collection it was added at)
+        self.collections = 0
+        self._last_enumeration = None
+        self._refresh_requested = False
+        # Diagnostics
+        self.queries_opened = 0
+        self.queries_closed = 0
+        self.enumerations = 0
+        self.rate_limited = 0
+        self.added = 0
+        self.removed = 0
+        self.add_failures = 0
+        self.remove_failures = 0  # PdhRemoveCounter errors: those handles leak
+        self.read_failures = 0
+
+    def _log(self, message):
+        if self.logger:
+            self.logger.add_log(message)
+
+    def open(self):
+        if self.query_handle is not None:
+            return
+        query_handle = ctypes.c_void_p()
+        status = pdh.PdhOpenQueryW(None, 0, ctypes.byref(query_handle))
+        if status != 0:
+            raise RuntimeError(f"Failed to open PDH query. Error: {status}")
+        self.query_handle = query_handle
+        self.queries_opened += 1
 
-        if ret != 0:
-            raise RuntimeError(f"Failed to enumerate GPU Engine instances. Error: {ret}")
+    def close(self):
+        """Closes the query (which frees its counters)."""
+        if self.query_handle is not None:
+            pdh.PdhCloseQuery(self.query_handle)
+            self.query_handle = None
+            self.queries_closed += 1
+        self.counters.clear()
 
-        instances = list(filter(None, instance_buf[:].split('\x00')))
-        if not instances:
-            raise RuntimeError("No GPU engine instances found.")
-            
-        return instances
-
-    def _setup_gpu_query_from_instances(
-        self, 
-        query_handle: ctypes.c_void_p, 
-        instances: List[str], 
-        engine_type: str = "engtype_"
-    ) -> Tuple[ctypes.c_void_p, Dict]:
-        """Set up GPU query and counters from instances."""
-        counter_handles_by_luid = defaultdict(list)
-
-        for inst in instances:
-            if engine_type not in inst:
-                continue
-
-            match = re.search(r"luid_0x[0-9A-Fa-f]+_(0x[0-9A-Fa-f]+)", inst)
-            if not match:
-                continue
-
-            luid = match.group(1)
+    def request_refresh(self):
+        self._refresh_requested = True
+
+    def refresh(self, force=False):
+        """
+        Re-enumerates the instances and applies the difference to the query, unless the
+        last enumeration was less than min_interval ago (then it is deferred to maintain()).
+        Returns (added, removed) instance counts, or None when deferred.
+        """
+        now = time.monotonic()
+        if not force and self._last_enumeration is not None and now - self._last_enumeration < self.min_interval:
+            self.rate_limited += 1
+            self._refresh_requested = True
+            return None
+        self._last_enumeration = now
+        self._refresh_requested = False
+        self.open()
+
+        instances = {inst for inst in enumerate_gpu_engine_instances()
+                     if self.engine_type in inst and parse_engine_instance(inst)}
+        self.enumerations += 1
+        gone = [inst for inst in self.counters if inst not in instances]
+        new = [inst for inst in instances if inst not in self.counters]
+
+        for inst in gone:
+            handle, _ = self.counters.pop(inst)
+            if pdh.PdhRemoveCounter(handle) == 0:
+                self.removed += 1
+            else:
+                self.remove_failures += 1
+
+        added = 0
+        for inst in new:
             counter_path = f"\\GPU Engine({inst})\\Utilization Percentage"
             counter_handle = ctypes.c_void_p()
-            
-            status = pdh.PdhAddEnglishCounterW(
-                query_handle, 
-                counter_path, 
-                None, 
-                ctypes.byref(counter_handle)
-            )
-            
+            status = pdh.PdhAddEnglishCounterW(self.query_handle, counter_path, None, ctypes.byref(counter_handle))
             if status == 0:
-                counter_handles_by_luid[luid].append(counter_handle)
+                self.counters[inst] = (counter_handle, self.collections)
+                added += 1
             else:
-                raise RuntimeError(f"Failed to add counter: {counter_path}, status={status}")
-
-        return query_handle, dict(counter_handles_by_luid)
-
-    def get_gpu_usage(self, target_luid: Optional[str] = None, engine_type: str = "engtype_") -> Tuple[int, str]:
-        
-        self.initialize()
-        temp_counter_handles = {}
-        # Setup counters for the specified engine type
-        _, temp_counter_handles = self._setup_gpu_query_from_instances(
-            self.query_handle, self.instances, engine_type  # Use stored instances
-        )
-
-        pdh.PdhCollectQueryData(self.query_handle)
-        time.sleep(0.1)
+                # Usually the instance vanished since the enumeration; the next refresh sorts it out
+                self.add_failures += 1
+        self.added += added
+        return added, len(gone)
+
+    def maintain(self):
+        """Does a deferred refresh once allowed, and the periodic rescan."""
+        now = time.monotonic()
+        if self._last_enumeration is None:
+            return self.refresh(force=True)
+        since = now - self._last_enumeration
+        if (self._refresh_requested and since >= self.min_interval) or since >= self.rescan_interval:
+            return self.refresh(force=True)
+        return None
+
+    def collect(self):
+        if self.query_handle is None:
+            return
         pdh.PdhCollectQueryData(self.query_handle)
+        self.collections += 1
+
+    def read(self):
+        """Yields (instance, value) for every counter with a value from the last collection."""
+        for inst, (handle, added_at) in list(self.counters.items()):
+            val = PDH_FMT_COUNTERVALUE()
+            status = pdh.PdhGetFormattedCounterValue(handle, PDH_FMT_DOUBLE, None, ctypes.byref(val))
+            if status == 0 and val.CStatus in (0, PDH_CSTATUS_NEW_DATA):
+                yield inst, val.doubleValue
+            elif self.collections - added_at >= 2:
+                self.read_failures += 1
+                self._refresh_requested = True
+
+    def counters_by_luid(self):
+        by_luid = defaultdict(list)
+        for inst, (handle, _) in self.counters.items():
+            by_luid[parse_engine_instance(inst).luid].append(handle)
+        return dict(by_luid)
+
+    def get_stats(self):
+        open_queries = 1 if self.query_handle is not None else 0
+        return {
+            "queries_open": open_queries,
+            "queries_opened": self.queries_opened,
+            "counters": len(self.counters),
+            "enumerations": self.enumerations,
+            "rate_limited": self.rate_limited,
+            "added": self.added,
+            "removed": self.removed,
+            "add_failures": self.add_failures,
+            "read_failures": self.read_failures,
+            # Handles that were never freed: failed counter removals and queries not closed
+            "leaked": self.remove_failures + (self.queries_opened - self.queries_closed - open_queries),
+        }
 
-        usage_by_luid = {}
-        handles_to_use = (
-            {target_luid: temp_counter_handles[target_luid]}
-            if target_luid and target_luid in temp_counter_handles
-            else temp_counter_handles
-        )
-
-        for luid, handles in handles_to_use.items():
-            total = 0.0
-            for h in handles:
-                val = PDH_FMT_COUNTERVALUE()
-                status = pdh.PdhGetFormattedCounterValue(h, PDH_FMT_DOUBLE, None, ctypes.byref(val))
-                if status == 0 and val.CStatus == 0:
-                    total += val.doubleValue
-                else:
-                    raise RuntimeError(f"01_Failed to read counter (LUID: {luid}): status={status}")
-            usage_by_luid[luid] = total
-
-        if not usage_by_luid:
-            return 0, ""
+class GPUUsageMonitor:
+    def __init__(self, logger_instance, dpg_instance, themes_instance, interval=0.1, max_samples=20, percentile=70):
+        self.interval = interval
+        self.max_samples = max_samples
+        self.gpu_percentile = 0
+        self.percentile = percentile
+        self.samples = RollingQuantiles(max_samples, (percentile,))
+        self.logger = logger_instance
+        self.dpg = dpg_instance
+        self.themes_manager = themes_instance
+        # One PDH query for the whole session; instances are added/removed as they change
+        self.tracker = PdhInstanceTracker("engtype_3D", logger_instance=logger_instance)
+        # Guards the PDH query between sample() (sampling thread) and reinitialize()
+        self._query_lock = threading.RLock()
+        self._lock = threading.Lock()
+        self.initialize()
+        # What the usage covers (see GPU_USAGE_SCOPES) and the game it is about
+        self.scope = "all"
+        self.target_pid = None
+        self.luid = None  # LUID the last sample came from
+        self.target_found = False  # Whether that sample had the game's own counters
+        self.last_usage = 0.0
+        # Optional CriticalLoadAlarm, checked with every new percentile (threshold 0 = off)
+        self.critical_alarm = None
+        self.critical_threshold = 0
+        self.logger.add_log(f"GPU monitoring set up with interval: {round(self.interval*1000)} ms, max_samples: {self.max_samples}, percentile: {self.percentile}")
 
-        max_luid, max_usage = max(usage_by_luid.items(), key=lambda item: item[1])
-        return int(max_usage), str(max_luid)
+    def initialize(self) -> None:
+        """Set up the PDH query and a counter for each 3D engine instance."""
+        with self._query_lock:
+            self.tracker.refresh(force=True)
+            if not self.tracker.counters:
+                raise RuntimeError("No GPU engine instances found.")
+            self.tracker.collect()  # Rate counters need a previous collection
+
+    @property
+    def query_handle(self):
+        return self.tracker.query_handle
+
+    @property
+    def counter_handles(self) -> Dict[str, list]:
+        """LUID -> counter handles of its 3D engine instances."""
+        return self.tracker.counters_by_luid()
+
+    def set_target(self, pid, scope="all"):
+        """The foreground game's PID and the scope to report for it; called every control tick."""
+        self.scope = scope if scope in GPU_USAGE_SCOPES else "all"
+        if pid != self.target_pid:
+            self.target_pid = pid
+            self.luid = None
+
+    def describe_target(self):
+        """One line for the status box under the GPU thresholds."""
+        if self.scope == "all":
+            return f"All GPUs: busiest LUID {self.luid or '-'} ({self.last_usage:.0f}% 3D)"
+        if not self.target_found:
+            return f"PID {self.target_pid or '-'} not on a GPU yet; using all GPUs"
+        if self.scope == "game":
+            return f"PID {self.target_pid} on LUID {self.luid}: {self.last_usage:.0f}% 3D"
+        return f"Render GPU of PID {self.target_pid}: LUID {self.luid} ({self.last_usage:.0f}% 3D)"
 
     def list_all_luids(self) -> List[str]:
         """
@@ -168,146 +271,59 @@ class GPUUsageMonitor:
         Returns:
             List[str]: List of GPU LUIDs found in the system
         """
-        if not self.counter_handles:
+        if not self.tracker.counters:
             raise RuntimeError("Counter handles are not set up.")
             
         return list(self.counter_handles.keys())
 
     def cleanup(self) -> None:
         """Clean up PDH query handle."""
-        self.looping = False
-        if self._thread.is_alive():
-            self._thread.join()
-        if self.query_handle:
-            pdh.PdhCloseQuery(self.query_handle)
-            self.query_handle = None
-
-    def gpu_run(self, engine_type: str = "engtype_3D"):
-
-        # Setup counters for the specified engine type
-        _, self.counter_handles = self._setup_gpu_query_from_instances(
-            self.query_handle, self.instances, engine_type  # Use stored instances
-        )
-
-        pdh.PdhCollectQueryData(self.query_handle)
-        
-        while self.looping:
-            time.sleep(self.interval)
-            if self._running():
-                try:
-                    pdh.PdhCollectQueryData(self.query_handle)
-
-                    usage_by_luid = {}
-                    target_luid = self.luid
-                    handles_to_use = (
-                        {target_luid: self.counter_handles[target_luid]}
-                        if target_luid and target_luid in self.counter_handles
-                        else self.counter_handles
-                    )
-
-                    for luid, handles in handles_to_use.items():
-                        total = 0.0
-                        #max_value = 0.0
-                        for h in handles:
-                            val = PDH_FMT_COUNTERVALUE()
-                            status = pdh.PdhGetFormattedCounterValue(h, PDH_FMT_DOUBLE, None, ctypes.byref(val))
-                            if status == 0 and val.CStatus == 0:
-                                total += val.doubleValue
-                                #max_value = max(max_value, val.doubleValue)
-                            else:
-                                self.logger.add_log(f"02_Failed to read counter (LUID: {luid}): status={status}")
-                                self.reinitialize()
-                        usage_by_luid[luid] = total #max_value or total
-
-                    if not usage_by_luid:
-                        return 0, ""
-
-                    max_luid, max_usage = max(usage_by_luid.items(), key=lambda item: item[1])
-                    #self.logger.add_log(f"target: {target_luid}, Current max LUID: {max_luid}, engine type: {engine_type}")
-                    highest_usage = max_usage
-
-                    with self._lock:
-                        self.samples.append(highest_usage)
-                        if len(self.samples) > self.max_samples:
-                            self.samples.pop(0)
-                        self.gpu_percentile = round(GPUUsageMonitor.calculate_percentile(self.samples, self.percentile))
-                        #self.logger.add_log(f"GPU usage percentile: {self.gpu_percentile}%")
-
-                except Exception as e:
-                    self.logger.add_log(f"GPU monitor error: {e}")
-
-    def toggle_luid_selection(self):
-        """
-        Toggle between tracking all GPUs and the most active LUID.
-        Updates internal state and returns the new luid and selection state.
-        """
-        if not self.luid_selected:
-            # First click: detect top LUID
-            usage, luid = self.get_gpu_usage(engine_type="engtype_3D")
-            if luid:
-                self.logger.add_log(f"Tracking LUID: {luid} | Current 3D engine Utilization: {usage}%")
-                self.dpg.configure_item("luid_button", label="Revert to all GPUs")
-                self.dpg.bind_item_theme("luid_button", self.themes_manager.themes["revert_gpu_theme"])  # Apply blue theme
-                self.luid = luid
-                self.luid_selected = True
-                self.dpg.set_value("luid_status_text", f"Tracking LUID: {luid} ({usage}% 3D)")
-            else:
-                self.logger.add_log("Failed to detect active LUID.")
-                self.dpg.set_value("luid_status_text", "Failed to detect active LUID.")
-        else:
-            # Second click: deselect
-            self.luid = "All"
-            self.logger.add_log("Tracking all GPU 3D usages.")
-            self.dpg.configure_item("luid_button", label="Detect Render GPU")
-            self.dpg.bind_item_theme("luid_button", self.themes_manager.themes["detect_gpu_theme"])  # Apply default grey theme
-            self.luid_selected = False
-            self.dpg.set_value("luid_status_text", "Tracking all GPU 3D usages.")
-        return self.luid, self.luid_selected
-
-    def reinitialize(self, engine_type: str = "engtype_3D"):
-        self.logger.add_log("Reinitializing GPU monitor.")
-        self.initialize()
-
-        temp_counter_handles = {}
-        # Setup counters for the specified engine type
-        _, temp_counter_handles = self._setup_gpu_query_from_instances(
-            self.query_handle, self.instances, engine_type  # Use stored instances
-        )
-
-        pdh.PdhCollectQueryData(self.query_handle)
-        time.sleep(0.1)
-        pdh.PdhCollectQueryData(self.query_handle)
-
-    def calculate_percentile(data: list, percentile: float) -> float:
+        with self._query_lock:
+            self.tracker.close()
+
+    def sample(self):
+        """Takes one GPU 3D engine usage sample and updates the percentile. Run by the SamplingScheduler."""
+        with self._query_lock:
+            try:
+                self.tracker.maintain()  # Deferred or periodic instance rescan; usually a no-op
+            except RuntimeError as e:
+                self.logger.add_log(f"GPU engine rescan failed: {e}")
+            self.tracker.collect()
+            per_process = usage_by_process(self.tracker.read())
+
+        if not per_process:
+            return
+
+        pid = self.target_pid
+        highest_usage, self.luid, self.target_found = select_usage(per_process, self.scope, pid, self.luid)
+        self.last_usage = highest_usage
+        if pid is not None and self.scope != "all" and not self.target_found:
+            self.tracker.request_refresh()  # Its engine instances may not be counted yet
+
+        with self._lock:
+            self.samples.add(highest_usage)
+            self.gpu_percentile = round(self.samples.quantile(self.percentile))
+            #self.logger.add_log(f"GPU usage percentile: {self.gpu_percentile}%")
+
+        if self.critical_alarm is not None:
+            self.critical_alarm.check("GPU", self.gpu_percentile, self.critical_threshold)
+
+    def reinitialize(self, force=False):
         """
-        Calculate the percentile of a list of numbers.
-
-        Args:
-            data (list): The list of numbers.
-            percentile (float): The desired percentile (0-100).
-
-        Returns:
-            float: The value at the specified percentile.
+        Picks up GPU engine instances created or destroyed since the last scan (e.g. a
+        game starting). Only the changed counters are added/removed on the existing
+        query; scans closer together than the tracker's min_interval are merged.
         """
-        if not data:
-            raise ValueError("Data list is empty.")
-        if not (0 <= percentile <= 100):
-            raise ValueError("Percentile must be between 0 and 100.")
-
-        # Sort the data
-        sorted_data = sorted(data)
-
-        # Calculate the index
-        k = (len(sorted_data) - 1) * (percentile / 100.0)
-        f = int(k)  # Floor index
-        c = f + 1  # Ceiling index
-
-        if c >= len(data):
-            return data[f]
-
-        # If the index is an integer, return the value at that index
-        if f == k:
-            return sorted_data[f]
-
-        # Otherwise, interpolate between the two closest values
-        return sorted_data[f] + (k - f) * (sorted_data[c] - sorted_data[f])
\ No newline at end of file
+        with self._query_lock:
+            try:
+                changes = self.tracker.refresh(force=force)
+            except RuntimeError as e:
+                self.logger.add_log(f"GPU engine rescan failed: {e}")
+                return
+        if changes and any(changes):
+            self.logger.add_log(f"GPU engine instances: +{changes[0]} -{changes[1]} ({len(self.tracker.counters)} counters)")
+
+    def get_stats(self):
+        """PDH query/counter handle counts for the Diagnostics tab."""
+        with self._query_lock:
+            return self.tracker.get_stats()
@@ -0,0 +1,110 @@
+# headroom_model.py
+
+import math
+from collections import OrderedDict
+
+class HeadroomModel:
+    """
+    Online least-squares estimate of GPU load per frame for one process.
+
+    GPU load is modelled as proportional to FPS (load = slope * fps, i.e. a fixed
+    GPU cost per frame), fitted with exponential forgetting so older samples fade
+    out. Every update is O(1). A scene change (a sample more than change_threshold
+    load points off the fit) restarts the fit from that sample, so the model follows
+    the new per-frame cost instead of averaging both scenes together. The fit is only
+    trusted (is_confident) with enough effective samples and an RMS residual of at
+    most max_error load points.
+    """
+
+    def __init__(self, forgetting=0.85, min_weight=4.0, max_error=5.0, change_threshold=15.0):
+        self.forgetting = forgetting
+        self.min_weight = min_weight
+        self.max_error = max_error
+        self.change_threshold = change_threshold
+        self.reset()
+
+    def reset(self):
+        self._w = self._sxx = self._sxy = self._syy = 0.0
+        self.samples = 0
+
+    def add(self, fps, gpu_load):
+        x, y = float(fps), float(gpu_load)
+        if x <= 0:
+            return
+        if self._w >= self.min_weight and abs(y - self.slope * x) > self.change_threshold:
+            self.reset()
+        f = self.forgetting
+        self._w = self._w * f + 1.0
+        self._sxx = self._sxx * f + x * x
+        self._sxy = self._sxy * f + x * y
+        self._syy = self._syy * f + y * y
+        self.samples += 1
+
+    @property
+    def slope(self):
+        """GPU load points per FPS, or None without data."""
+        return self._sxy / self._sxx if self._sxx > 0 else None
+
+    def rms_error(self):
+        if self._sxx <= 0 or self._w <= 0:
+            return None
+        sse = max(0.0, self._syy - self._sxy * self._sxy / self._sxx)
+        return math.sqrt(sse / self._w)
+
+    def is_confident(self):
+        if self._w < self.min_weight:
+            return False
+        slope, error = self.slope, self.rms_error()
+        return slope is not None and slope > 0 and error is not None and error <= self.max_error
+
+    def predict_load(self, fps):
+        slope = self.slope
+        return None if slope is None else slope * float(fps)
+
+    def max_fps_for_load(self, load):
+        """FPS at which the predicted GPU load reaches `load`, or None if the fit isn't usable."""
+        slope = self.slope
+        if slope is None or slope <= 0:
+            return None
+        return float(load) / slope
+
+class HeadroomPredictor:
+    """Keeps one HeadroomModel per process name (least recently used ones are dropped)."""
+
+    def __init__(self, max_processes=16, **model_kwargs):
+        self.max_processes = max_processes
+        self.model_kwargs = model_kwargs
+        self._models = OrderedDict()
+
+    def model_for(self, process_name):
+        model = self._models.get(process_name)
+        if model is None:
+            model = HeadroomModel(**self.model_kwargs)
+            self._models[process_name] = model
+            while len(self._models) > self.max_processes:
+                self._models.popitem(last=False)
+        else:
+            self._models.move_to_end(process_name)
+        return model
+
+    def add(self, process_name, fps, gpu_load):
+        self.model_for(process_name).add(fps, gpu_load)
+
+    def predicted_cap(self, process_name, ladder, load_limit):
+        """
+        Highest ladder cap (in ladder units) whose predicted GPU load stays under
+        load_limit, or None when the process's model isn't confident enough to act on.
+        """
+        model = self._models.get(process_name)
+        if model is None or not model.is_confident():
+            return None
+        max_fps = model.max_fps_for_load(load_limit)
+        if max_fps is None:
+            return None
+        max_units = ladder.to_units(max_fps)
+        if max_units >= ladder.max:
+            return ladder.max
+        return ladder.next_below(max_units)
+
+    def reset(self):
+        self._models.clear()
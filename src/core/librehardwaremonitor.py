@@ -1,11 +1,11 @@
 from core.lhm_loader import ensure_loaded, get_types
 from pathlib import Path
-from collections import deque, defaultdict
-import time
 import threading
-import numpy as np
 import os
 import sys
+from collections import defaultdict
+from core.rolling_quantile import RollingQuantiles
+from core.sample_store import SampleRingStore
 
 def get_selected_sensor_values(hardware, sensor_map):
     """Return a dict of selected sensor values for the given hardware, only for specified sensor types."""
@@ -102,7 +102,7 @@ def get_all_sensor_infos(base_dir):
 
                     parameter_id = f"gpu{gpu_count}_{sensor_type_str.lower()}_{param_indices[sensor_type_str]:02d}"
                     hw_id = f"gpu{gpu_count}"
-                    # Build the indexed sensor name exactly as LHMSensor._poll_loop uses for gpu_percentiles keys
+                    # Build the indexed sensor name exactly as LHMSensor.poll keys GPU sensors
                     sensor_name_indexed = f"{gpu_count} {indexed_name_only}"
                     sensors.append({
                         "hw_type": hw.HardwareType,
@@ -116,23 +116,25 @@ def get_all_sensor_infos(base_dir):
     return sensors
 
 class LHMSensor:
-    def __init__(self, get_running, logger_instance, dpg_instance, themes_instance, interval=0.1, max_samples=20, percentile=70, base_dir=None):
-        self._running = get_running  # This should be a callable, e.g. lambda: running
+    def __init__(self, logger_instance, dpg_instance, themes_instance, interval=0.1, max_samples=20, percentile=70, base_dir=None, history=600):
         self.logger = logger_instance
         self.dpg = dpg_instance
         self.themes = themes_instance
         self.interval = interval
         self.max_samples = max_samples
         self.percentile = percentile
-        self.cpu_history = defaultdict(lambda: deque(maxlen=max_samples))
-        self.gpu_history = defaultdict(lambda: deque(maxlen=max_samples))
-        self.cpu_history_long = defaultdict(lambda: deque(maxlen=600))
-        self.gpu_history_long = defaultdict(lambda: deque(maxlen=600))
-        self.cpu_percentiles = defaultdict(float)
-        self.gpu_percentiles = defaultdict(float)
-        self._thread = None
+        # Rolling percentile window per (sensor_type, name), like the GPU/CPU samplers,
+        # for the control percentile
+        self.windows = defaultdict(lambda: RollingQuantiles(max_samples, (percentile,)))
+        self.percentiles = {}
+        # Every sensor's longer history in one ring buffer, for the summary stats
+        self.store = SampleRingStore(max(history, max_samples), sensors=64)
+        self.cpu_keys = {}  # Insertion ordered sets of keys, for display
+        self.gpu_keys = {}
         self._lock = threading.Lock()
-        self._should_stop = threading.Event()
+        # Optional CriticalLoadAlarm and (sensor_type, name) -> critical value, as keyed in the store
+        self.critical_alarm = None
+        self.critical_thresholds = {}
 
         # Ensure assembly loaded and types available
         Computer, SensorType, HardwareType = ensure_loaded(base_dir, self.logger)
@@ -185,93 +187,87 @@ class LHMSensor:
         return names
 
     def start(self):
-    # Reset histories and percentiles
+    # Reset the history (polling itself is done by the SamplingScheduler)
+        self.clear_history()
+
+    def clear_history(self):
         with self._lock:
-            self.cpu_history.clear()
-            self.gpu_history.clear()
-            self.cpu_history_long.clear()
-            self.gpu_history_long.clear()
-            self.cpu_percentiles.clear()
-            self.gpu_percentiles.clear()
-        if self._thread and self._thread.is_alive():
-            return  # Already running
-        self._should_stop.clear()
-        self._thread = threading.Thread(target=self._poll_loop, daemon=True)
-        self._thread.start()
+            self.store.clear()
+            self.windows.clear()
+            self.percentiles = {}
 
     def stop(self):
-        self._should_stop.set()
-        if self._thread:
-            self._thread.join(timeout=2)
         self.computer.Close()
         self.logger.add_log("Stopped LibreHardwareMonitor polling.")
 
-    def _poll_loop(self):
-        def calculate_percentile(data, percentile):
-            if not data:
-                return None
-            return float(np.percentile(data, percentile))
-
-        self.cpu_percentiles = defaultdict(float)
-        self.gpu_percentiles = defaultdict(float)
-
-        while not self._should_stop.is_set() and self._running():
-            gpu_index = 1
-            for hw in self.computer.Hardware:
-                # CPU logic unchanged
-                if hw.Name == self.cpu_name and hw.HardwareType == self.HardwareType.Cpu:
-                    hw.Update()
-                    values = get_selected_sensor_values(hw, self.CPU_SENSORS)
-                    with self._lock:
-                        for sensor_type, sensors in values.items():
-                            for name, value in sensors.items():
-                                key = (sensor_type, name)
-                                self.cpu_history[key].append(round(value, 2))
-                                self.cpu_history_long[key].append(round(value, 2))
-                                self.cpu_percentiles[key] = round(
-                                    calculate_percentile(self.cpu_history[key], self.percentile), 2
-                                )
-                    cpu_hw_name = hw.Name  # Save for display
-                # Loop through all GPUs
-                elif hw.HardwareType in (self.HardwareType.GpuAmd, self.HardwareType.GpuNvidia):
-                    hw.Update()
-                    values = get_selected_sensor_values(hw, self.GPU_SENSORS)
-                    with self._lock:
-                        for sensor_type, sensors in values.items():
-                            for name, value in sensors.items():
-                                key = (sensor_type, f"{gpu_index} {name}")
-                                self.gpu_history[key].append(round(value, 2))
-                                self.gpu_history_long[key].append(round(value, 2))
-                                self.gpu_percentiles[key] = round(
-                                    calculate_percentile(self.gpu_history[key], self.percentile), 2
-                                )
-                    # Save GPU name for display
-                    if not hasattr(self, 'gpu_hw_names'):
-                        self.gpu_hw_names = []
-                    if hw.Name not in self.gpu_hw_names:
-                        self.gpu_hw_names.append(hw.Name)
-                    gpu_index += 1
-
-            # Update ReadingsText in the GUI
-            cpu_str = self.format_history(self.cpu_history, self.cpu_percentiles, cpu_hw_name if 'cpu_hw_name' in locals() else "CPU")
-            gpu_titles = self.gpu_hw_names if hasattr(self, 'gpu_hw_names') else ["GPU"]
-            gpu_str = ""
-            # Split GPU history by index for display
-            for idx, gpu_name in enumerate(gpu_titles, start=1):
-                gpu_str += self.format_history(
-                    {k: v for k, v in self.gpu_history.items() if k[1].startswith(f"{idx} ")},
-                    self.gpu_percentiles,
-                    gpu_name
-                ) + "\n\n"
-            readings = cpu_str + "\n\n" + gpu_str
-            try:
-                self.dpg.set_value("ReadingsText", readings)
-            except Exception as e:
-                print("Failed to update ReadingsText:", e)
-                self.logger.add_log(f"Failed to update ReadingsText: {e}")
-            time.sleep(self.interval)
-
-    def format_history(self, hist, percentiles, title):
+    def poll(self):
+        """Reads every CPU/GPU sensor once and updates the percentiles. Run by the SamplingScheduler."""
+        current = {}
+        gpu_index = 1
+        for hw in self.computer.Hardware:
+            # CPU logic unchanged
+            if hw.Name == self.cpu_name and hw.HardwareType == self.HardwareType.Cpu:
+                hw.Update()
+                values = get_selected_sensor_values(hw, self.CPU_SENSORS)
+                for sensor_type, sensors in values.items():
+                    for name, value in sensors.items():
+                        key = (sensor_type, name)
+                        current[key] = value
+                        self.cpu_keys.setdefault(key)
+                cpu_hw_name = hw.Name  # Save for display
+            # Loop through all GPUs
+            elif hw.HardwareType in (self.HardwareType.GpuAmd, self.HardwareType.GpuNvidia):
+                hw.Update()
+                values = get_selected_sensor_values(hw, self.GPU_SENSORS)
+                for sensor_type, sensors in values.items():
+                    for name, value in sensors.items():
+                        key = (sensor_type, f"{gpu_index} {name}")
+                        current[key] = value
+                        self.gpu_keys.setdefault(key)
+                # Save GPU name for display
+                if not hasattr(self, 'gpu_hw_names'):
+                    self.gpu_hw_names = []
+                if hw.Name not in self.gpu_hw_names:
+                    self.gpu_hw_names.append(hw.Name)
+                gpu_index += 1
+
+        with self._lock:
+            percentiles = dict(self.percentiles)
+            for key, value in current.items():
+                window = self.windows[key]
+                window.add(round(value, 2))
+                percentiles[key] = round(window.quantile(self.percentile), 2)
+            self.percentiles = percentiles
+            self.store.append(current)  # One column per poll
+        for key in self.critical_thresholds:
+            if key in percentiles:
+                self._check_critical(key, percentiles[key])
+
+        # Update ReadingsText in the GUI
+        cpu_str = self.format_history(self.cpu_keys, current, percentiles, cpu_hw_name if 'cpu_hw_name' in locals() else "CPU")
+        gpu_titles = self.gpu_hw_names if hasattr(self, 'gpu_hw_names') else ["GPU"]
+        gpu_str = ""
+        # Split GPU sensors by index for display
+        for idx, gpu_name in enumerate(gpu_titles, start=1):
+            gpu_str += self.format_history(
+                [k for k in self.gpu_keys if k[1].startswith(f"{idx} ")],
+                current,
+                percentiles,
+                gpu_name
+            ) + "\n\n"
+        readings = cpu_str + "\n\n" + gpu_str
+        try:
+            self.dpg.set_value("ReadingsText", readings)
+        except Exception as e:
+            print("Failed to update ReadingsText:", e)
+            self.logger.add_log(f"Failed to update ReadingsText: {e}")
+
+    def _check_critical(self, key, value):
+        threshold = self.critical_thresholds.get(key)
+        if threshold and self.critical_alarm is not None:
+            self.critical_alarm.check(key[1], value, threshold)
+
+    def format_history(self, keys, latest, percentiles, title):
         # Define column widths
         type_w = 12
         name_w = 26
@@ -281,20 +277,73 @@ class LHMSensor:
         lines = [f"{title}:"]
         lines.append(header)
         lines.append("-" * len(header))
-        for (sensor_type, name), values in hist.items():
+        for sensor_type, name in keys:
             sensor_type_str = getattr(sensor_type, 'name', str(sensor_type))
-            last_val = values[-1] if values else 'N/A'
-            percentile_val = percentiles.get((sensor_type, name), 'N/A')
+            last_val = _fmt(latest.get((sensor_type, name)))
+            percentile_val = _fmt(percentiles.get((sensor_type, name)))
             lines.append(
-                f"{sensor_type_str:<{type_w}}| {name:<{name_w}}| {str(last_val):>{last_w}}| {str(percentile_val):>{perc_w}}"
+                f"{sensor_type_str:<{type_w}}| {name:<{name_w}}| {last_val:>{last_w}}| {percentile_val:>{perc_w}}"
             )
         return "\n".join(lines)
 
+    @property
+    def cpu_percentiles(self):
+        """(sensor_type, name) -> control percentile for CPU sensors with data."""
+        percentiles = self.percentiles
+        return {key: percentiles[key] for key in list(self.cpu_keys) if key in percentiles}
+
+    @property
+    def gpu_percentiles(self):
+        """(sensor_type, "<gpu index> name") -> control percentile for GPU sensors with data."""
+        percentiles = self.percentiles
+        return {key: percentiles[key] for key in list(self.gpu_keys) if key in percentiles}
+
+    def find_key(self, sensor):
+        """
+        The key a sensor from get_all_sensor_infos() is stored under, or None if it has
+        no readings yet. GPU sensors are matched on their indexed name, then on the
+        index of their GPU, then on the name alone.
+        """
+        sensor_type = sensor.get("sensor_type")
+        sensor_name = sensor.get("sensor_name")
+        if sensor.get("hw_type") == self.HardwareType.Cpu:
+            key = (sensor_type, sensor_name)
+            return key if key in self.store else None
+
+        candidates = [(sensor_type, sensor.get("sensor_name_indexed") or sensor_name)]
+        hw_names = getattr(self, "gpu_hw_names", [])
+        if sensor.get("hw_name") in hw_names:
+            candidates.append((sensor_type, f"{hw_names.index(sensor.get('hw_name')) + 1} {sensor_name}"))
+        for key in candidates:
+            if key in self.store:
+                return key
+        for key in list(self.gpu_keys):
+            if key[0] == sensor_type and key[1].endswith(sensor_name):
+                return key
+        return None
+
+    def percentile_of(self, key):
+        """The control percentile of one sensor over the last max_samples polls, or None."""
+        return self.percentiles.get(key)
+
+    def long_stats(self):
+        """key -> (mean, std, median) of every sensor over the whole history, in one pass."""
+        with self._lock:
+            keys = self.store.keys()
+            stats = self.store.stats()
+        return {
+            key: (float(stats["mean"][row]), float(stats["std"][row]), float(stats["median"][row]))
+            for row, key in enumerate(keys) if stats["count"][row]
+        }
+
     def get_cpu_history(self):
         with self._lock:
-            return dict(self.cpu_history)
+            return {key: list(self.windows[key]) for key in self.cpu_keys if key in self.windows}
 
     def get_gpu_history(self):
         with self._lock:
-            return dict(self.gpu_history)
+            return {key: list(self.windows[key]) for key in self.gpu_keys if key in self.windows}
+
+def _fmt(value):
+    return 'N/A' if value is None else f"{value:.2f}"
 
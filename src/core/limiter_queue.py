@@ -0,0 +1,175 @@
+# limiter_queue.py
+
+import threading
+import time
+from core.fixed_fps import same_framerate
+
+class LimiterCommandQueue:
+    """
+    Single-writer, write-behind queue in front of RTSSController framerate limit changes.
+
+    Commands are collected for a short coalescing window; within it a newer limit for a
+    profile supersedes the older one, and a limit equal to the last applied value for
+    that profile is skipped (unless forced). Each batch is written with one
+    UpdateProfiles call, since every UpdateProfiles makes RTSS re-apply profiles to
+    hooked apps, which can stutter.
+    """
+
+    def __init__(self, rtss_controller, logger_instance, coalesce_window=0.05):
+        self.rtss = rtss_controller
+        self.logger = logger_instance
+        self.coalesce_window = coalesce_window
+        self.on_applied = None  # Optional callback(profile_name, framerate, applied_at)
+        self.on_skipped = None  # Optional callback(profile_name, framerate) for unchanged limits not written
+
+        self._pending = {}  # profile_name -> (framerate, submitted_at, force)
+        self._last_applied = {}  # profile_name -> framerate
+        self._busy = False
+        self._flush_waiters = 0
+        self._cond = threading.Condition()
+        self._should_stop = False
+
+        # Counters
+        self.submitted = 0
+        self.coalesced = 0
+        self.skipped = 0
+        self.writes = 0
+        self.batches = 0
+        self.last_write_latency = 0.0  # seconds from submit to applied
+        self.max_write_latency = 0.0
+        self._total_write_latency = 0.0
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, profile_name, framerate, force=False):
+        """Queues a framerate limit for profile_name. force=True writes even if unchanged."""
+        with self._cond:
+            self.submitted += 1
+            if profile_name in self._pending:
+                self.coalesced += 1
+                force = force or self._pending[profile_name][2]
+            self._pending[profile_name] = (framerate, time.perf_counter(), force)
+            self._cond.notify_all()
+
+    @property
+    def queue_depth(self):
+        with self._cond:
+            return len(self._pending)
+
+    def last_applied(self, profile_name):
+        with self._cond:
+            return self._last_applied.get(profile_name)
+
+    def flush(self, timeout=2.0):
+        """Blocks until every queued command has been written. Returns False on timeout."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._flush_waiters += 1
+            self._cond.notify_all()
+            try:
+                while self._pending or self._busy:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+            finally:
+                self._flush_waiters -= 1
+        return True
+
+    def stop(self, timeout=2.0):
+        """Writes anything still queued, then stops the writer thread."""
+        self.flush(timeout)
+        with self._cond:
+            self._should_stop = True
+            self._cond.notify_all()
+        self._thread.join(timeout=timeout)
+
+    def get_stats(self):
+        with self._cond:
+            return {
+                "queue_depth": len(self._pending),
+                "submitted": self.submitted,
+                "coalesced": self.coalesced,
+                "skipped": self.skipped,
+                "writes": self.writes,
+                "batches": self.batches,
+                "last_write_latency_ms": self.last_write_latency * 1000,
+                "avg_write_latency_ms": (self._total_write_latency / self.writes * 1000) if self.writes else 0.0,
+                "max_write_latency_ms": self.max_write_latency * 1000,
+            }
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._should_stop:
+                    self._cond.wait()
+                if self._should_stop and not self._pending:
+                    return
+                # Let superseding commands arrive before writing (cut short by flush/stop)
+                window_end = time.monotonic() + self.coalesce_window
+                while not self._flush_waiters and not self._should_stop:
+                    remaining = window_end - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending
+                self._pending = {}
+                self._busy = True
+            try:
+                self._apply_batch(batch)
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def _apply_batch(self, batch):
+        written = []
+        skipped = []
+        for profile_name, (framerate, submitted_at, force) in batch.items():
+            with self._cond:
+                unchanged = not force and same_framerate(self._last_applied.get(profile_name), framerate)
+                if unchanged:
+                    self.skipped += 1
+            if unchanged:
+                skipped.append((profile_name, framerate))
+                continue
+            try:
+                self.rtss.write_fractional_framerate(profile_name, framerate)
+                written.append((profile_name, framerate, submitted_at))
+            except Exception as e:
+                self.logger.add_log(f"Failed to set framerate limit for {profile_name}: {e}")
+
+        if self.on_skipped:
+            for profile_name, framerate in skipped:
+                try:
+                    self.on_skipped(profile_name, framerate)
+                except Exception as e:
+                    self.logger.add_log(f"Limiter callback error: {e}")
+
+        if not written:
+            return
+
+        try:
+            self.rtss.UpdateProfiles()
+        except Exception as e:
+            self.logger.add_log(f"Failed to update RTSS profiles: {e}")
+            return
+
+        applied_at = time.perf_counter()
+        with self._cond:
+            self.batches += 1
+            for profile_name, framerate, submitted_at in written:
+                latency = applied_at - submitted_at
+                self._last_applied[profile_name] = framerate
+                self.writes += 1
+                self.last_write_latency = latency
+                self._total_write_latency += latency
+                self.max_write_latency = max(self.max_write_latency, latency)
+
+        if self.on_applied:
+            for profile_name, framerate, _ in written:
+                try:
+                    self.on_applied(profile_name, framerate, applied_at)
+                except Exception as e:
+                    self.logger.add_log(f"Limiter callback error: {e}")
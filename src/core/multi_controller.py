@@ -0,0 +1,210 @@
+# multi_controller.py
+
+from dataclasses import dataclass
+from core.cap_controller import CapController, CapControllerSettings, CapDecision, ControlSample
+from core.cap_ladder import CapLadder
+
+ARBITRATION_POLICIES = ("priority", "fair")
+
+@dataclass
+class TrackedProcess:
+    """One hooked application with its own profile, ladder and controller state."""
+    pid: int
+    profile: str
+    priority: int
+    controller: CapController
+
+    @property
+    def share(self):
+        """Where the current cap sits between the ladder's min (0.0) and max (1.0)."""
+        c = self.controller
+        span = c.max_cap - c.min_cap
+        return (c.current_cap - c.min_cap) / span if span else 1.0
+
+class MultiProcessCapManager:
+    """
+    Caps several hooked applications at once, one CapController per application that
+    has its own profile in profiles.ini. Every controller has its own ladder, settings
+    and cooldowns, built from its profile section on top of Global; they all share the
+    same sensor readings (GPU, CPU, LibreHM) each tick, since the applications share
+    the hardware.
+
+    Because the load is shared, controllers don't move independently: each tick at most
+    one of them lowers its cap and at most one raises it, and nothing is raised on a
+    tick where something is lowered. Who goes first depends on the policy:
+
+    "priority": the lowest 'priority' profile gives up headroom first and the highest
+        gets it back first (ties are settled as in "fair").
+    "fair": the application whose cap is highest within its own ladder gives up headroom
+        first and the lowest gets it back first, so all of them end up at a similar
+        fraction of their range.
+
+    tick() returns (profile, CapDecision) pairs for the limits to write; applications
+    that start being tracked get their ladder's max cap ("start"). Settings and ladders
+    are built when tracking starts and rebuilt only after config_changed().
+    """
+
+    def __init__(self, profiles, base_values=None, policy="priority", tick_interval_ms=1000,
+                 headroom=None, logger_instance=None):
+        self.profiles = profiles  # name -> mapping (a ConfigParser works as is)
+        self.base_values = base_values or {}  # GlobalSettings / Preferences values
+        self.policy = policy if policy in ARBITRATION_POLICIES else "priority"
+        self.tick_interval_ms = tick_interval_ms
+        self.headroom = headroom
+        self.logger = logger_instance
+        self.tracked = {}  # profile -> TrackedProcess
+        self._reload = False  # Set by config_changed(), handled at the next tick
+
+    def _log(self, message):
+        if self.logger:
+            self.logger.add_log(message)
+
+    def _profile_values(self, name):
+        values = dict(self.profiles["Global"]) if "Global" in self.profiles else {}
+        values.update(self.profiles[name])
+        return values
+
+    def _settings_for(self, values):
+        return CapControllerSettings.from_mapping(self.base_values, values, tick_interval_ms=self.tick_interval_ms)
+
+    def _build(self, profile):
+        """(ladder, priority, settings) from a profile section, or None if its cap settings are invalid."""
+        values = self._profile_values(profile)
+        try:
+            ladder = CapLadder.from_profile(values)
+            priority = int(values.get("priority", 0))
+        except (TypeError, ValueError) as e:
+            self._log(f"Multi-process: invalid cap settings in profile {profile}: {e}")
+            return None
+        return ladder, priority, self._settings_for(values)
+
+    def config_changed(self, base_values=None):
+        """
+        Profiles or the Global settings were edited (optionally with new base_values):
+        every tracked application's ladder, priority and settings are rebuilt together
+        at the next tick.
+        """
+        if base_values is not None:
+            self.base_values = base_values
+        self._reload = True
+
+    def _reload_tracked(self):
+        """
+        Rebuilds the tracked controllers from the current profiles. A controller whose
+        ladder changed starts over at the new max cap; otherwise only its settings are
+        replaced, keeping its cap and cooldowns. Returns the "start" decisions.
+        """
+        decisions = []
+        for profile, tracked in self.tracked.items():
+            built = self._build(profile)
+            if built is None:
+                continue
+            ladder, tracked.priority, settings = built
+            if ladder != tracked.controller.ladder:
+                tracked.controller = CapController(ladder, settings, headroom=self.headroom)
+                decisions.append((profile, CapDecision(ladder.fixed(ladder.max), "start")))
+                self._log(f"Multi-process: {profile} cap settings changed, restarting at {ladder.fixed(ladder.max)}")
+            else:
+                tracked.controller.settings = settings
+        return decisions
+
+    def has_profile(self, name):
+        return bool(name) and name not in ("Global", "DEFAULT") and name in self.profiles
+
+    def sync(self, apps):
+        """
+        Starts tracking hooked applications (RTSSAppStats) that have a profile and drops
+        the ones that are gone. Several instances of one executable share its RTSS
+        profile, so only the first one seen is tracked. Returns the "start" decisions.
+        """
+        decisions = []
+        alive = {}
+        for app in apps:
+            if self.has_profile(app.name) and app.name not in alive:
+                alive[app.name] = app.pid
+
+        for profile in list(self.tracked):
+            if self.tracked[profile].pid not in alive.values():
+                del self.tracked[profile]
+                self._log(f"Multi-process: stopped tracking {profile}")
+
+        for profile, pid in alive.items():
+            if profile in self.tracked:
+                continue
+            built = self._build(profile)
+            if built is None:
+                continue
+            ladder, priority, settings = built
+            controller = CapController(ladder, settings, headroom=self.headroom)
+            self.tracked[profile] = TrackedProcess(pid, profile, priority, controller)
+            decisions.append((profile, CapDecision(ladder.fixed(ladder.max), "start")))
+            self._log(f"Multi-process: tracking {profile} (PID {pid}, priority {priority})")
+        return decisions
+
+    def _yield_order(self, tracked):
+        """Sort key: the first process in ascending order gives up headroom first."""
+        if self.policy == "fair":
+            return (-tracked.share, tracked.priority)
+        return (tracked.priority, -tracked.share)
+
+    def tick(self, apps, gpu, cpu, idle_seconds=0.0, sensor_readings=(), foreground_pid=None,
+             frametime_spikes=None):
+        """
+        Runs one control tick for every tracked application. apps is the hooked
+        processes (an RTSSSnapshot or any iterable of RTSSAppStats); frametime_spikes
+        belongs to foreground_pid. Returns (profile, CapDecision) for each cap to write.
+        """
+        apps = list(apps or ())
+        decisions = self.sync(apps)
+        if self._reload:
+            self._reload = False
+            decisions += self._reload_tracked()
+        by_pid = {app.pid: app for app in apps}
+
+        pending = []  # (tracked, sample, wants_decrease, wants_increase)
+        for tracked in self.tracked.values():
+            controller = tracked.controller
+            app = by_pid.get(tracked.pid)
+            sample = ControlSample(
+                fps=app.fps if app is not None and app.fresh else None,
+                gpu=gpu,
+                cpu=cpu,
+                idle_seconds=idle_seconds,
+                process_name=tracked.profile,
+                sensor_readings=sensor_readings,
+                frametime_spikes=frametime_spikes if tracked.pid == foreground_pid else None,
+            )
+            decision = controller.prepare(sample)
+            if decision is not None:
+                if decision.changed:
+                    decisions.append((tracked.profile, decision))
+                continue
+            pending.append((tracked, sample) + controller.intent(sample))
+
+        decreasing = [p for p in pending if p[2]]
+        increasing = [p for p in pending if p[3]]
+        yields = min(decreasing, key=lambda p: self._yield_order(p[0]))[0] if decreasing else None
+        gains = max(increasing, key=lambda p: self._yield_order(p[0]))[0] if increasing and not decreasing else None
+
+        for tracked, sample, _, _ in pending:
+            decision = tracked.controller.decide(sample, allow_decrease=tracked is yields,
+                                                 allow_increase=tracked is gains)
+            if decision.changed:
+                decisions.append((tracked.profile, decision))
+        return decisions
+
+    def emergency_drop(self, rungs=1):
+        """
+        Critical load: lowers the cap of the application that gives up headroom first
+        under the policy (skipping any already at their lowest cap). Returns a list
+        with its (profile, CapDecision), or an empty list.
+        """
+        for tracked in sorted(self.tracked.values(), key=self._yield_order):
+            decision = tracked.controller.emergency_drop(rungs)
+            if decision.changed:
+                return [(tracked.profile, decision)]
+        return []
+
+    def current_caps(self):
+        """profile -> current cap as FixedFPS, for display."""
+        return {profile: t.controller.current_cap_fixed for profile, t in self.tracked.items()}
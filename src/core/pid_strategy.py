@@ -0,0 +1,87 @@
+# pid_strategy.py
+
+class PIDCapStrategy:
+    """
+    PID controller that steers the cap's position on the ladder to hold a load signal
+    at a setpoint.
+
+    The output is a continuous ladder position (0 = lowest cap, len-1 = highest);
+    positive error (load below setpoint) moves it up. Gains are in rungs per %
+    error (ki per second, kd per %/s), so they behave the same for any ladder.
+
+    When the setpoint falls between two rungs no cap can hold it exactly, so three
+    layers of hysteresis stop the cap flip-flopping between the neighbours: errors
+    within `deadband` count as zero, the cap only moves once the position is more
+    than 0.5 + `quantize_hysteresis` rungs away from the current one, and moving back
+    in the direction the cap just came from needs `reversal_hysteresis` more rungs of
+    accumulated error (and then moves a single rung). The integral is clamped to the
+    ladder and frozen while the output is saturated (conditional integration), so it
+    can't wind up.
+    """
+
+    def __init__(self, kp=0.1, ki=0.04, kd=0.0, setpoint=80.0, deadband=5.0, quantize_hysteresis=0.25,
+                 reversal_hysteresis=1.0):
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.setpoint = setpoint
+        self.deadband = deadband
+        self.quantize_hysteresis = quantize_hysteresis
+        self.reversal_hysteresis = reversal_hysteresis
+        self.reset()
+
+    def reset(self):
+        self.integral = None  # Ladder position contributed by the I term (plus the starting position)
+        self.prev_measurement = None
+        self.position = None
+        self.last_error = 0.0
+        self.last_direction = 0  # +1 / -1 for the last move, 0 before the first
+
+    def update(self, measurement, current_index, top_index, dt):
+        """
+        Advances the controller by dt seconds and returns the ladder index to move to,
+        or None to keep current_index.
+        """
+        if self.integral is None:
+            self.integral = float(current_index)  # Bumpless start from the current cap
+
+        error = self.setpoint - measurement
+        if abs(error) <= self.deadband:
+            error = 0.0
+        self.last_error = error
+
+        derivative = 0.0
+        if self.prev_measurement is not None and dt > 0:
+            # Derivative on measurement avoids a kick when the setpoint changes
+            derivative = -(measurement - self.prev_measurement) / dt
+        self.prev_measurement = measurement
+
+        proportional = self.kp * error
+        unclamped = self.integral + self.ki * error * dt + proportional + self.kd * derivative
+        saturated_high = unclamped > top_index and error > 0
+        saturated_low = unclamped < 0 and error < 0
+        if not (saturated_high or saturated_low):
+            self.integral = min(max(self.integral + self.ki * error * dt, 0.0), float(top_index))
+
+        self.position = min(max(self.integral + proportional + self.kd * derivative, 0.0), float(top_index))
+
+        distance = self.position - current_index
+        direction = 1 if distance > 0 else -1
+        threshold = 0.5 + self.quantize_hysteresis
+        reversing = direction == -self.last_direction
+        if reversing:
+            threshold += self.reversal_hysteresis
+        if abs(distance) <= threshold:
+            return None
+        target = current_index + direction if reversing else int(round(self.position))
+        if target == current_index:
+            return None
+        self.last_direction = direction
+        # Re-anchor on the new rung so the rounding remainder and the P kick that caused
+        # the move don't carry over and push straight back (limit cycling between rungs)
+        self.integral = float(target)
+        return target
+
+    def retarget(self, index):
+        """Re-anchors the integral after the cap was changed by something else (idle, snap, ...)."""
+        self.integral = float(index)
@@ -0,0 +1,83 @@
+# process_presence.py
+
+import threading
+import time
+import psutil
+
+class ProcessPresenceCache:
+    """
+    Tracks whether a process (by executable name) is running without walking the
+    process list on every check.
+
+    Once found, the PID is cached and re-validated cheaply with psutil.pid_exists;
+    its name is re-checked on a slow schedule to catch PID reuse. Full scans over
+    psutil.process_iter only happen when the process is not known, and back off
+    exponentially (min_rescan_interval doubling up to max_rescan_interval) while it
+    stays absent. Safe to call from several threads.
+    """
+
+    def __init__(self, process_name, min_rescan_interval=1.0, max_rescan_interval=16.0, name_check_interval=30.0):
+        self.process_name = process_name
+        self.min_rescan_interval = min_rescan_interval
+        self.max_rescan_interval = max_rescan_interval
+        self.name_check_interval = name_check_interval
+        self.full_scans = 0
+        self._pid = None
+        self._next_name_check = 0.0
+        self._next_scan = 0.0
+        self._backoff = min_rescan_interval
+        self._lock = threading.Lock()
+
+    def _scan(self):
+        self.full_scans += 1
+        for process in psutil.process_iter(['name']):
+            try:
+                if process.info['name'] == self.process_name:
+                    return process.pid
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                pass # Ignore processes that can't be accessed
+        return None
+
+    def _name_matches(self, pid):
+        try:
+            return psutil.Process(pid).name() == self.process_name
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return False
+
+    def get_pid(self):
+        """Returns the cached PID of the process, or None if it is not running."""
+        with self._lock:
+            now = time.monotonic()
+            if self._pid is not None:
+                alive = psutil.pid_exists(self._pid)
+                if alive and now >= self._next_name_check:
+                    alive = self._name_matches(self._pid)
+                    self._next_name_check = now + self.name_check_interval
+                if alive:
+                    return self._pid
+                # Lost it: allow an immediate rescan, then back off again
+                self._pid = None
+                self._next_scan = now
+                self._backoff = self.min_rescan_interval
+
+            if now < self._next_scan:
+                return None
+
+            self._pid = self._scan()
+            if self._pid is not None:
+                self._next_name_check = now + self.name_check_interval
+                self._backoff = self.min_rescan_interval
+            else:
+                self._next_scan = now + self._backoff
+                self._backoff = min(self._backoff * 2, self.max_rescan_interval)
+            return self._pid
+
+    def is_running(self):
+        return self.get_pid() is not None
+
+    def invalidate(self):
+        """Forgets the cached state so the next check rescans immediately."""
+        with self._lock:
+            self._pid = None
+            self._next_scan = 0.0
+            self._backoff = self.min_rescan_interval
@@ -0,0 +1,85 @@
+# rolling_quantile.py
+
+from bisect import bisect_left, insort
+from collections import deque
+
+def percentile_of_sorted(sorted_values, percentile):
+    """
+    The percentile (0-100) of an already sorted sequence, interpolating linearly
+    between the two closest ranks (the same result as numpy's default method).
+    """
+    if not sorted_values:
+        raise ValueError("Data list is empty.")
+    if not (0 <= percentile <= 100):
+        raise ValueError("Percentile must be between 0 and 100.")
+    k = (len(sorted_values) - 1) * (percentile / 100.0)
+    f = int(k)
+    if f + 1 >= len(sorted_values) or f == k:
+        return sorted_values[f]
+    return sorted_values[f] + (k - f) * (sorted_values[f + 1] - sorted_values[f])
+
+class RollingQuantiles:
+    """
+    The last `window` samples of one signal, kept both in arrival order and sorted.
+
+    add() finds the insert and evict positions by bisection (O(log n) comparisons;
+    the list shift behind them is a single memmove), so any percentile of the window
+    is then a direct index instead of a sort per sample. `quantiles` are the
+    percentiles current() reports together; quantile() works for any other.
+
+    Iterating, len() and indexing ([-1] is the newest sample) follow arrival order,
+    like the deque this replaces. Not thread safe; the samplers hold their own lock.
+    """
+
+    __slots__ = ("window", "quantiles", "_values", "_sorted")
+
+    def __init__(self, window, quantiles=(50,)):
+        if window < 1:
+            raise ValueError("Window must hold at least one sample.")
+        self.window = int(window)
+        self.quantiles = tuple(quantiles)
+        self._values = deque()
+        self._sorted = []
+
+    def add(self, value):
+        self._values.append(value)
+        insort(self._sorted, value)
+        if len(self._values) > self.window:
+            oldest = self._values.popleft()
+            del self._sorted[bisect_left(self._sorted, oldest)]
+
+    def quantile(self, percentile):
+        """The percentile (0-100) of the window, or None while it is empty."""
+        if not self._sorted:
+            return None
+        return percentile_of_sorted(self._sorted, percentile)
+
+    def current(self):
+        """The configured quantiles, in order (None each while the window is empty)."""
+        return tuple(self.quantile(q) for q in self.quantiles)
+
+    def resize(self, window):
+        """Changes the window length, dropping the oldest samples if it shrinks."""
+        self.window = max(1, int(window))
+        while len(self._values) > self.window:
+            del self._sorted[bisect_left(self._sorted, self._values.popleft())]
+
+    def clear(self):
+        self._values.clear()
+        self._sorted.clear()
+
+    @property
+    def sorted_values(self):
+        return self._sorted
+
+    def __len__(self):
+        return len(self._values)
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __getitem__(self, index):
+        return self._values[index]
+
+    def __repr__(self):
+        return f"RollingQuantiles(window={self.window}, samples={len(self)}, quantiles={self.quantiles})"
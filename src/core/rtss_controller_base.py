@@ -0,0 +1,165 @@
+# rtss_controller_base.py
+
+import ctypes
+import os
+from core.rtss_profile_files import RTSSProfileFileCache
+from core.fixed_fps import to_fixed
+
+class RTSSControllerBase:
+    """
+    Limiter logic shared by the RTSSHooks64.dll controller and the simulated one.
+
+    Subclasses set self.logger and self.rtss_install_path (the directory holding
+    Profiles/) and provide the RTSSHooks primitives with the DLL's calling
+    convention: LoadProfile, SaveProfile, GetProfileProperty, SetProfileProperty,
+    DeleteProfile, ResetProfile, UpdateProfiles and SetFlags (profile and property
+    names as bytes, values through ctypes pointers).
+    """
+
+    RTSSHOOKSFLAG_LIMITER_DISABLED = 4
+
+    def __init__(self, logger_instance, rtss_install_path):
+        self.logger = logger_instance
+        self.rtss_install_path = rtss_install_path
+        self.profile_files = RTSSProfileFileCache()
+
+    def delete_profile(self, profile_name):
+        self.DeleteProfile(profile_name.encode('ascii'))
+
+    def reset_profile(self, profile_name):
+        self.ResetProfile(profile_name.encode('ascii'))
+
+    def get_profile_property(self, profile_name, property_name, size=4):
+        self.LoadProfile(profile_name.encode('ascii'))
+        buf = (ctypes.c_byte * size)()
+        success = self.GetProfileProperty(property_name.encode('ascii'), ctypes.byref(buf), size)
+        if not success:
+            return None
+        return bytes(buf)
+
+    def set_profile_property(self, profile_name, property_name, value, size=4, update=True):
+        self.LoadProfile(profile_name.encode('ascii'))
+        if isinstance(value, int):
+            buf = ctypes.c_int(value)
+            ptr = ctypes.byref(buf)
+        elif isinstance(value, bytes):
+            buf = (ctypes.c_byte * size).from_buffer_copy(value)
+            ptr = ctypes.byref(buf)
+        else:
+            raise ValueError("Unsupported value type")
+        success = self.SetProfileProperty(property_name.encode('ascii'), ptr, size)
+        self.SaveProfile(profile_name.encode('ascii'))
+        if update:
+            self.UpdateProfiles()
+        return success
+
+    def create_profile(self, profile_name, properties):
+        # Load global profile as a base
+        self.LoadProfile(b"")
+        # Set each property
+        for prop, value in properties.items():
+            if isinstance(value, int):
+                buf = ctypes.c_int(value)
+                ptr = ctypes.byref(buf)
+                size = ctypes.sizeof(buf)
+            elif isinstance(value, bytes):
+                size = len(value)
+                buf = (ctypes.c_byte * size).from_buffer_copy(value)
+                ptr = ctypes.byref(buf)
+            else:
+                raise ValueError("Unsupported value type")
+            self.SetProfileProperty(prop.encode('ascii'), ptr, size)
+        # Save as new profile
+        self.SaveProfile(profile_name.encode('ascii'))
+        self.UpdateProfiles()
+
+#    def get_flags(self):
+#        return self.GetFlags()
+
+    def set_flags(self, and_mask, xor_mask):
+        return self.SetFlags(and_mask, xor_mask)
+
+    def disable_limiter(self):
+        self.SetFlags(0xFFFFFFFF, self.RTSSHOOKSFLAG_LIMITER_DISABLED)
+        self.UpdateProfiles()
+
+    def enable_limiter(self):
+        self.logger.add_log(f"Enabling RTSS limiter...")
+        self.SetFlags(~self.RTSSHOOKSFLAG_LIMITER_DISABLED & 0xFFFFFFFF, 0)
+        self.UpdateProfiles()
+
+    # Derived functions
+    def get_profile_file(self, profile_name):
+        profiles_dir = os.path.join(self.rtss_install_path, "Profiles")
+        if not profile_name or profile_name.lower() == "global":
+            return os.path.join(profiles_dir, "Global")
+        return os.path.join(profiles_dir, f"{profile_name}.cfg")
+
+    def set_limit_denominator(self, profile_name, new_denominator, update=True):
+        profile_file = self.get_profile_file(profile_name)
+
+        if not os.path.isfile(profile_file):
+            self.logger.add_log(f"Profile file not found: {profile_file}")
+            return False
+
+        self.profile_files.set_values(profile_file, {"LimitDenominator": new_denominator})
+
+        #self.logger.add_log(f"Updated LimitDenominator to {new_denominator} in {profile_file}")
+        if update:
+            self.UpdateProfiles()
+        return True
+
+    def write_fractional_framerate(self, profile_name, framerate):
+        """
+        Writes FramerateLimit and LimitDenominator for a profile without calling UpdateProfiles.
+        framerate is a FixedFPS (written as is), an int or a Decimal.
+        """
+        profile_name_for_api = "" if not profile_name or profile_name.lower() == "global" else profile_name
+        limit, denominator = to_fixed(framerate)
+
+        self.set_limit_denominator(profile_name, denominator, update=False)
+        self.set_profile_property(profile_name_for_api, "FramerateLimit", limit, update=False)
+
+        self.logger.add_log(f"Set {profile_name}: FramerateLimit={limit}, LimitDenominator={denominator}")
+        return limit, denominator
+
+    def set_fractional_framerate(self, profile_name, framerate, update=False, denominator=False):
+        limit, denominator = self.write_fractional_framerate(profile_name, framerate)
+        self.UpdateProfiles()
+        return limit, denominator
+
+    def set_fractional_fps_direct(self, profile_name, framerate, update=True):
+        profile_file = self.get_profile_file(profile_name)
+
+        if not os.path.isfile(profile_file):
+            self.logger.add_log(f"Profile file not found: {profile_file}")
+            return False
+
+        limit, denominator = to_fixed(framerate)
+        self.profile_files.set_values(profile_file, {"Limit": limit, "LimitDenominator": denominator})
+
+        #self.logger.add_log(f"Updated Limit={limit}, LimitDenominator={denominator} in {profile_file}")
+        if update:
+            self.UpdateProfiles()
+        return True
+
+    def get_framerate_limit(self, profile_name, get_denominator=False):
+        profile_name_for_api = "" if not profile_name or profile_name.lower() == "global" else profile_name
+        limit = self.get_profile_property(profile_name_for_api, "FramerateLimit", 4)
+        if limit is None:
+            return None
+
+        limit_int = int.from_bytes(limit, byteorder='little', signed=True)
+
+        if not get_denominator:
+            return limit_int
+
+        try:
+            denominator = int(self.profile_files.get_value(self.get_profile_file(profile_name), "LimitDenominator") or 1)
+        except Exception:
+            denominator = 1
+
+        if denominator < 1:
+            denominator = 1
+
+        return limit_int / denominator
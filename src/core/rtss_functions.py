@@ -1,16 +1,14 @@
 import ctypes
 import os
 import winreg
-from decimal import Decimal, InvalidOperation
 from core.launch_popup import show_rtss_error_and_exit
+from core.rtss_controller_base import RTSSControllerBase
 
-class RTSSController:
-    RTSSHOOKSFLAG_LIMITER_DISABLED = 4
+class RTSSController(RTSSControllerBase):
 
     def __init__(self, logger_instance):
-        self.rtss_install_path = self.get_rtss_install_path()
+        super().__init__(logger_instance, self.get_rtss_install_path())
         self.rtss_path = os.path.join(self.rtss_install_path, "RTSSHooks64.dll")
-        self.logger = logger_instance
         try:
             self.dll = ctypes.WinDLL(self.rtss_path)
         except OSError as e:
@@ -70,211 +68,6 @@ class RTSSController:
             path = os.path.dirname(path)
         return path
 
-    def delete_profile(self, profile_name):
-        self.DeleteProfile(profile_name.encode('ascii'))
-
-    def reset_profile(self, profile_name):
-        self.ResetProfile(profile_name.encode('ascii'))
-
-    def get_profile_property(self, profile_name, property_name, size=4):
-        self.LoadProfile(profile_name.encode('ascii'))
-        buf = (ctypes.c_byte * size)()
-        success = self.GetProfileProperty(property_name.encode('ascii'), ctypes.byref(buf), size)
-        if not success:
-            return None
-        return bytes(buf)
-
-    def set_profile_property(self, profile_name, property_name, value, size=4, update=True):
-        self.LoadProfile(profile_name.encode('ascii'))
-        if isinstance(value, int):
-            buf = ctypes.c_int(value)
-            ptr = ctypes.byref(buf)
-        elif isinstance(value, bytes):
-            buf = (ctypes.c_byte * size).from_buffer_copy(value)
-            ptr = ctypes.byref(buf)
-        else:
-            raise ValueError("Unsupported value type")
-        success = self.SetProfileProperty(property_name.encode('ascii'), ptr, size)
-        self.SaveProfile(profile_name.encode('ascii'))
-        if update:
-            self.UpdateProfiles()
-        return success
-
-    def create_profile(self, profile_name, properties):
-        # Load global profile as a base
-        self.LoadProfile(b"")
-        # Set each property
-        for prop, value in properties.items():
-            if isinstance(value, int):
-                buf = ctypes.c_int(value)
-                ptr = ctypes.byref(buf)
-                size = ctypes.sizeof(buf)
-            elif isinstance(value, bytes):
-                size = len(value)
-                buf = (ctypes.c_byte * size).from_buffer_copy(value)
-                ptr = ctypes.byref(buf)
-            else:
-                raise ValueError("Unsupported value type")
-            self.SetProfileProperty(prop.encode('ascii'), ptr, size)
-        # Save as new profile
-        self.SaveProfile(profile_name.encode('ascii'))
-        self.UpdateProfiles()
-
-#    def get_flags(self):
-#        return self.GetFlags()
-
-    def set_flags(self, and_mask, xor_mask):
-        return self.SetFlags(and_mask, xor_mask)
-
-    def disable_limiter(self):
-        self.SetFlags(0xFFFFFFFF, self.RTSSHOOKSFLAG_LIMITER_DISABLED)
-        self.UpdateProfiles()
-
-    def enable_limiter(self):
-        self.logger.add_log(f"Enabling RTSS limiter...")
-        self.SetFlags(~self.RTSSHOOKSFLAG_LIMITER_DISABLED & 0xFFFFFFFF, 0)
-        self.UpdateProfiles()
-
-    # Derived functions    
-    def set_limit_denominator(self, profile_name, new_denominator, update=True):
-        profiles_dir = os.path.join(self.rtss_install_path, "Profiles")
-        if not profile_name or profile_name.lower() == "global":
-            profile_file = os.path.join(profiles_dir, "Global")
-            profile_name_for_api = ""
-        else:
-            profile_file = os.path.join(profiles_dir, f"{profile_name}.cfg")
-            profile_name_for_api = profile_name
-
-        if not os.path.isfile(profile_file):
-            self.logger.add_log(f"Profile file not found: {profile_file}")
-            return False
-
-        with open(profile_file, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-
-        found = False
-        for i, line in enumerate(lines):
-            if line.strip().startswith("LimitDenominator="):
-                lines[i] = f"LimitDenominator={new_denominator}\n"
-                found = True
-                break
-
-        if not found:
-            lines.append(f"LimitDenominator={new_denominator}\n")
-
-        with open(profile_file, "w", encoding="utf-8") as f:
-            f.writelines(lines)
-
-        #self.logger.add_log(f"Updated LimitDenominator to {new_denominator} in {profile_file}")
-        if update:
-            self.UpdateProfiles()
-        return True
-
-    def set_fractional_framerate(self, profile_name, framerate, update=False, denominator=False):
-        profile_name_for_api = "" if not profile_name or profile_name.lower() == "global" else profile_name
-        fr_str = str(framerate)
-        if '.' in fr_str:
-            decimals = len(fr_str.split('.')[1])
-            denominator = 10 ** decimals
-            limit = int(round(float(framerate) * denominator))
-        else:
-            denominator = 1
-            limit = int(framerate)
-        
-        if denominator:
-            self.set_limit_denominator(profile_name, denominator, update=update)
-            
-        self.set_profile_property(profile_name_for_api, "FramerateLimit", limit, update=update)
-        if not update:
-            self.UpdateProfiles()
-
-        self.logger.add_log(f"Set {profile_name}: FramerateLimit={limit}, LimitDenominator={denominator} (actual limit: {limit/denominator})")
-        return limit, denominator
-
-    def set_fractional_fps_direct(self, profile_name, framerate, update=True):
-
-        profiles_dir = os.path.join(self.rtss_install_path, "Profiles")
-        if not profile_name or profile_name.lower() == "global":
-            profile_file = os.path.join(profiles_dir, "Global")
-            profile_name_for_api = ""
-        else:
-            profile_file = os.path.join(profiles_dir, f"{profile_name}.cfg")
-            profile_name_for_api = profile_name
-
-        if not os.path.isfile(profile_file):
-            self.logger.add_log(f"Profile file not found: {profile_file}")
-            return False
-
-        fr_str = str(framerate)
-
-        if '.' in fr_str:
-            decimals = len(fr_str.split('.')[1])
-            denominator = 10 ** decimals
-            limit = int(round(float(framerate) * denominator))
-        else:
-            denominator = 1
-            limit = int(framerate)
-
-        with open(profile_file, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-
-        found = False
-        for i, line in enumerate(lines):
-            stripped = line.strip()
-            if stripped.startswith("Limit="):
-                lines[i] = f"Limit={limit}\n"
-                found_limit = True
-            elif stripped.startswith("LimitDenominator="):
-                lines[i] = f"LimitDenominator={denominator}\n"
-                found_denominator = True
-
-        # Append if not found
-        if not found_limit:
-            lines.append(f"Limit={limit}\n")
-        if not found_denominator:
-            lines.append(f"LimitDenominator={denominator}\n")
-
-        with open(profile_file, "w", encoding="utf-8") as f:
-            f.writelines(lines)
-
-        #self.logger.add_log(f"Updated Limit={limit}, LimitDenominator={denominator} in {profile_file}")
-        if update:
-            self.UpdateProfiles()
-        return True
-    
-    def get_framerate_limit(self, profile_name, get_denominator=False):
-        profile_name_for_api = "" if not profile_name or profile_name.lower() == "global" else profile_name
-        limit = self.get_profile_property(profile_name_for_api, "FramerateLimit", 4)
-        if limit is None:
-            return None
-
-        limit_int = int.from_bytes(limit, byteorder='little', signed=True)
-
-        if not get_denominator:
-            return limit_int
-
-        profiles_dir = os.path.join(self.rtss_install_path, "Profiles")
-        if not profile_name or profile_name.lower() == "global":
-            profile_file = os.path.join(profiles_dir, "Global")
-        else:
-            profile_file = os.path.join(profiles_dir, f"{profile_name}.cfg")
-
-        denominator = 1
-        if os.path.isfile(profile_file):
-            with open(profile_file, "r", encoding="utf-8") as f:
-                for line in f:
-                    if line.strip().startswith("LimitDenominator="):
-                        try:
-                            denominator = int(line.strip().split("=")[1])
-                        except Exception:
-                            denominator = 1
-                        break
-
-        if denominator < 1:
-            denominator = 1
-
-        return limit_int / denominator
-
 if __name__ == "__main__":
     rtss = RTSSController()
     test_profile = "test_profile 5.exe"
@@ -1,39 +1,36 @@
 import subprocess
-import psutil
 from ctypes import wintypes, WinDLL, byref
-import mmap
-import struct
 import time
-from collections import defaultdict
 import dearpygui.dearpygui as dpg
 import threading
 import os
-from decimal import Decimal, InvalidOperation
+from core.rtss_shared_memory import RTSSSharedMemoryReader, RTSSSnapshotBuilder
+from core.process_presence import ProcessPresenceCache
 
 user32 = WinDLL('user32', use_last_error=True)
 
 class RTSSInterface:
-    def __init__(self, logger_instance, dpg_instance):
+    def __init__(self, logger_instance, dpg_instance, shared_memory_backend=None):
         """
         Initializes the RTSS Interface.
 
         Args:
             logger_instance: An instance of the logger module/class.
             dpg_instance: The dearpygui instance (dpg).
+            shared_memory_backend: Optional shared memory backend (defaults to the RTSS named mapping).
         """
         self.logger = logger_instance
         self.dpg = dpg_instance
-        self.last_dwTime0s = defaultdict(int)
+        self.shared_memory = RTSSSharedMemoryReader(logger_instance, backend=shared_memory_backend)
+        self.snapshot_builder = RTSSSnapshotBuilder(self.shared_memory)
+        self._snapshot = None
+        self._snapshot_lock = threading.Lock()
+        self.last_process_id = None
+        self.rtss_presence = ProcessPresenceCache('RTSS.exe')
 
     def is_rtss_running(self):
-        """Checks if RTSS.exe process is running."""
-        for process in psutil.process_iter(['name']):
-            try:
-                if process.info['name'] == 'RTSS.exe':
-                    return True
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                pass # Ignore processes that can't be accessed
-        return False
+        """Checks if RTSS.exe process is running (cached, see ProcessPresenceCache)."""
+        return self.rtss_presence.is_running()
 
     def _get_foreground_window_process_id(self):
         """Gets the process ID of the foreground window."""
@@ -44,47 +41,42 @@ class RTSSInterface:
         user32.GetWindowThreadProcessId(hwnd, byref(pid))
         return pid.value
 
-    def get_fps_for_active_window(self):
-        """Gets the FPS and process name for the active foreground window via RTSS shared memory."""
-        if not self.is_rtss_running():
-            return None, None
+    def snapshot(self, max_age=0.25):
+        """
+        Returns an RTSSSnapshot with FPS, frame counts and names of every hooked process.
 
-        process_id = self._get_foreground_window_process_id()
-        if not process_id:
-            return None, None
+        A snapshot younger than max_age seconds is reused, so the monitor, autopilot and
+        any other caller in the same tick share a single read of the shared memory.
+        Returns None if RTSS is not running or its shared memory is unavailable.
+        """
+        with self._snapshot_lock:
+            if self._snapshot is not None and time.monotonic() - self._snapshot.timestamp < max_age:
+                return self._snapshot
 
-        try:
-            # Initial size guess, might need resizing
-            mmap_size = 4485160
-            mm = mmap.mmap(0, mmap_size, 'RTSSSharedMemoryV2')
-            dwSignature, dwVersion, dwAppEntrySize, dwAppArrOffset, dwAppArrSize, dwOSDEntrySize, dwOSDArrOffset, dwOSDArrSize, dwOSDFrame = struct.unpack('4sLLLLLLLL', mm[0:36])
-            calc_mmap_size = dwAppArrOffset + dwAppArrSize * dwAppEntrySize
-            if mmap_size < calc_mmap_size:
-                mm = mmap.mmap(0, calc_mmap_size, 'RTSSSharedMemoryV2')
-            if dwSignature[::-1] not in [b'RTSS', b'SSTR'] or dwVersion < 0x00020000:
-                return None, None # Invalid signature or version
+            if not self.is_rtss_running():
+                self.shared_memory.close()
+                self.snapshot_builder.reset()
+                self._snapshot = None
+                return None
 
-            for dwEntry in range(0, dwAppArrSize):
-                entry = dwAppArrOffset + dwEntry * dwAppEntrySize
-                stump = mm[entry:entry + 6 * 4 + 260]
-                if len(stump) == 0:
-                    continue
-                dwProcessID, szName, dwFlags, dwTime0, dwTime1, dwFrames, dwFrameTime = struct.unpack('L260sLLLLL', stump)
-                if dwProcessID == process_id:
-                    if dwTime0 > 0 and dwTime1 > 0 and dwFrames > 0:
-                        if dwTime0 != self.last_dwTime0s.get(dwProcessID):
-                            fps = 1000 * dwFrames / (dwTime1 - dwTime0)
-                            self.last_dwTime0s[dwProcessID] = dwTime0
-                            process_name = szName.decode(errors='ignore').rstrip('\x00')
-                            process_name = process_name.split('\\')[-1]
-                            return Decimal(fps), process_name
-            return None, None
-        except FileNotFoundError:
-            # Shared memory doesn't exist (RTSS likely not running or OSD not enabled)
-            self.rtss_status = False # Update status
-            return None, None
-        except Exception as e:
-            self.logger.add_log(f"Error reading RTSS Shared Memory: {e}")
+            try:
+                self._snapshot = self.snapshot_builder.build()
+            except Exception as e:
+                self.logger.add_log(f"Error reading RTSS Shared Memory: {e}")
+                self.shared_memory.close()
+                self._snapshot = None
+            return self._snapshot
+
+    def get_fps_for_process(self, process_id, max_age=0.25):
+        """Returns (fps as float, process_name) for any hooked PID from the shared snapshot, or (None, None)."""
+        snapshot = self.snapshot(max_age)
+        app = snapshot.get(process_id) if snapshot and process_id else None
+        if app is None or not app.fresh:
             return None, None
+        return app.fps, app.name
 
-        return None, None # Process not found in shared memory
+    def get_fps_for_active_window(self):
+        """Gets the FPS and process name for the active foreground window via RTSS shared memory."""
+        process_id = self._get_foreground_window_process_id()
+        self.last_process_id = process_id
+        return self.get_fps_for_process(process_id)
@@ -0,0 +1,108 @@
+# rtss_profile_files.py
+
+import os
+import tempfile
+import threading
+
+class RTSSProfileFileCache:
+    """
+    Caches the lines of RTSS profile files (Profiles/*.cfg, Profiles/Global) keyed by path.
+
+    A cached copy is used for as long as the file's mtime and size are unchanged, so
+    RTSS (or SaveProfile) rewriting the file is picked up on the next access. Writes
+    only happen when a value actually changes, and go through a temp file in the same
+    directory plus os.replace, so a crash mid-write can't leave a truncated profile.
+    """
+
+    def __init__(self, encoding="utf-8"):
+        self.encoding = encoding
+        self._files = {}  # path -> (mtime_ns, size, lines)
+        self._lock = threading.Lock()
+        self.reads = 0
+        self.writes = 0
+
+    @staticmethod
+    def _stat_key(path):
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+
+    def _lines(self, path):
+        stat_key = self._stat_key(path)
+        cached = self._files.get(path)
+        if cached is not None and cached[:2] == stat_key:
+            return cached[2]
+        with open(path, "r", encoding=self.encoding) as f:
+            lines = f.readlines()
+        self.reads += 1
+        self._files[path] = (stat_key[0], stat_key[1], lines)
+        return lines
+
+    def get_value(self, path, key):
+        """Returns the first `key=` value in the file as a string, or None if the key (or file) is missing."""
+        prefix = f"{key}="
+        with self._lock:
+            try:
+                lines = self._lines(path)
+            except FileNotFoundError:
+                return None
+            for line in lines:
+                stripped = line.strip()
+                if stripped.startswith(prefix):
+                    return stripped[len(prefix):]
+        return None
+
+    def set_values(self, path, values):
+        """
+        Sets `key=value` for each item of values, replacing the first existing line for
+        that key or appending one. Returns True if the file was rewritten, False if every
+        value was already set.
+        """
+        with self._lock:
+            lines = list(self._lines(path))
+            changed = False
+            for key, value in values.items():
+                prefix = f"{key}="
+                new_line = f"{key}={value}\n"
+                for i, line in enumerate(lines):
+                    if line.strip().startswith(prefix):
+                        if line.strip() != new_line.strip():
+                            lines[i] = new_line
+                            changed = True
+                        break
+                else:
+                    if lines and not lines[-1].endswith("\n"):
+                        lines[-1] += "\n"
+                    lines.append(new_line)
+                    changed = True
+
+            if not changed:
+                return False
+
+            self._atomic_write(path, lines)
+            stat_key = self._stat_key(path)
+            self._files[path] = (stat_key[0], stat_key[1], lines)
+            self.writes += 1
+            return True
+
+    def _atomic_write(self, path, lines):
+        directory = os.path.dirname(path) or "."
+        fd, tmp_path = tempfile.mkstemp(prefix=".dfl_", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding=self.encoding) as f:
+                f.writelines(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def invalidate(self, path=None):
+        with self._lock:
+            if path is None:
+                self._files.clear()
+            else:
+                self._files.pop(path, None)
@@ -0,0 +1,306 @@
+# rtss_shared_memory.py
+
+import mmap
+import os
+import struct
+import threading
+import time
+import numpy as np
+
+RTSS_SHARED_MEMORY_NAME = "RTSSSharedMemoryV2"
+
+# Initial size guess for the mapping, grown if the header says the app array is bigger
+DEFAULT_MAPPING_SIZE = 4485160
+
+# RTSS_SHARED_MEMORY header: dwSignature, dwVersion, dwAppEntrySize, dwAppArrOffset, dwAppArrSize,
+# dwOSDEntrySize, dwOSDArrOffset, dwOSDArrSize, dwOSDFrame
+HEADER_FORMAT = '<4sLLLLLLLL'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+# Leading part of RTSS_SHARED_MEMORY_APP_ENTRY: dwProcessID, szName[MAX_PATH], dwFlags,
+# dwTime0, dwTime1, dwFrames, dwFrameTime
+APP_ENTRY_FORMAT = '<L260sLLLLL'
+APP_ENTRY_SIZE = struct.calcsize(APP_ENTRY_FORMAT)
+
+def app_entry_dtype(entry_size):
+    """
+    Explicit little-endian structured dtype for one app entry.
+
+    Only the leading fields are named; itemsize is set to dwAppEntrySize so the
+    dtype can be laid directly over the whole app array.
+    """
+    return np.dtype({
+        'names': ['pid', 'name', 'flags', 'time0', 'time1', 'frames', 'frametime'],
+        'formats': ['<u4', 'S260', '<u4', '<u4', '<u4', '<u4', '<u4'],
+        'offsets': [0, 4, 264, 268, 272, 276, 280],
+        'itemsize': max(entry_size, APP_ENTRY_SIZE),
+    })
+
+def parse_app_entries(buffer, arr_offset, entry_size, arr_size):
+    """
+    Returns a zero-copy structured array over all app entries in buffer.
+
+    The result is a view into buffer; it must be released before the underlying
+    mapping is closed.
+    """
+    return np.frombuffer(buffer, dtype=app_entry_dtype(entry_size), count=arr_size, offset=arr_offset)
+
+def decode_process_name(szName):
+    """Returns the executable name from a raw szName field."""
+    process_name = bytes(szName).decode(errors='ignore').rstrip('\x00')
+    return process_name.split('\\')[-1]
+
+class NamedMappingBackend:
+    """Maps the Windows named file mapping RTSS creates (RTSSSharedMemoryV2)."""
+
+    def __init__(self, name=RTSS_SHARED_MEMORY_NAME):
+        self.name = name
+
+    def map(self, size):
+        return mmap.mmap(0, size, self.name)
+
+    def __repr__(self):
+        return f"NamedMappingBackend({self.name!r})"
+
+class FileMappingBackend:
+    """
+    Maps a regular file laid out exactly like RTSS V2 shared memory.
+
+    Lets the FPS path run off a gaming PC (e.g. on Linux build machines) against a
+    file animated by core.rtss_shm_writer. The mapping is capped at the file size.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def map(self, size):
+        with open(self.path, "rb") as f:
+            length = min(size, os.fstat(f.fileno()).st_size)
+            return mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ)
+
+    def __repr__(self):
+        return f"FileMappingBackend({self.path!r})"
+
+class RTSSSharedMemoryReader:
+    """
+    Long-lived reader for the RTSS V2 shared memory.
+
+    The mapping is opened once and reused; it is only reopened when dwAppArrSize or
+    dwAppEntrySize change. The app array is parsed through a structured NumPy view
+    laid over the mapping, so reading every entry needs no per-entry Python objects.
+    A PID -> app slot index is checked first on every lookup and rebuilt only when
+    the cached slot no longer belongs to the requested PID.
+
+    The memory itself comes from a backend (NamedMappingBackend by default,
+    FileMappingBackend for a file-backed stand-in).
+    """
+
+    def __init__(self, logger_instance=None, backend=None):
+        self.logger = logger_instance
+        self.backend = backend or NamedMappingBackend()
+        self._mm = None
+        self._mapped_size = 0
+        self._layout = None  # (dwAppArrOffset, dwAppEntrySize, dwAppArrSize)
+        self._entries = None  # Structured view over the app array
+        self._pid_index = {}
+        self._lock = threading.Lock()
+
+    def _read_header(self):
+        dwSignature, dwVersion, dwAppEntrySize, dwAppArrOffset, dwAppArrSize, *_ = struct.unpack_from(HEADER_FORMAT, self._mm, 0)
+        if dwSignature[::-1] not in [b'RTSS', b'SSTR'] or dwVersion < 0x00020000:
+            return None  # Invalid signature or version
+        return dwAppArrOffset, dwAppEntrySize, dwAppArrSize
+
+    def _ensure_mapping(self):
+        """Maps the shared memory if needed and returns the current app array layout, or None."""
+        if self._mm is None:
+            self._mm = self.backend.map(DEFAULT_MAPPING_SIZE)
+            self._mapped_size = len(self._mm)
+            if self._mapped_size < HEADER_SIZE:
+                self._close_mapping()
+                return None
+
+        layout = self._read_header()
+        if layout is None:
+            # Don't keep a mapping RTSS hasn't initialised yet
+            self._close_mapping()
+            return None
+
+        if layout != self._layout:
+            dwAppArrOffset, dwAppEntrySize, dwAppArrSize = layout
+            required_size = dwAppArrOffset + dwAppArrSize * dwAppEntrySize
+            self._entries = None  # Release the view before the mapping can be closed
+            if required_size > self._mapped_size:
+                self._mm.close()
+                self._mm = self.backend.map(required_size)
+                self._mapped_size = len(self._mm)
+                if self._mapped_size < required_size:
+                    self._close_mapping()
+                    return None  # Header describes more entries than are mapped
+            self._layout = layout
+            self._entries = parse_app_entries(self._mm, dwAppArrOffset, dwAppEntrySize, dwAppArrSize)
+            self._pid_index.clear()
+        return self._layout
+
+    def _rebuild_index(self):
+        pids = self._entries['pid']
+        slots = np.flatnonzero(pids)
+        # Reversed so the first slot wins for duplicated PIDs
+        self._pid_index = dict(zip(pids[slots].tolist()[::-1], slots.tolist()[::-1]))
+
+    def _slot_for_pid(self, process_id):
+        slot = self._pid_index.get(process_id)
+        if slot is not None and self._entries['pid'][slot] == process_id:
+            return slot
+        self._rebuild_index()
+        return self._pid_index.get(process_id)
+
+    def read_app_entry(self, process_id):
+        """
+        Returns the app entry for process_id as a tuple
+        (dwProcessID, szName, dwFlags, dwTime0, dwTime1, dwFrames, dwFrameTime), or None.
+        """
+        with self._lock:
+            if self._ensure_mapping() is None:
+                return None
+            slot = self._slot_for_pid(process_id)
+            if slot is None:
+                return None
+            return self._entries[slot].item()
+
+    def read_app_entries(self):
+        """
+        Reads every app entry in one vectorized pass.
+
+        Returns a dict of uint32 arrays keyed by 'slot', 'pid', 'flags', 'time0',
+        'time1', 'frames' and 'frametime' (only occupied slots), or None if the
+        shared memory is unavailable. Names are decoded on demand with read_name().
+        """
+        with self._lock:
+            if self._ensure_mapping() is None:
+                return None
+            entries = self._entries
+            slots = np.flatnonzero(entries['pid'])
+            # Field views are strided over the mapping; indexing copies only the occupied values
+            result = {field: entries[field][slots] for field in ('pid', 'flags', 'time0', 'time1', 'frames', 'frametime')}
+            result['slot'] = slots
+            return result
+
+    def read_name(self, slot):
+        """Returns the decoded process name stored in an app slot."""
+        with self._lock:
+            if self._entries is None or slot >= len(self._entries):
+                return None
+            return decode_process_name(self._entries['name'][slot])
+
+    def _close_mapping(self):
+        self._entries = None
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except Exception:
+                pass
+        self._mm = None
+        self._mapped_size = 0
+        self._layout = None
+        self._pid_index.clear()
+
+    def close(self):
+        """Releases the mapping; the next read maps it again."""
+        with self._lock:
+            self._close_mapping()
+
+class RTSSAppStats:
+    """FPS and frame counters of one hooked process, as seen in a snapshot."""
+    __slots__ = ("pid", "slot", "name", "flags", "time0", "time1", "frames", "frametime", "fps", "fresh")
+
+    def __init__(self, pid, slot, name, flags, time0, time1, frames, frametime, fps, fresh):
+        self.pid = pid
+        self.slot = slot
+        self.name = name
+        self.flags = flags
+        self.time0 = time0
+        self.time1 = time1
+        self.frames = frames
+        self.frametime = frametime  # microseconds
+        self.fps = fps  # None until RTSS has published a measurement window
+        self.fresh = fresh  # True if the measurement window changed since the previous snapshot
+
+    def __repr__(self):
+        return f"RTSSAppStats(pid={self.pid}, name={self.name!r}, fps={self.fps}, fresh={self.fresh})"
+
+class RTSSSnapshot:
+    """All hooked processes read in one pass; query any PID without another scan."""
+
+    def __init__(self, apps, timestamp):
+        self.apps = apps  # pid -> RTSSAppStats
+        self.timestamp = timestamp
+
+    def get(self, pid):
+        return self.apps.get(pid)
+
+    def __contains__(self, pid):
+        return pid in self.apps
+
+    def __iter__(self):
+        return iter(self.apps.values())
+
+    def __len__(self):
+        return len(self.apps)
+
+class RTSSSnapshotBuilder:
+    """
+    Builds RTSSSnapshot objects from a reader.
+
+    Keeps the per-PID last dwTime0 (to flag fresh measurement windows) and a PID ->
+    name cache; both are pruned to the PIDs present in the latest read, so processes
+    that exited are evicted instead of accumulating.
+    """
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.last_dwTime0s = {}
+        self._names = {}  # pid -> process name
+
+    def reset(self):
+        self.last_dwTime0s.clear()
+        self._names.clear()
+
+    def build(self):
+        """Returns a new RTSSSnapshot, or None if the shared memory is unavailable."""
+        entries = self.reader.read_app_entries()
+        if entries is None:
+            self.reset()
+            return None
+
+        time0 = entries['time0']
+        time1 = entries['time1']
+        frames = entries['frames']
+        valid = (time0 > 0) & (time1 > time0) & (frames > 0)
+        elapsed = np.where(valid, time1.astype(np.int64) - time0, 1)
+        fps = np.where(valid, 1000.0 * frames / elapsed, 0.0)
+
+        apps = {}
+        last_dwTime0s = {}
+        names = {}
+        for i, pid in enumerate(entries['pid'].tolist()):
+            if pid in apps:
+                continue  # First slot wins for duplicated PIDs
+            slot = int(entries['slot'][i])
+            name = self._names.get(pid)
+            if name is None:
+                name = self.reader.read_name(slot)
+            names[pid] = name
+            t0 = int(time0[i])
+            is_valid = bool(valid[i])
+            apps[pid] = RTSSAppStats(
+                pid, slot, name, int(entries['flags'][i]), t0, int(time1[i]), int(frames[i]),
+                int(entries['frametime'][i]),
+                float(fps[i]) if is_valid else None,
+                is_valid and t0 != self.last_dwTime0s.get(pid),
+            )
+            last_dwTime0s[pid] = t0
+
+        self.last_dwTime0s = last_dwTime0s
+        self._names = names
+        return RTSSSnapshot(apps, time.monotonic())
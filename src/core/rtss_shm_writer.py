@@ -0,0 +1,154 @@
+# rtss_shm_writer.py
+# Writes and animates a file laid out like RTSS V2 shared memory, for use with
+# FileMappingBackend when no RTSS instance is available.
+#
+# Usage (from src/): python -m core.rtss_shm_writer rtss_shm.bin --slots 256 --active 40
+
+import argparse
+import mmap
+import os
+import random
+import struct
+import sys
+import time
+
+_this_dir = os.path.abspath(os.path.dirname(__file__))
+_root = os.path.dirname(_this_dir)  # Gets src directory
+if _root not in sys.path:
+    sys.path.insert(0, _root)
+
+from core.rtss_shared_memory import HEADER_FORMAT, HEADER_SIZE, APP_ENTRY_FORMAT
+
+# sizeof(RTSS_SHARED_MEMORY_APP_ENTRY) for RTSS 7.3.x
+DEFAULT_ENTRY_SIZE = 6212
+RTSS_VERSION = 0x00020015
+
+class _FakeApp:
+    def __init__(self, pid, name, fps):
+        self.pid = pid
+        self.name = name
+        self.fps = fps
+        self.window_start = None
+        self.window_frames = 0
+        self.frame_credit = 0.0
+
+class RTSSSharedMemoryFileWriter:
+    """
+    Creates an RTSS V2 shared memory image in a regular file and keeps it animated.
+
+    Apps occupy app slots like hooked processes do: they can appear and disappear,
+    and their dwTime0/dwTime1/dwFrames measurement windows roll over about once a
+    second while dwFrameTime follows the per-frame time, like RTSS.
+    """
+
+    def __init__(self, path, slots=256, entry_size=DEFAULT_ENTRY_SIZE, seed=None):
+        self.path = path
+        self.slots = slots
+        self.entry_size = entry_size
+        self.random = random.Random(seed)
+        self.apps = {}  # slot -> _FakeApp
+        self._next_pid = 1000
+
+        size = HEADER_SIZE + slots * entry_size
+        with open(path, "wb") as f:
+            f.truncate(size)
+        self._file = open(path, "r+b")
+        self._mm = mmap.mmap(self._file.fileno(), size)
+        struct.pack_into(HEADER_FORMAT, self._mm, 0, b'SSTR', RTSS_VERSION, entry_size, HEADER_SIZE, slots, 0, 0, 0, 0)
+
+    def _offset(self, slot):
+        return HEADER_SIZE + slot * self.entry_size
+
+    def _write_entry(self, slot, app, time0=0, time1=0, frames=0, frametime=0):
+        name = f"C:\\Games\\{app.name}\\{app.name}.exe".encode()
+        struct.pack_into(APP_ENTRY_FORMAT, self._mm, self._offset(slot),
+                         app.pid, name, 0, time0, time1, frames, frametime)
+
+    def add_app(self, name=None, fps=None, pid=None):
+        """Adds an app to the first free slot and returns its PID (None if all slots are used)."""
+        free = [slot for slot in range(self.slots) if slot not in self.apps]
+        if not free:
+            return None
+        if pid is None:
+            pid = self._next_pid
+            self._next_pid += 4
+        app = _FakeApp(pid, name or f"game_{pid}", fps or self.random.uniform(30, 240))
+        self.apps[free[0]] = app
+        self._write_entry(free[0], app)
+        return pid
+
+    def remove_app(self, pid):
+        for slot, app in list(self.apps.items()):
+            if app.pid == pid:
+                del self.apps[slot]
+                self._mm[self._offset(slot):self._offset(slot) + struct.calcsize(APP_ENTRY_FORMAT)] = bytes(struct.calcsize(APP_ENTRY_FORMAT))
+                return True
+        return False
+
+    def tick(self, now_ms, elapsed_ms):
+        """Advances every app's frame counters by elapsed_ms and publishes rolled-over windows."""
+        for slot, app in self.apps.items():
+            fps = max(1.0, app.fps * self.random.uniform(0.9, 1.1))
+            app.frame_credit += fps * elapsed_ms / 1000.0
+            new_frames = int(app.frame_credit)
+            app.frame_credit -= new_frames
+            app.window_frames += new_frames
+            if app.window_start is None:
+                app.window_start = now_ms
+            frametime = int(1_000_000 / fps)
+            if self.random.random() < 0.01:
+                frametime *= 3  # Occasional stutter
+            if now_ms - app.window_start >= 1000 and app.window_frames > 0:
+                self._write_entry(slot, app, app.window_start, now_ms, app.window_frames, frametime)
+                app.window_start = now_ms
+                app.window_frames = 0
+            else:
+                struct.pack_into('<L', self._mm, self._offset(slot) + 280, frametime)
+
+    def animate(self, duration=None, interval=0.02, active=32, churn=0.01):
+        """
+        Keeps about `active` apps alive, replacing each with probability `churn` per tick.
+        Runs for `duration` seconds, or until interrupted when duration is None.
+        """
+        while len(self.apps) < min(active, self.slots):
+            self.add_app()
+        start = time.monotonic()
+        last = start
+        while duration is None or last - start < duration:
+            time.sleep(interval)
+            now = time.monotonic()
+            for app in list(self.apps.values()):
+                if self.random.random() < churn:
+                    self.remove_app(app.pid)
+            while len(self.apps) < min(active, self.slots):
+                self.add_app()
+            self.tick(int(now * 1000), (now - last) * 1000)
+            last = now
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Animate a file-backed RTSS V2 shared memory stand-in')
+    parser.add_argument('path', help='File to create (overwritten)')
+    parser.add_argument('--slots', type=int, default=256, help='dwAppArrSize')
+    parser.add_argument('--entry-size', type=int, default=DEFAULT_ENTRY_SIZE, help='dwAppEntrySize')
+    parser.add_argument('--active', type=int, default=32, help='Number of hooked apps to keep alive')
+    parser.add_argument('--churn', type=float, default=0.01, help='Per-tick probability that an app exits and is replaced')
+    parser.add_argument('--interval', type=float, default=0.02, help='Seconds between updates')
+    parser.add_argument('--duration', type=float, default=None, help='Seconds to run (default: until Ctrl+C)')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    writer = RTSSSharedMemoryFileWriter(args.path, args.slots, args.entry_size, args.seed)
+    print(f"Writing RTSS shared memory stand-in to {args.path} ({args.slots} slots, {args.active} active)")
+    try:
+        writer.animate(args.duration, args.interval, args.active, args.churn)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        writer.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# rtss_simulated.py
+
+import ctypes
+import os
+import threading
+import time
+from core.rtss_controller_base import RTSSControllerBase
+
+class SimulatedRTSSController(RTSSControllerBase):
+    """
+    RTSSController stand-in that needs neither RTSS nor Windows.
+
+    Profiles live in <root>/Profiles with the same file semantics RTSS uses
+    (Global plus <name>.cfg, FramerateLimit stored as Limit=, LimitDenominator= next
+    to it), so the derived functions in RTSSControllerBase run unchanged. Every
+    primitive call is recorded in self.calls as (perf_counter timestamp, name, args).
+    update_latency / property_latency (seconds) add a delay to UpdateProfiles /
+    SetProfileProperty, to mimic RTSS re-applying profiles to hooked apps.
+    """
+
+    # RTSSHooks property name -> key in the profile file
+    PROPERTY_KEYS = {"FramerateLimit": "Limit"}
+
+    def __init__(self, logger_instance, root_dir, update_latency=0.0, property_latency=0.0):
+        super().__init__(logger_instance, root_dir)
+        self.profiles_dir = os.path.join(root_dir, "Profiles")
+        os.makedirs(self.profiles_dir, exist_ok=True)
+        global_file = os.path.join(self.profiles_dir, "Global")
+        if not os.path.isfile(global_file):
+            with open(global_file, "w", encoding="utf-8") as f:
+                f.write("[Framerate]\nLimit=0\nLimitDenominator=1\n")
+
+        self.update_latency = update_latency
+        self.property_latency = property_latency
+        self.flags = 0
+        self.calls = []
+        self._loaded_file = None
+        self._loaded = {}  # file key -> value (string), for the loaded profile
+        self._lock = threading.Lock()
+
+    def _record(self, name, *args):
+        self.calls.append((time.perf_counter(), name, args))
+
+    def _file_for(self, profile_name):
+        name = profile_name.decode('ascii') if isinstance(profile_name, bytes) else profile_name
+        return self.get_profile_file(name)
+
+    def _read_values(self, path):
+        values = {}
+        if not os.path.isfile(path):
+            return values
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                stripped = line.strip()
+                if "=" in stripped and not stripped.startswith("["):
+                    key, value = stripped.split("=", 1)
+                    values.setdefault(key, value)
+        return values
+
+    def call_count(self, name):
+        return sum(1 for _, call, _ in self.calls if call == name)
+
+    def clear_calls(self):
+        self.calls.clear()
+
+    # RTSSHooks primitives
+    def LoadProfile(self, profile_name):
+        self._record("LoadProfile", profile_name)
+        with self._lock:
+            self._loaded_file = self._file_for(profile_name)
+            self._loaded = self._read_values(self._loaded_file)
+
+    def SaveProfile(self, profile_name):
+        self._record("SaveProfile", profile_name)
+        with self._lock:
+            path = self._file_for(profile_name)
+            if not os.path.isfile(path):
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write("[Framerate]\n")
+            if self._loaded:
+                self.profile_files.set_values(path, self._loaded)
+
+    def GetProfileProperty(self, property_name, ptr, size):
+        self._record("GetProfileProperty", property_name, size)
+        key = self.PROPERTY_KEYS.get(property_name.decode('ascii'), property_name.decode('ascii'))
+        with self._lock:
+            value = self._loaded.get(key)
+        if value is None:
+            return False
+        try:
+            data = int(value).to_bytes(size, byteorder='little', signed=True)
+        except (ValueError, OverflowError):
+            return False
+        ctypes.memmove(ptr, data, size)
+        return True
+
+    def SetProfileProperty(self, property_name, ptr, size):
+        self._record("SetProfileProperty", property_name, size)
+        if self.property_latency:
+            time.sleep(self.property_latency)
+        key = self.PROPERTY_KEYS.get(property_name.decode('ascii'), property_name.decode('ascii'))
+        value = int.from_bytes(ctypes.string_at(ptr, size), byteorder='little', signed=True)
+        with self._lock:
+            self._loaded[key] = str(value)
+        return True
+
+    def DeleteProfile(self, profile_name):
+        self._record("DeleteProfile", profile_name)
+        path = self._file_for(profile_name)
+        if os.path.isfile(path):
+            os.remove(path)
+        self.profile_files.invalidate(path)
+
+    def ResetProfile(self, profile_name):
+        self._record("ResetProfile", profile_name)
+        with self._lock:
+            self._loaded_file = self._file_for(profile_name)
+            self._loaded = {}
+
+    def UpdateProfiles(self):
+        self._record("UpdateProfiles")
+        if self.update_latency:
+            time.sleep(self.update_latency)
+
+    def SetFlags(self, and_mask, xor_mask):
+        self._record("SetFlags", and_mask, xor_mask)
+        self.flags = (self.flags & and_mask) ^ xor_mask
+        return self.flags
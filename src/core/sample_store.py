@@ -0,0 +1,138 @@
+# sample_store.py
+
+import warnings
+import numpy as np
+
+class SampleRingStore:
+    """
+    Recent samples of many sensors in one preallocated float32 array (sensors x
+    capacity) used as a ring buffer: each append() writes one column holding every
+    sensor's reading for that poll. Memory stays fixed however long the session runs.
+
+    Every sensor key gets a stable row the first time it is seen (rows are added by
+    doubling the array, which only happens while sensors are being discovered). Stats
+    are computed for all sensors in one vectorized call over the newest `count`
+    columns. A sensor with no reading in a poll gets NaN for that column, which the
+    stats skip.
+
+    Not thread safe; LHMSensor holds its own lock around it.
+    """
+
+    def __init__(self, capacity, sensors=16):
+        self.capacity = max(1, int(capacity))
+        self._data = np.full((max(1, sensors), self.capacity), np.nan, dtype=np.float32)
+        self._rows = {}  # key -> row
+        self._keys = []
+        self._pos = 0  # Next column to write
+        self._count = 0
+
+    def __len__(self):
+        """Number of polls stored (up to capacity)."""
+        return self._count
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    def keys(self):
+        """Sensor keys in row order (the order of every array returned by the stats)."""
+        return list(self._keys)
+
+    def row(self, key):
+        return self._rows.get(key)
+
+    def _add_row(self, key):
+        if len(self._keys) == self._data.shape[0]:
+            grown = np.full((self._data.shape[0] * 2, self.capacity), np.nan, dtype=np.float32)
+            grown[:self._data.shape[0]] = self._data
+            self._data = grown
+        row = len(self._keys)
+        self._rows[key] = row
+        self._keys.append(key)
+        return row
+
+    def append(self, values):
+        """Stores one poll: a mapping of sensor key -> reading."""
+        column = self._data[:, self._pos]
+        column.fill(np.nan)
+        for key, value in values.items():
+            row = self._rows.get(key)
+            if row is None:
+                row = self._add_row(key)
+                column = self._data[:, self._pos]
+            column[row] = value
+        self._pos = (self._pos + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def clear(self):
+        """Drops all samples; sensor rows are kept."""
+        self._data.fill(np.nan)
+        self._pos = 0
+        self._count = 0
+
+    def window(self, count=None):
+        """The newest `count` polls (all by default) as a sensors x count array, oldest first."""
+        count = self._count if count is None else max(0, min(int(count), self._count))
+        rows = len(self._keys)
+        start = (self._pos - count) % self.capacity
+        if start + count <= self.capacity:
+            return self._data[:rows, start:start + count]
+        return np.concatenate((self._data[:rows, start:], self._data[:rows, :self._pos]), axis=1)
+
+    def latest(self):
+        """Each sensor's reading from the newest poll (NaN if it had none)."""
+        if not self._count:
+            return np.full(len(self._keys), np.nan)
+        return self._data[:len(self._keys), (self._pos - 1) % self.capacity].astype(np.float64)
+
+    def values(self, key, count=None):
+        """One sensor's stored readings, oldest first, without gaps."""
+        row = self._rows.get(key)
+        if row is None:
+            return np.empty(0)
+        series = self.window(count)[row].astype(np.float64)
+        return series[~np.isnan(series)]
+
+    def percentile(self, percentile, count=None):
+        """The percentile (0-100) of each sensor over the newest `count` polls (NaN without data)."""
+        block = self.window(count)
+        if block.shape[1] == 0:
+            return np.full(block.shape[0], np.nan)
+        block = block.astype(np.float64)
+        if not np.isnan(block).any():
+            return np.percentile(block, percentile, axis=1)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # All-NaN rows give NaN
+            return np.nanpercentile(block, percentile, axis=1)
+
+    def stats(self, count=None, percentiles=()):
+        """
+        Per sensor stats over the newest `count` polls, as arrays in keys() order:
+        count, mean, std (sample standard deviation, 0 with a single reading), median
+        and one 'p<q>' entry per requested percentile. NaN where a sensor has no data.
+        """
+        block = self.window(count).astype(np.float64)
+        rows = block.shape[0]
+        counts = np.count_nonzero(~np.isnan(block), axis=1)
+        result = {"count": counts}
+        if block.shape[1] == 0:
+            nan = np.full(rows, np.nan)
+            result.update(mean=nan, std=nan.copy(), median=nan.copy())
+            result.update((f"p{q:g}", nan.copy()) for q in percentiles)
+            return result
+
+        if np.isnan(block).any():
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                result["mean"] = np.nanmean(block, axis=1)
+                result["std"] = np.where(counts > 1, np.nanstd(block, axis=1, ddof=1), 0.0)
+                result["median"] = np.nanmedian(block, axis=1)
+                for q in percentiles:
+                    result[f"p{q:g}"] = np.nanpercentile(block, q, axis=1)
+            result["std"][counts == 0] = np.nan
+        else:
+            result["mean"] = block.mean(axis=1)
+            result["std"] = block.std(axis=1, ddof=1) if block.shape[1] > 1 else np.zeros(rows)
+            result["median"] = np.median(block, axis=1)
+            for q in percentiles:
+                result[f"p{q:g}"] = np.percentile(block, q, axis=1)
+        return result
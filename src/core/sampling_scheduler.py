@@ -0,0 +1,200 @@
+# sampling_scheduler.py
+
+import heapq
+import threading
+import time
+from collections import deque
+
+class _Source:
+    __slots__ = ("name", "callback", "interval", "generation", "runs", "skipped", "errors",
+                 "jitter", "max_jitter", "busy_total", "busy_max")
+
+    def __init__(self, name, callback, interval, history):
+        self.name = name
+        self.callback = callback
+        self.interval = interval
+        self.generation = 0  # Bumped on reschedule, so stale heap entries are dropped
+        self.jitter = deque(maxlen=history)  # seconds late per run
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.runs = 0
+        self.skipped = 0
+        self.errors = 0
+        self.jitter.clear()
+        self.max_jitter = 0.0
+        self.busy_total = 0.0
+        self.busy_max = 0.0
+
+class SamplingScheduler:
+    """
+    Runs every periodic sampling job (GPU/CPU counters, LibreHM sensors, frametimes,
+    the plot) on one thread, instead of one sleeping thread each.
+
+    Each source has its own interval. Its deadlines come from the monotonic clock and
+    advance by exactly one interval per run, like TickScheduler. All upcoming deadlines
+    sit in a heap and the thread sleeps until the earliest one. A source that falls more
+    than one interval behind skips the missed runs instead of running them back to back.
+
+    Stats are kept per source: how late each run started (jitter), skipped runs, errors
+    and how long the callback took. A slow callback shows up as jitter in the sources
+    due behind it.
+
+    stop() parks the thread: it waits on a condition with no timeout, so nothing wakes
+    up until start() is called again.
+    """
+
+    def __init__(self, logger_instance=None, history=600):
+        self.logger = logger_instance
+        self.history = history
+        self._sources = {}
+        self._heap = []  # (deadline, seq, name, generation)
+        self._seq = 0
+        self._active = False
+        self._closing = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def add(self, name, callback, interval):
+        """Registers (or replaces) a source calling callback() every interval seconds while active."""
+        with self._cond:
+            source = _Source(name, callback, max(0.001, interval), self.history)
+            old = self._sources.get(name)
+            if old is not None:
+                source.generation = old.generation + 1
+            self._sources[name] = source
+            if self._active:
+                self._push(source, time.monotonic())
+            self._cond.notify()
+
+    def remove(self, name):
+        with self._cond:
+            self._sources.pop(name, None)
+
+    def set_interval(self, name, interval):
+        """Changes a source's interval; the next run is one new interval from now."""
+        with self._cond:
+            source = self._sources.get(name)
+            if source is None:
+                return
+            source.interval = max(0.001, interval)
+            source.generation += 1
+            if self._active:
+                self._push(source, time.monotonic() + source.interval)
+            self._cond.notify()
+
+    def _push(self, source, deadline):
+        self._seq += 1
+        heapq.heappush(self._heap, (deadline, self._seq, source.name, source.generation))
+
+    def start(self):
+        """Starts (or resumes) sampling; every source runs right away, then at its interval."""
+        with self._cond:
+            if self._active:
+                return
+            self._active = True
+            self._heap.clear()
+            now = time.monotonic()
+            for source in self._sources.values():
+                source.generation += 1
+                source.reset_stats()
+                self._push(source, now)
+            if self._thread is None or not self._thread.is_alive():
+                self._closing = False
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def stop(self):
+        """Parks the thread until the next start()."""
+        with self._cond:
+            self._active = False
+            self._heap.clear()
+            self._cond.notify()
+
+    def shutdown(self, timeout=2):
+        with self._cond:
+            self._active = False
+            self._closing = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+
+    @property
+    def active(self):
+        return self._active
+
+    def _next_due(self):
+        """Blocks until a source is due; returns (source, deadline, generation), or None when shutting down."""
+        with self._cond:
+            while True:
+                if self._closing:
+                    return None
+                if not self._active or not self._heap:
+                    self._cond.wait()  # Parked: no timeout, no wake-ups
+                    continue
+                deadline, _, name, generation = self._heap[0]
+                source = self._sources.get(name)
+                if source is None or source.generation != generation:
+                    heapq.heappop(self._heap)  # Removed or rescheduled
+                    continue
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+                return source, deadline, generation
+
+    def _run(self):
+        while True:
+            due = self._next_due()
+            if due is None:
+                return
+            source, deadline, generation = due
+            start = time.monotonic()
+            lateness = max(0.0, start - deadline)
+            try:
+                source.callback()
+            except Exception as e:
+                source.errors += 1
+                if self.logger:
+                    self.logger.add_log(f"{source.name} sampling error: {e}")
+            busy = time.monotonic() - start
+
+            source.runs += 1
+            source.jitter.append(lateness)
+            source.max_jitter = max(source.max_jitter, lateness)
+            source.busy_total += busy
+            source.busy_max = max(source.busy_max, busy)
+
+            with self._cond:
+                if not self._active or source.generation != generation or self._sources.get(source.name) is not source:
+                    continue  # Stopped, rescheduled or removed while running
+                next_deadline = deadline + source.interval
+                now = time.monotonic()
+                if next_deadline <= now:
+                    missed = int((now - next_deadline) // source.interval) + 1
+                    source.skipped += missed
+                    next_deadline += missed * source.interval
+                self._push(source, next_deadline)
+
+    def get_stats(self):
+        """name -> interval, runs, skipped, errors, jitter avg/p99/max and callback time (ms)."""
+        stats = {}
+        with self._cond:
+            sources = list(self._sources.values())
+        for source in sources:
+            jitter = sorted(source.jitter)
+            count = len(jitter)
+            stats[source.name] = {
+                "interval_ms": source.interval * 1000,
+                "runs": source.runs,
+                "skipped": source.skipped,
+                "errors": source.errors,
+                "jitter_avg_ms": (sum(jitter) / count * 1000) if count else 0.0,
+                "jitter_p99_ms": jitter[min(count - 1, int(count * 0.99))] * 1000 if count else 0.0,
+                "jitter_max_ms": source.max_jitter * 1000,
+                "busy_avg_ms": (source.busy_total / source.runs * 1000) if source.runs else 0.0,
+                "busy_max_ms": source.busy_max * 1000,
+            }
+        return stats
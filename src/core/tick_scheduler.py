@@ -0,0 +1,80 @@
+# tick_scheduler.py
+
+import time
+from collections import deque
+
+class TickScheduler:
+    """
+    Fixed-rate scheduler for the control loop, driven by monotonic deadlines.
+
+    Deadlines advance by exactly one interval per tick, so time spent working
+    between ticks doesn't accumulate as drift the way sleep(interval) after the
+    work does. When a tick overruns past the next deadline(s), the missed ticks are
+    skipped rather than run back to back. Lateness of every wake-up (jitter) and
+    overruns are kept for diagnostics.
+    """
+
+    MIN_INTERVAL = 0.1
+    MAX_INTERVAL = 1.0
+
+    def __init__(self, interval=1.0, history=600):
+        self.interval = min(max(interval, self.MIN_INTERVAL), self.MAX_INTERVAL)
+        self._jitter = deque(maxlen=history)  # seconds late per wake-up
+        self.reset()
+
+    def reset(self):
+        self._next_deadline = None
+        self._jitter.clear()
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped_ticks = 0
+        self.max_jitter = 0.0
+
+    def wait(self, wake=None):
+        """
+        Sleeps until the next tick deadline and returns how late the wake-up was (seconds).
+        If wake (a threading.Event) is set before the deadline, returns None right away
+        without using up the tick, so the next wait() still ends at the same deadline.
+        """
+        now = time.monotonic()
+        if self._next_deadline is None:
+            # First tick runs immediately and anchors the schedule
+            self._next_deadline = now + self.interval
+            self.ticks += 1
+            return 0.0
+
+        if now > self._next_deadline:
+            # The work took longer than the time left until the deadline
+            self.overruns += 1
+            missed = int((now - self._next_deadline) // self.interval)
+            self.skipped_ticks += missed
+            self._next_deadline += missed * self.interval
+        elif wake is not None:
+            if wake.wait(self._next_deadline - now):
+                return None
+        else:
+            time.sleep(self._next_deadline - now)
+
+        lateness = max(0.0, time.monotonic() - self._next_deadline)
+        self._jitter.append(lateness)
+        self.max_jitter = max(self.max_jitter, lateness)
+        self._next_deadline += self.interval
+        self.ticks += 1
+        return lateness
+
+    def ticks_for(self, milliseconds):
+        """Number of ticks covering a duration in milliseconds (at least 1)."""
+        return max(1, round(milliseconds / (self.interval * 1000)))
+
+    def get_stats(self):
+        jitter = sorted(self._jitter)
+        count = len(jitter)
+        return {
+            "interval_ms": self.interval * 1000,
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "skipped_ticks": self.skipped_ticks,
+            "jitter_avg_ms": (sum(jitter) / count * 1000) if count else 0.0,
+            "jitter_p99_ms": jitter[min(count - 1, int(count * 0.99))] * 1000 if count else 0.0,
+            "jitter_max_ms": self.max_jitter * 1000,
+        }
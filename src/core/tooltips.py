@@ -7,17 +7,18 @@ def get_tooltips():
     "capratio": "Percentage decrease used to generate FPS limits. Each limit is (100 - value)% of the previous one. Hold CTRL for steps of 10.",
     "capstep": "Increment size for adjusting the FPS cap. Smaller step sizes provide finer control. Hold CTRL for steps of 10.",
     "gpucutofffordecrease": "Sets the upper threshold for GPU usage. If GPU usage exceeds this value, the FPS cap will be lowered to maintain system performance.",
-    "delaybeforedecrease": "Specifies how many times in a row GPU or CPU usage must exceed the upper threshold before the FPS cap begins to drop. Practically, this sets the delay (in seconds) before the limit is lowered.",
+    "delaybeforedecrease": "Specifies how long (in milliseconds) GPU or CPU usage must stay above the upper threshold before the FPS cap begins to drop. Rounded to whole control ticks (controltickinterval in settings.ini, 1000 ms by default).",
     "gpucutoffforincrease": "Defines the lower threshold for GPU usage. If GPU usage falls below this value, the FPS cap may increase to improve performance.",
-    "delaybeforeincrease": "Specifies how many times in a row GPU and CPU usage must fall below the lower threshold before the FPS cap begins to rise. Practically, this sets the delay (in seconds) before the limit is raised.",
+    "delaybeforeincrease": "Specifies how long (in milliseconds) GPU and CPU usage must stay below the lower threshold before the FPS cap begins to rise. Also the cooldown between consecutive raises. Rounded to whole control ticks.",
     "cpucutofffordecrease": "Sets the upper threshold for CPU usage. If CPU usage exceeds this value, the FPS cap will be lowered to maintain system performance.",
+    "gpucriticalload": "Critical GPU usage (0 = off). Checked on every GPU sample rather than once per second: when it is reached, the FPS cap drops right away by several steps (criticaldroprungs in settings.ini, 2 by default), without waiting for the FPS drop delay. Raises still follow the usual delay.",
     "cpucutoffforincrease": "Defines the lower threshold for CPU usage. If CPU usage falls below this value, the FPS cap may increase to improve performance.",
     "minvalidgpu": "Sets the minimum valid GPU usage percentage required for adjusting the FPS. If the GPU usage is below this threshold, the FPS cap will not change. This helps prevent FPS fluctuations during loading screens.",
     "minvalidfps": "Defines the minimum valid FPS required for adjusting the FPS. If the FPS falls below this value, the FPS cap will not change. This helps prevent FPS fluctuations during loading screens.",
     "quick_save": "Save settings to memory temporarily. Useful to copy settings between profiles.",
     "quick_load": "Loads input values from memory. Useful to copy settings between profiles.",
     "start_stop_button": "Starts maintaining the FPS cap dynamically based on GPU/CPU utilization.",
-    "luid_button": "Detects the render GPU based on CURRENT highest 3D engine utilization, and sets it as the target GPU for FPS limiting. Click again to deselect.",
+    "gpu_usage_scope_combo": "Which GPU usage is compared with the thresholds. all: the busiest GPU, every app on it. render: the GPU the game renders on (detected from its process), every app on it. game: only the game's own usage on that GPU, so overlays, browsers and capture apps don't count.",
     "exit_fps_input": "The specific FPS limit to apply globally when the application exits, if 'Set Global FPS Limit on Exit' is checked.",
     "SaveToProfile": "Saves the current settings to the selected profile. Settings are NOT saved automatically.",
     "Reset_Default": "Resets all settings to the program's default values. To reset to the profile's default values, reselect the profile from the profile dropdown.",
@@ -28,6 +29,19 @@ def get_tooltips():
     "process_to_profile": "Add the current settings to a new profile based on the last used process.",
     "button_cpulimit": "(Optional) Set values below 100 to enable CPU-based FPS limiting.",
     "rest_fps_cap_button": "Clears the custom limit input field and resets to Min/Max values",
+    "pid_signal": "Load signal the PID method keeps at the setpoint. 'LibreHM' uses the highest of the sensors enabled in the LibreHM method, as a percentage of each sensor's upper limit.",
+    "pid_setpoint": "Target load (%) for the PID method. The FPS cap moves up and down the list of FPS limits to hold the signal near this value.",
+    "pid_kp": "Proportional gain: FPS limit steps per % of error. Higher values react faster to load changes but can overshoot.",
+    "pid_ki": "Integral gain: FPS limit steps per % of error per second. Removes lasting offset from the setpoint; too high causes slow oscillation.",
+    "pid_kd": "Derivative gain: damps fast load swings. Usually left at 0, as GPU usage readings are noisy.",
+    "pid_deadband": "Errors within this many % of the setpoint are ignored, so the FPS cap doesn't flip between neighbouring limits.",
+    "priority": "Only used when capping all apps with a profile. When the apps compete for the GPU, the lowest priority app has its FPS cap lowered first and the highest priority app gets it raised first.",
+    "predictive_mode_checkbox": "Learns how GPU usage scales with FPS for each game. When the FPS cap can rise and the fit is reliable, jumps straight to the highest cap expected to keep GPU usage below the upper threshold, instead of raising it one step at a time.",
+    "record_trace_checkbox": "Saves every monitoring tick (FPS, GPU/CPU usage, sensor readings, cap) to config/traces. Traces can be replayed offline with different settings using benchmarks/replay_trace.py.",
+    "multi_process_mode_checkbox": "Caps every running app that RTSS has hooked and that has its own profile at the same time, each with its own FPS limits and delays. GPU/CPU and sensor readings are shared, so only one app's cap moves per direction each tick.",
+    "arbitration_policy_combo": "How competing apps share the GPU. priority: the lowest 'Priority' profile gives up FPS first. fair: the app whose cap is highest within its own range gives up FPS first, keeping all apps at a similar share.",
+    "summary_low_1": "From frametimes sampled 20-50 times a second, not from every frame. Above that framerate most frames are never seen, so these lows and spike counts are estimates: short stutters between samples can be missed.",
+    "summary_spikes": "Sampled frametimes longer than twice the median. Frames are sampled 20-50 times a second, not all counted, so this is an estimate of stutter rather than an exact frame count.",
     "autopilot_checkbox": "Relinquishes control of Start/Stop button to the autopilot, which will automatically shift to the corresponding profile based on the active process. If no profiles are detected, it uses the Global profile. Note: Can be modified to only run when a specific profile is detected in settings.",
 }
 
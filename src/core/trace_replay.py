@@ -0,0 +1,245 @@
+# trace_replay.py
+
+import configparser
+import gzip
+import json
+import os
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+from core.cap_controller import CapController, CapControllerSettings, ControlSample
+from core.cap_ladder import CapLadder
+
+TRACE_FORMAT = "dfl-trace"
+TRACE_VERSION = 1
+
+def _open_text(path, mode):
+    if str(path).endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+class TraceRecorder:
+    """
+    Writes one JSON line per control tick: the ControlSample fed to CapController plus
+    the cap in effect. An optional first line holds a header (format, tick interval,
+    profile and the settings the session ran with). Paths ending in .gz are gzipped.
+    The file is flushed every flush_every samples, so little is lost if the app is killed.
+    """
+
+    def __init__(self, path, header=None, flush_every=60):
+        self.path = path
+        self.flush_every = flush_every
+        self.samples = 0
+        self._file = _open_text(path, "w")
+        if header is not None:
+            self._file.write(json.dumps({"format": TRACE_FORMAT, "version": TRACE_VERSION, **header}) + "\n")
+
+    @classmethod
+    def open_session(cls, directory, header=None):
+        """Opens a new trace named after the current time in directory (created if needed)."""
+        os.makedirs(directory, exist_ok=True)
+        name = time.strftime("trace_%Y%m%d_%H%M%S.jsonl")
+        return cls(os.path.join(directory, name), header)
+
+    def write(self, t, sample, cap=None):
+        record = {
+            "t": round(t, 3),
+            "fps": sample.fps,
+            "gpu": sample.gpu,
+            "cpu": sample.cpu,
+            "idle": sample.idle_seconds,
+            "process": sample.process_name,
+        }
+        if sample.sensor_readings:
+            record["sensors"] = [list(reading) for reading in sample.sensor_readings]
+        if sample.frametime_spikes is not None:
+            record["spikes"] = sample.frametime_spikes
+        if cap is not None:
+            record["cap"] = float(cap)
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.samples += 1
+        if self.flush_every and self.samples % self.flush_every == 0:
+            self._file.flush()
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+def read_trace_header(path):
+    """The trace's header dict, or {} if it has none."""
+    with _open_text(path, "r") as f:
+        first = f.readline()
+    try:
+        record = json.loads(first) if first.strip() else {}
+    except ValueError:
+        return {}
+    return record if record.get("format") == TRACE_FORMAT else {}
+
+def read_trace(path):
+    """
+    Yields (t, ControlSample, recorded_cap) for each tick, reading the file line by
+    line so traces of any length can be replayed without loading them whole.
+    """
+    with _open_text(path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get("format") == TRACE_FORMAT:
+                continue
+            sample = ControlSample(
+                fps=record.get("fps"),
+                gpu=record.get("gpu"),
+                cpu=record.get("cpu"),
+                idle_seconds=record.get("idle", 0.0),
+                process_name=record.get("process"),
+                sensor_readings=tuple(tuple(reading) for reading in record.get("sensors", ())),
+                frametime_spikes=record.get("spikes"),
+            )
+            yield record.get("t"), sample, record.get("cap")
+
+@dataclass
+class ReplayResult:
+    timeline: List[Tuple[float, float]] = field(default_factory=list)  # (t, cap) at the start and at every change
+    transitions: int = 0
+    ticks: int = 0
+    duration: float = 0.0  # Seconds of replayed control ticks
+    seconds_over_threshold: float = 0.0
+    average_cap: float = 0.0  # Time weighted
+    reasons: Counter = field(default_factory=Counter)
+    elapsed: float = 0.0  # Wall time the replay took
+
+    @property
+    def fraction_over_threshold(self):
+        return self.seconds_over_threshold / self.duration if self.duration else 0.0
+
+    @property
+    def transitions_per_minute(self):
+        return self.transitions / (self.duration / 60) if self.duration else 0.0
+
+    def format_report(self):
+        reasons = ", ".join(f"{reason}: {count}" for reason, count in sorted(self.reasons.items()))
+        rate = self.ticks / self.elapsed if self.elapsed else 0.0
+        return "\n".join([
+            f"Ticks: {self.ticks} ({self.duration:.0f} s replayed in {self.elapsed:.2f} s, {rate:,.0f} ticks/s)",
+            f"Cap transitions: {self.transitions} ({self.transitions_per_minute:.2f}/min)",
+            f"Time over load threshold: {self.seconds_over_threshold:.0f} s ({self.fraction_over_threshold:.1%})",
+            f"Average cap: {self.average_cap:.2f}",
+            f"Decisions: {reasons}",
+        ])
+
+def is_over_threshold(sample, settings, load_threshold=None):
+    """
+    Whether a tick counts as overloaded: GPU at or above load_threshold (default
+    gpucutofffordecrease) or, with LibreHM readings, any sensor at or above its upper bound.
+    """
+    threshold = settings.gpucutofffordecrease if load_threshold is None else load_threshold
+    if sample.gpu is not None and sample.gpu >= threshold:
+        return True
+    return any(value is not None and upper is not None and value >= upper
+               for value, lower, upper in sample.sensor_readings)
+
+def rescale_sample(sample, recorded_cap, cap_fps, saturation=0.97):
+    """
+    Estimates a recorded tick under a different cap, assuming a fixed GPU/CPU cost per
+    frame (the same model as HeadroomModel): FPS moves to what the new cap allows and
+    GPU and CPU usage scale with it. If the recorded FPS was held by the recorded cap,
+    the game is assumed able to reach the FPS at which GPU usage would hit 100%;
+    otherwise it could not have run faster. LibreHM readings are left as recorded.
+    """
+    fps, gpu = sample.fps, sample.gpu
+    if not fps:
+        return sample
+    was_capped = recorded_cap is not None and fps >= recorded_cap * saturation
+    reachable = fps * 100 / gpu if (was_capped and gpu and gpu > 0) else fps
+    new_fps = min(cap_fps, max(reachable, fps))
+    if new_fps == fps:
+        return sample
+    scale = new_fps / fps
+    return ControlSample(
+        new_fps,
+        min(100.0, gpu * scale) if gpu is not None else None,
+        sample.cpu * scale if sample.cpu is not None else None,
+        sample.idle_seconds, sample.process_name, sample.sensor_readings, sample.frametime_spikes)
+
+def replay(samples, ladder, settings: Optional[CapControllerSettings] = None, load_threshold=None,
+           headroom=None, keep_timeline=True, load_model=True):
+    """
+    Runs (t, ControlSample[, recorded_cap]) tuples through a fresh CapController, the
+    same decision engine the monitoring loop uses, one control tick per sample, and
+    returns a ReplayResult. samples can be any iterable (read_trace streams from disk),
+    only the cap change points are kept.
+
+    With load_model each tick is first adjusted to the replayed cap by rescale_sample(),
+    so different settings see different loads; without it the recorded loads are
+    replayed as they are and FPS is only clamped to the cap.
+    """
+    settings = settings or CapControllerSettings()
+    controller = CapController(ladder, settings, headroom=headroom)
+    dt = settings.tick_interval_ms / 1000
+    result = ReplayResult()
+    cap = controller.current_cap  # Applied cap in ladder units (differs from current_cap while idle)
+    cap_units_total = 0
+    start = time.perf_counter()
+
+    if keep_timeline:
+        result.timeline.append((0.0, ladder.to_fps(cap)))
+
+    for entry in samples:
+        t, sample = entry[0], entry[1]
+        recorded_cap = entry[2] if len(entry) > 2 else None
+        cap_fps = ladder.to_fps(cap)
+        if load_model:
+            sample = rescale_sample(sample, recorded_cap, cap_fps)
+        elif sample.fps is not None and sample.fps > cap_fps:
+            sample = ControlSample(cap_fps, sample.gpu, sample.cpu, sample.idle_seconds, sample.process_name,
+                                   sample.sensor_readings, sample.frametime_spikes)
+
+        if is_over_threshold(sample, settings, load_threshold):
+            result.seconds_over_threshold += dt
+        cap_units_total += cap
+        result.ticks += 1
+
+        decision = controller.step(sample)
+        result.reasons[decision.reason] += 1
+        if decision.changed:
+            cap = ladder.to_units(decision.cap)
+            result.transitions += 1
+            if keep_timeline:
+                result.timeline.append((t if t is not None else result.ticks * dt, float(decision.cap)))
+
+    result.duration = result.ticks * dt
+    result.average_cap = ladder.to_fps(cap_units_total / result.ticks) if result.ticks else 0.0
+    result.elapsed = time.perf_counter() - start
+    return result
+
+def load_replay_values(header=None, settings_path=None, profiles_path=None, profile="Global", overrides=None):
+    """
+    Merges the settings a replay runs with, later sources winning: the trace header's
+    settings, settings.ini (GlobalSettings and Preferences), the profile's section in
+    profiles.ini (falling back to Global) and explicit overrides. Returns a flat dict.
+    """
+    values = dict((header or {}).get("settings", {}))
+    if settings_path:
+        config = configparser.ConfigParser()
+        config.read(settings_path)
+        for section in ("GlobalSettings", "Preferences"):
+            if config.has_section(section):
+                values.update(config[section])
+    if profiles_path:
+        config = configparser.ConfigParser()
+        config.read(profiles_path)
+        name = profile if config.has_section(profile) else "Global"
+        if config.has_section(name):
+            values.update(config[name])
+    values.update(overrides or {})
+    return values
+
+def build_replay_setup(values):
+    """(CapLadder, CapControllerSettings) for a dict from load_replay_values()."""
+    return CapLadder.from_profile(values), CapControllerSettings.from_mapping(values)
@@ -0,0 +1,168 @@
+# transition_latency.py
+
+import bisect
+import threading
+import time
+
+# Histogram bucket upper edges in milliseconds (the last bucket is open-ended)
+DEFAULT_BUCKETS_MS = (50, 100, 250, 500, 1000, 2000, 3000, 5000, 10000)
+
+class LatencyHistogram:
+    def __init__(self, edges_ms=DEFAULT_BUCKETS_MS):
+        self.edges_ms = tuple(edges_ms)
+        self.counts = [0] * (len(self.edges_ms) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, value_ms):
+        self.counts[bisect.bisect_left(self.edges_ms, value_ms)] += 1
+        self.total += 1
+        self.sum_ms += value_ms
+        self.max_ms = max(self.max_ms, value_ms)
+
+    @property
+    def mean_ms(self):
+        return self.sum_ms / self.total if self.total else 0.0
+
+    def percentile(self, q):
+        """Upper bucket edge containing the q-th percentile (None without samples, inf for the open bucket)."""
+        if not self.total:
+            return None
+        rank = q / 100 * self.total
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return self.edges_ms[i] if i < len(self.edges_ms) else float("inf")
+        return float("inf")
+
+    def labels(self):
+        lower = (0,) + self.edges_ms
+        labels = [f"{lo}-{hi}" for lo, hi in zip(lower, self.edges_ms)]
+        labels.append(f">{self.edges_ms[-1]}")
+        return labels
+
+class _Transition:
+    __slots__ = ("cap", "decided_at", "applied_at")
+
+    def __init__(self, cap, decided_at):
+        self.cap = cap
+        self.decided_at = decided_at
+        self.applied_at = None
+
+class TransitionLatencyTracker:
+    """
+    Timestamps framerate cap transitions at three points and keeps per-profile histograms.
+
+    decided(): monitoring_loop chose a new cap.
+    applied(): the RTSS write returned (hook this to LimiterCommandQueue.on_applied).
+    observe_fps(): called with each FPS reading; the transition settles the first time
+    the measured FPS is within tolerance of the new cap.
+
+    A transition that is superseded by a newer one, or doesn't settle within
+    settle_timeout (e.g. the cap was raised but the game can't reach it), is counted
+    but not added to the settle histogram. So is one the write queue skipped because
+    the cap was already in effect (skipped(), hooked to LimiterCommandQueue.on_skipped);
+    it is dropped right away instead of timing out. FPS comes from RTSS's ~1 s measurement
+    window, so settle times have about 1 s resolution.
+    """
+
+    STAGES = ("decide_to_applied", "applied_to_settled", "decide_to_settled")
+
+    def __init__(self, tolerance=0.03, min_tolerance=1.0, settle_timeout=10.0):
+        self.tolerance = tolerance  # Fraction of the cap
+        self.min_tolerance = min_tolerance  # FPS
+        self.settle_timeout = settle_timeout
+        self._pending = {}  # profile_name -> _Transition
+        self._profiles = {}  # profile_name -> {stage: LatencyHistogram, counters}
+        self._lock = threading.Lock()
+
+    def _profile(self, profile_name):
+        stats = self._profiles.get(profile_name)
+        if stats is None:
+            stats = {stage: LatencyHistogram() for stage in self.STAGES}
+            stats.update(transitions=0, superseded=0, skipped=0, timed_out=0)
+            self._profiles[profile_name] = stats
+        return stats
+
+    def decided(self, profile_name, cap, decided_at=None):
+        decided_at = time.perf_counter() if decided_at is None else decided_at
+        with self._lock:
+            pending = self._pending.get(profile_name)
+            if pending is not None and pending.cap == float(cap):
+                return  # Same cap again (e.g. in another denominator): still the same transition
+            stats = self._profile(profile_name)
+            stats["transitions"] += 1
+            if pending is not None:
+                stats["superseded"] += 1
+            self._pending[profile_name] = _Transition(float(cap), decided_at)
+
+    def applied(self, profile_name, cap, applied_at=None):
+        applied_at = time.perf_counter() if applied_at is None else applied_at
+        with self._lock:
+            transition = self._pending.get(profile_name)
+            if transition is None or transition.applied_at is not None or transition.cap != float(cap):
+                return
+            transition.applied_at = applied_at
+            self._profile(profile_name)["decide_to_applied"].add((applied_at - transition.decided_at) * 1000)
+
+    def skipped(self, profile_name, cap):
+        """The queue didn't write cap since it was already applied: nothing to wait for."""
+        with self._lock:
+            transition = self._pending.get(profile_name)
+            if transition is None or transition.applied_at is not None or transition.cap != float(cap):
+                return
+            self._profile(profile_name)["skipped"] += 1
+            del self._pending[profile_name]
+
+    def observe_fps(self, profile_name, fps, now=None):
+        now = time.perf_counter() if now is None else now
+        with self._lock:
+            transition = self._pending.get(profile_name)
+            if transition is None:
+                return
+            stats = self._profile(profile_name)
+            if now - transition.decided_at > self.settle_timeout:
+                stats["timed_out"] += 1
+                del self._pending[profile_name]
+                return
+            if transition.applied_at is None or fps is None:
+                return
+            if abs(float(fps) - transition.cap) <= max(self.min_tolerance, transition.cap * self.tolerance):
+                stats["applied_to_settled"].add((now - transition.applied_at) * 1000)
+                stats["decide_to_settled"].add((now - transition.decided_at) * 1000)
+                del self._pending[profile_name]
+
+    def reset(self):
+        with self._lock:
+            self._pending.clear()
+            self._profiles.clear()
+
+    def get_stats(self):
+        """Returns {profile_name: {stage: LatencyHistogram, 'transitions', 'superseded', 'skipped', 'timed_out'}} (a shallow copy)."""
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._profiles.items()}
+
+    def format_report(self):
+        """Plain-text summary of the histograms, one block per profile."""
+        profiles = self.get_stats()
+        if not profiles:
+            return "No framerate cap transitions recorded yet."
+
+        lines = []
+        for name, stats in profiles.items():
+            lines.append(f"[{name}] transitions: {stats['transitions']}, superseded: {stats['superseded']}, "
+                         f"unchanged (not written): {stats['skipped']}, not settled: {stats['timed_out']}")
+            for stage in self.STAGES:
+                hist = stats[stage]
+                if not hist.total:
+                    lines.append(f"  {stage:<19}: --")
+                    continue
+                p50, p95 = hist.percentile(50), hist.percentile(95)
+                lines.append(f"  {stage:<19}: n={hist.total}, mean {hist.mean_ms:.0f} ms, "
+                             f"p50<={p50:g} ms, p95<={p95:g} ms, max {hist.max_ms:.0f} ms")
+                buckets = ", ".join(f"{label}: {count}" for label, count in zip(hist.labels(), hist.counts) if count)
+                lines.append(f"    {buckets}")
+            lines.append("")
+        return "\n".join(lines)
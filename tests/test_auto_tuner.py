@@ -0,0 +1,35 @@
+# Writing tuned values into profiles.ini.
+
+import configparser
+import os
+
+import pytest
+
+from core.auto_tuner import write_profile_section
+
+PROFILES = "[Global]\nmaxcap = 120\n\n[other.exe]\ncapstep = 10\n\n"
+
+@pytest.fixture
+def profiles_path(tmp_path):
+    path = tmp_path / "profiles.ini"
+    path.write_text(PROFILES)
+    return str(path)
+
+def test_new_section_starts_from_global(profiles_path):
+    write_profile_section(profiles_path, "game.exe", {"capstep": 5})
+    config = configparser.ConfigParser()
+    config.read(profiles_path)
+    assert dict(config["game.exe"]) == {"maxcap": "120", "capstep": "5"}
+    assert dict(config["other.exe"]) == {"capstep": "10"}
+    assert os.listdir(os.path.dirname(profiles_path)) == ["profiles.ini"]
+
+def test_failed_write_leaves_the_file_intact(profiles_path, monkeypatch):
+    def fail(self, f, *args, **kwargs):
+        f.write("[Global]\n")
+        raise OSError("disk full")
+    monkeypatch.setattr(configparser.ConfigParser, "write", fail)
+    with pytest.raises(OSError):
+        write_profile_section(profiles_path, "game.exe", {"capstep": 5})
+    with open(profiles_path) as f:
+        assert f.read() == PROFILES
+    assert os.listdir(os.path.dirname(profiles_path)) == ["profiles.ini"]
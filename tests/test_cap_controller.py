@@ -0,0 +1,40 @@
+# CapController decisions for synthetic load bursts.
+
+from core.cap_controller import CapController, CapControllerSettings, ControlSample
+
+LADDER = list(range(30, 140, 5))
+
+def run_burst(settings, seconds=10, burst=(1.0, 4.0), load_fps=100):
+    """Feeds a GPU load burst at the settings' tick rate; returns the (time, reason, cap) moves."""
+    controller = CapController(LADDER, settings)
+    tick = settings.tick_interval_ms / 1000
+    cap = max(LADDER)
+    moves = []
+    for i in range(round(seconds / tick)):
+        t = i * tick
+        busy = burst[0] <= t < burst[1]
+        fps = min(cap, load_fps if busy else 140)
+        decision = controller.step(ControlSample(fps=fps, gpu=95 if busy else 60, cpu=20))
+        if decision.changed:
+            cap = float(decision.cap)
+            moves.append((round(t, 1), decision.reason, cap))
+    return moves
+
+def test_cap_at_fps_mean_is_not_lowered():
+    controller = CapController(LADDER, CapControllerSettings())
+    for _ in range(3):
+        controller.step(ControlSample(fps=100, gpu=60, cpu=20))
+    controller.offset = 100 - controller.max_cap  # Cap already at the FPS the app reaches
+    assert controller._next_lower() is None
+
+def test_burst_decreases_stop_at_the_fps_reached():
+    moves = run_burst(CapControllerSettings(tick_interval_ms=100))
+    assert moves and all(reason == "decrease" for _, reason, _ in moves)
+    assert min(cap for _, _, cap in moves) >= 95  # One rung below the 100 FPS reached
+
+def test_decrease_rate_does_not_depend_on_the_tick():
+    slow = run_burst(CapControllerSettings(tick_interval_ms=1000))
+    fast = run_burst(CapControllerSettings(tick_interval_ms=100))
+    assert fast[-1][2] == slow[-1][2]
+    times = [t for t, _, _ in fast]
+    assert all(b - a >= 1.0 for a, b in zip(times, times[1:]))
@@ -0,0 +1,59 @@
+# FrametimeSampler against a fake RTSS app entry.
+
+from core.frametime_sampler import FrametimeSampler
+
+PID = 4242
+
+class NullLogger:
+    def add_log(self, message):
+        pass
+
+class FakeSharedMemory:
+    """Returns a settable (dwProcessID, szName, dwFlags, dwTime0, dwTime1, dwFrames, dwFrameTime) entry."""
+
+    def __init__(self):
+        self.entry = None
+        self.reads = 0
+
+    def read_app_entry(self, process_id):
+        self.reads += 1
+        return self.entry
+
+    def set_frame(self, frames, time1, frametime_us):
+        self.entry = (PID, b"game.exe", 0, 0, time1, frames, frametime_us)
+
+def sampler(shared_memory, is_rtss_running=None):
+    s = FrametimeSampler(NullLogger(), shared_memory, interval=0.025, is_rtss_running=is_rtss_running)
+    s.set_target(PID)
+    return s
+
+def test_same_frame_is_recorded_once():
+    memory = FakeSharedMemory()
+    s = sampler(memory)
+    # A 100 ms hitch at 40 Hz polling: four polls see the same frame
+    memory.set_frame(frames=10, time1=1000, frametime_us=100000)
+    for _ in range(4):
+        s.poll()
+    memory.set_frame(frames=11, time1=1033, frametime_us=33000)
+    s.poll()
+    stats = s.get_stats()
+    assert stats["samples"] == 2
+
+def test_one_hitch_is_one_spike():
+    memory = FakeSharedMemory()
+    s = sampler(memory)
+    frames = 0
+    for poll in range(40):
+        if poll % 2 == 0:  # ~20 FPS game, 40 Hz polling
+            frames += 1
+        memory.set_frame(frames, frames * 50, 150000 if frames == 10 else 50000)
+        s.poll()
+    assert s.get_stats()["spikes"] == 1
+
+def test_no_reads_while_rtss_is_not_running():
+    memory = FakeSharedMemory()
+    memory.set_frame(frames=1, time1=10, frametime_us=16000)
+    s = sampler(memory, is_rtss_running=lambda: False)
+    s.poll()
+    assert memory.reads == 0
+    assert s.get_stats() is None
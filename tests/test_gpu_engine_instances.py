@@ -0,0 +1,60 @@
+# GPU engine counter instance parsing and per-process / per-adapter aggregation,
+# checked against a recorded instance list.
+
+import pytest
+
+from core.gpu_engine_instances import (parse_engine_instance, parse_recording, usage_by_process, usage_by_luid,
+                                       select_usage)
+
+# Game (11804) rendering on the discrete GPU (0x0000D1B7), with a browser and an overlay on
+# the same GPU, a capture app encoding on it, and the desktop compositor on the iGPU (0x0000A3F2)
+RECORDING = """
+41.20 pid_11804_luid_0x00000000_0x0000D1B7_phys_0_eng_0_engtype_3D
+2.10 pid_11804_luid_0x00000000_0x0000D1B7_phys_0_eng_1_engtype_Copy
+0.00 pid_11804_luid_0x00000000_0x0000A3F2_phys_0_eng_0_engtype_3D
+9.80 pid_7420_luid_0x00000000_0x0000D1B7_phys_0_eng_0_engtype_3D
+3.50 pid_9132_luid_0x00000000_0x0000D1B7_phys_0_eng_0_engtype_3D
+6.00 pid_5520_luid_0x00000000_0x0000D1B7_phys_0_eng_3_engtype_VideoEncode
+1.30 pid_5520_luid_0x00000000_0x0000D1B7_phys_0_eng_0_engtype_3D
+22.40 pid_1288_luid_0x00000000_0x0000A3F2_phys_0_eng_0_engtype_3D
+0.00 pid_1288_luid_0x00000000_0x0000D1B7_phys_0_eng_0_engtype_3D
+0.00 pid_4_luid_0x00000000_0x0000D1B7_phys_0_eng_0_engtype_High Priority 3D
+"""
+
+@pytest.fixture
+def per_process():
+    return usage_by_process(parse_recording(RECORDING))
+
+def usage(per_process, scope, pid, previous=None):
+    value, luid, found = select_usage(per_process, scope, pid, previous)
+    return round(value, 2), luid, found
+
+def test_parse_engine_instance():
+    inst = parse_engine_instance("pid_4_luid_0x00000000_0x0000D1B7_phys_0_eng_0_engtype_High Priority 3D")
+    assert inst.pid == 4 and inst.luid == "0x0000D1B7" and inst.engtype == "High Priority 3D"
+    assert parse_engine_instance("not an engine instance") is None
+
+def test_usage_by_process(per_process):
+    assert set(per_process) == {(11804, "0x0000D1B7"), (11804, "0x0000A3F2"), (7420, "0x0000D1B7"),
+                                (9132, "0x0000D1B7"), (5520, "0x0000D1B7"), (1288, "0x0000A3F2"),
+                                (1288, "0x0000D1B7")}
+
+def test_usage_by_luid(per_process):
+    totals = usage_by_luid(per_process)
+    assert totals["0x0000D1B7"] == pytest.approx(55.8)
+    assert totals["0x0000A3F2"] == pytest.approx(22.4)
+
+def test_scopes(per_process):
+    assert usage(per_process, "all", 11804) == (55.8, "0x0000D1B7", False)
+    assert usage(per_process, "render", 11804) == (55.8, "0x0000D1B7", True)
+    assert usage(per_process, "game", 11804) == (41.2, "0x0000D1B7", True)
+    assert usage(per_process, "game", 1288) == (22.4, "0x0000A3F2", True)  # The compositor renders on the iGPU
+    assert usage(per_process, "game", 999) == (55.8, "0x0000D1B7", False)  # Unknown PID: falls back to all
+
+def test_idle_game_keeps_its_adapter(per_process):
+    idle = {key: 0.0 if key[0] == 11804 else value for key, value in per_process.items()}
+    assert select_usage(idle, "game", 11804, "0x0000A3F2")[1] == "0x0000A3F2"
+    assert usage(idle, "render", 11804, "0x0000D1B7")[:2] == (14.6, "0x0000D1B7")
+
+def test_no_counters():
+    assert select_usage({}, "game", 11804) == (0.0, None, False)
@@ -0,0 +1,46 @@
+# MultiProcessCapManager rebuilding its controllers after profile edits.
+
+from collections import namedtuple
+
+from core.multi_controller import MultiProcessCapManager
+
+App = namedtuple("App", "pid name fps fresh")
+APPS = [App(1, "game.exe", 100.0, True)]
+
+def tracked_manager():
+    profiles = {
+        "Global": {"capmethod": "step", "maxcap": "120", "mincap": "60", "capstep": "10"},
+        "game.exe": {"maxcap": "100", "delaybeforedecrease": "2000"},
+    }
+    m = MultiProcessCapManager(profiles)
+    [(profile, start)] = m.tick(APPS, gpu=60, cpu=20)
+    assert (profile, start.reason, float(start.cap)) == ("game.exe", "start", 100.0)
+    return profiles, m
+
+def test_settings_are_not_rebuilt_every_tick():
+    _, m = tracked_manager()
+    settings = m.tracked["game.exe"].controller.settings
+    m.tick(APPS, gpu=60, cpu=20)
+    assert m.tracked["game.exe"].controller.settings is settings
+
+def test_ladder_and_settings_change_together():
+    profiles, m = tracked_manager()
+    profiles["game.exe"].update(maxcap="90", delaybeforedecrease="3000")
+    m.tick(APPS, gpu=60, cpu=20)
+    controller = m.tracked["game.exe"].controller
+    assert controller.settings.delaybeforedecrease == 2000 and float(controller.ladder.fixed(controller.max_cap)) == 100
+
+    m.config_changed()
+    decisions = m.tick(APPS, gpu=60, cpu=20)
+    controller = m.tracked["game.exe"].controller
+    assert controller.settings.delaybeforedecrease == 3000 and float(controller.ladder.fixed(controller.max_cap)) == 90
+    assert [(p, d.reason, float(d.cap)) for p, d in decisions] == [("game.exe", "start", 90.0)]
+
+def test_settings_only_edit_keeps_the_cap():
+    profiles, m = tracked_manager()
+    controller = m.tracked["game.exe"].controller
+    profiles["game.exe"]["delaybeforedecrease"] = "4000"
+    m.config_changed()
+    assert m.tick(APPS, gpu=60, cpu=20) == []
+    assert m.tracked["game.exe"].controller is controller
+    assert controller.settings.delaybeforedecrease == 4000
@@ -0,0 +1,144 @@
+# The limiter's expectations of an RTSS controller backend, run against both the
+# RTSSHooks64.dll controller (with the DLL and registry replaced by a profile
+# directory) and SimulatedRTSSController.
+
+import ctypes
+import os
+import sys
+import types
+from decimal import Decimal
+
+import pytest
+
+from core.fixed_fps import FixedFPS
+from core.limiter_queue import LimiterCommandQueue
+from core.rtss_simulated import SimulatedRTSSController
+
+TEST_PROFILE = "dfl_test_profile.exe"
+
+class ListLogger:
+    def __init__(self):
+        self.messages = []
+
+    def add_log(self, message):
+        self.messages.append(message)
+
+class _Export:
+    """A DLL export: callable, with the argtypes/restype attributes RTSSController sets."""
+
+    def __init__(self, func):
+        self.func = func
+        self.argtypes = None
+        self.restype = None
+
+    def __call__(self, *args):
+        return self.func(*args)
+
+class FakeRTSSHooksDLL:
+    """RTSSHooks64.dll exports backed by a profile directory (the simulated primitives)."""
+
+    EXPORTS = ("LoadProfile", "SaveProfile", "GetProfileProperty", "SetProfileProperty",
+               "DeleteProfile", "ResetProfile", "UpdateProfiles", "SetFlags")
+
+    def __init__(self, root_dir):
+        self.backend = SimulatedRTSSController(ListLogger(), root_dir)
+        for name in self.EXPORTS:
+            setattr(self, name, _Export(getattr(self.backend, name)))
+
+def make_real_controller(monkeypatch, root_dir):
+    # rtss_functions needs winreg and (through launch_popup) a Windows GUI; neither is used here
+    monkeypatch.setitem(sys.modules, "winreg", types.ModuleType("winreg"))
+    popup = types.ModuleType("core.launch_popup")
+    popup.show_rtss_error_and_exit = lambda path: pytest.fail(f"RTSSHooks64.dll not loaded from {path}")
+    monkeypatch.setitem(sys.modules, "core.launch_popup", popup)
+    monkeypatch.delitem(sys.modules, "core.rtss_functions", raising=False)
+    from core.rtss_functions import RTSSController
+
+    dll = FakeRTSSHooksDLL(str(root_dir))
+    monkeypatch.setattr(ctypes, "WinDLL", lambda path: dll, raising=False)
+    monkeypatch.setattr(RTSSController, "get_rtss_install_path", lambda self: str(root_dir))
+    rtss = RTSSController(ListLogger())
+    rtss.calls = dll.backend.calls
+    rtss.call_count = dll.backend.call_count
+    return rtss
+
+@pytest.fixture(params=["real", "simulated"])
+def rtss(request, tmp_path, monkeypatch):
+    if request.param == "real":
+        controller = make_real_controller(monkeypatch, tmp_path)
+    else:
+        controller = SimulatedRTSSController(ListLogger(), str(tmp_path))
+    controller.create_profile(TEST_PROFILE, {"FramerateLimit": 0})
+    return controller
+
+def profile_value(rtss, key):
+    return rtss.profile_files.get_value(rtss.get_profile_file(TEST_PROFILE), key)
+
+def test_create_profile_writes_a_profile_file(rtss):
+    assert os.path.isfile(rtss.get_profile_file(TEST_PROFILE))
+
+def test_fractional_limit_round_trips(rtss):
+    rtss.set_fractional_framerate(TEST_PROFILE, Decimal("59.94"))
+    assert rtss.get_framerate_limit(TEST_PROFILE, get_denominator=True) == 59.94
+    assert profile_value(rtss, "Limit") == "5994"
+    assert profile_value(rtss, "LimitDenominator") == "100"
+
+def test_fixed_point_limit_is_written_as_is(rtss):
+    rtss.set_fractional_framerate(TEST_PROFILE, FixedFPS(23976, 1000))
+    assert profile_value(rtss, "Limit") == "23976"
+    assert rtss.get_framerate_limit(TEST_PROFILE, get_denominator=True) == 23.976
+
+def test_integer_limit_resets_the_denominator(rtss):
+    rtss.set_fractional_framerate(TEST_PROFILE, Decimal("59.94"))
+    rtss.set_fractional_framerate(TEST_PROFILE, Decimal("72"))
+    assert rtss.get_framerate_limit(TEST_PROFILE, get_denominator=True) == 72
+    assert rtss.get_framerate_limit(TEST_PROFILE) == 72
+
+def test_direct_file_write_is_read_back(rtss):
+    rtss.set_fractional_fps_direct(TEST_PROFILE, Decimal("47.5"))
+    rtss.profile_files.invalidate()
+    assert rtss.get_framerate_limit(TEST_PROFILE, get_denominator=True) == 47.5
+
+def test_global_profile_is_addressed_as_empty_name(rtss):
+    rtss.set_fractional_framerate("Global", Decimal("120"))
+    assert rtss.get_framerate_limit("", get_denominator=True) == 120
+    assert rtss.get_framerate_limit("Global", get_denominator=True) == 120
+
+def test_limiter_flags_toggle(rtss):
+    rtss.disable_limiter()
+    assert rtss.set_flags(0xFFFFFFFF, 0) & rtss.RTSSHOOKSFLAG_LIMITER_DISABLED
+    rtss.enable_limiter()
+    assert not rtss.set_flags(0xFFFFFFFF, 0) & rtss.RTSSHOOKSFLAG_LIMITER_DISABLED
+
+def test_delete_profile_removes_the_file(rtss):
+    rtss.delete_profile(TEST_PROFILE)
+    assert not os.path.isfile(rtss.get_profile_file(TEST_PROFILE))
+
+def test_write_does_not_update_profiles(rtss):
+    before = rtss.call_count("UpdateProfiles")
+    rtss.write_fractional_framerate(TEST_PROFILE, FixedFPS(60))
+    assert rtss.call_count("UpdateProfiles") == before
+
+def test_queue_writes_each_batch_with_one_update(rtss):
+    queue = LimiterCommandQueue(rtss, ListLogger(), coalesce_window=0.05)
+    before = rtss.call_count("UpdateProfiles")
+    queue.submit(TEST_PROFILE, FixedFPS(50))
+    queue.submit(TEST_PROFILE, FixedFPS(55))
+    queue.submit("Global", FixedFPS(100))
+    assert queue.flush()
+    queue.stop()
+    assert rtss.call_count("UpdateProfiles") - before == 1
+    assert rtss.get_framerate_limit(TEST_PROFILE, get_denominator=True) == 55
+    assert rtss.get_framerate_limit("Global", get_denominator=True) == 100
+
+def test_queue_skips_a_limit_equal_in_another_denominator(rtss):
+    queue = LimiterCommandQueue(rtss, ListLogger(), coalesce_window=0.0)
+    queue.submit(TEST_PROFILE, FixedFPS(60))
+    queue.flush()
+    before = rtss.call_count("SetProfileProperty")
+    queue.submit(TEST_PROFILE, FixedFPS(6000, 100))
+    queue.submit(TEST_PROFILE, Decimal("60.0"))
+    queue.flush()
+    queue.stop()
+    assert rtss.call_count("SetProfileProperty") == before
+    assert queue.get_stats()["skipped"] == 1